@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""One-off migration: add verificationKey to offers stored before it existed"""
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+from server import storage, generate_verification_key, create_indexes
+from storage import MongoOfferStore
+
+BATCH_SIZE = 1000
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def backfill_verification_keys():
+    """Compute verificationKey for every offer that is missing it"""
+    await create_indexes()
+    db = storage.db
+
+    cursor = db.verified_offers.find(
+        {"verificationKey": {"$exists": False}},
+        {"_id": 1, "candidateName": 1, "companyName": 1, "recruiterEmail": 1}
+    )
+
+    updated = 0
+    batch = []
+    async for offer in cursor:
+        verification_key = generate_verification_key(
+            offer.get('candidateName'), offer.get('companyName'), offer.get('recruiterEmail')
+        )
+        batch.append(UpdateOne({"_id": offer["_id"]}, {"$set": {"verificationKey": verification_key}}))
+        if len(batch) >= BATCH_SIZE:
+            result = await db.verified_offers.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+            logger.info(f"Backfilled {updated} offers so far")
+
+    if batch:
+        result = await db.verified_offers.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+
+    logger.info(f"Backfill complete: {updated} offers updated")
+
+async def main():
+    # Only MongoDB holds offers from before verificationKey existed
+    if not isinstance(storage, MongoOfferStore):
+        logger.info("Nothing to backfill: the configured storage engine is not MongoDB")
+        return
+    await storage.connect()
+    try:
+        await backfill_verification_keys()
+    finally:
+        await storage.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
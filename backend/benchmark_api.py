@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""In-process load and latency benchmark for the /api routes"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+ROUTES = ["verify-offer", "generate-offer", "recruiter/offers", "recruiter/offers-stream", "upload-file"]
+SEED_CHUNK_SIZE = 10000
+SEED_START = datetime(2024, 1, 1)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def parse_count(value: str) -> int:
+    """Parse counts such as 1000, 10k or 10M"""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    suffix = value[-1:].lower()
+    if suffix in multipliers:
+        return int(float(value[:-1]) * multipliers[suffix])
+    return int(value)
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def seeded_offer(server, index: int, recruiters: int) -> dict:
+    """Deterministic stored offer for seed row `index`"""
+    candidate_name = f"Candidate {index}"
+    company_name = f"Company {index % recruiters}"
+    recruiter_email = f"recruiter{index % recruiters}@bench.example"
+    return {
+        "id": f"seed-{index}",
+        "hash": hashlib.sha256(f"seed-{index}".encode()).hexdigest(),
+        "candidateName": candidate_name,
+        "companyName": company_name,
+        "recruiterEmail": recruiter_email,
+        "recruiterName": "Bench Recruiter",
+        "position": "Software Engineer",
+        "salary": "$120,000",
+        "startDate": "2025-07-15",
+        "verificationKey": server.generate_verification_key(candidate_name, company_name, recruiter_email),
+        "dateSigned": SEED_START + timedelta(seconds=index),
+        "status": "verified"
+    }
+
+async def seed_offers(server, offers: int, recruiters: int):
+    """Insert `offers` synthetic offers straight into storage, bypassing signing"""
+    start = time.perf_counter()
+    for chunk_start in range(0, offers, SEED_CHUNK_SIZE):
+        chunk = range(chunk_start, min(offers, chunk_start + SEED_CHUNK_SIZE))
+        await server.storage.insert_offers([seeded_offer(server, index, recruiters) for index in chunk])
+        if chunk.stop % (SEED_CHUNK_SIZE * 10) == 0:
+            logger.info(f"Seeded {chunk.stop} offers")
+    logger.info(f"Seeded {offers} offers in {time.perf_counter() - start:.1f}s")
+
+def text_pdf(lines) -> bytes:
+    """One-page PDF whose uncompressed content stream shows each line as text"""
+    def escape(line: str) -> bytes:
+        return line.encode('latin-1').replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+    content = b"BT /F1 12 Tf 72 720 Td 14 TL " + b"".join(b"(" + escape(line) + b") Tj T* " for line in lines) + b"ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return pdf
+
+def offer_letter(index: int, offers: int, recruiters: int) -> bytes:
+    """Unique text-layer offer letter for a seeded offer, so every upload misses the extraction cache"""
+    seed_index = index % offers if offers else index
+    return text_pdf([
+        f"Candidate Name: Candidate {seed_index}",
+        "We are pleased to offer you the position of Software Engineer.",
+        f"Company: Company {seed_index % recruiters}",
+        "Salary: $120,000",
+        f"Contact recruiter{seed_index % recruiters}@bench.example",
+        f"Reference: upload-{index}"
+    ])
+
+def check_offer_letter(server, offers: int, recruiters: int):
+    """Fail fast unless offer letters yield every field, so upload-file measures extraction and verification"""
+    with tempfile.TemporaryDirectory() as letter_dir:
+        path = Path(letter_dir) / "offer.pdf"
+        path.write_bytes(offer_letter(0, offers, recruiters))
+        fields = server.extract_offer_fields(str(path), "application/pdf")
+    missing = [field for field, value in fields.items() if value is None]
+    if missing:
+        raise RuntimeError(f"Benchmark offer letters yield no {', '.join(missing)} (is pypdf installed?)")
+
+def make_workloads(server, offers: int, recruiters: int, miss_ratio: float, page_size: int) -> dict:
+    """Request factories for each benchmarked route"""
+    rng = random.Random(42)
+    recruiter_headers = [
+        {"Authorization": f"Bearer {server.recruiter_tokens.issue(f'recruiter{index}@bench.example', f'Company {index}', 'Bench Recruiter')}"}
+        for index in range(recruiters)
+    ]
+    issuer_headers = {
+        "Authorization": f"Bearer {server.recruiter_tokens.issue('issuer@bench.example', 'Bench Co', 'Bench Recruiter')}"
+    }
+    upload_ids = itertools.count()
+    generate_ids = itertools.count()
+
+    def verify_offer(client):
+        index = rng.randrange(offers) if offers else 0
+        if not offers or rng.random() < miss_ratio:
+            index += offers
+        return client.post("/api/verify-offer", json={
+            "fullName": f"Candidate {index}",
+            "companyName": f"Company {index % recruiters}",
+            "recruiterEmail": f"recruiter{index % recruiters}@bench.example"
+        })
+
+    def generate_offer(client):
+        index = next(generate_ids)
+        return client.post("/api/generate-offer", json={
+            "candidateName": f"Bench Candidate {index}",
+            "position": "Software Engineer",
+            "salary": "$120,000",
+            "startDate": "2025-07-15",
+            "companyName": "Bench Co",
+            "recruiterEmail": "issuer@bench.example",
+            "recruiterName": "Bench Recruiter"
+        }, headers=issuer_headers)
+
+    def recruiter_offers(client):
+        recruiter = rng.randrange(recruiters)
+        return client.get("/api/recruiter/offers", params={
+            "recruiter_email": f"recruiter{recruiter}@bench.example", "limit": page_size
+        }, headers=recruiter_headers[recruiter])
+
+    def recruiter_offers_stream(client):
+        # Every offer of one recruiter: offers / recruiters rows
+        recruiter = rng.randrange(recruiters)
+        return client.get("/api/recruiter/offers", params={
+            "recruiter_email": f"recruiter{recruiter}@bench.example", "stream": "true"
+        }, headers=recruiter_headers[recruiter])
+
+    def upload_file(client):
+        index = next(upload_ids)
+        return client.post("/api/upload-file", files={
+            "file": (f"offer-{index}.pdf", offer_letter(index, offers, recruiters), "application/pdf")
+        })
+
+    return {
+        "verify-offer": verify_offer,
+        "generate-offer": generate_offer,
+        "recruiter/offers": recruiter_offers,
+        "recruiter/offers-stream": recruiter_offers_stream,
+        "upload-file": upload_file
+    }
+
+async def measure(client, make_request, requests: int, concurrency: int) -> dict:
+    """Issue `requests` requests from `concurrency` concurrent workers and summarize latency"""
+    remaining = iter(range(requests))
+    latencies = []
+    statuses = Counter()
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "throughput": round(requests / elapsed, 1),
+        "p50Ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95Ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99Ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "maxMs": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "errors": errors,
+        "statuses": dict(statuses)
+    }
+
+async def run(args) -> dict:
+    # Imported here so the storage and key settings above apply to the app
+    import server
+
+    results = []
+    async with server.app.router.lifespan_context(server.app):
+        # Pause background maintenance so runs only measure request handling
+        await server.stop_background_tasks()
+        await seed_offers(server, args.offers, args.recruiters)
+        await server.offer_filter.rebuild()
+        if server.FUZZY_MATCH_ENABLED:
+            # verify-offer misses take the near-match path, as they do in production
+            await server.fuzzy_matcher.rebuild()
+        if "upload-file" in args.routes:
+            check_offer_letter(server, args.offers, args.recruiters)
+
+        workloads = make_workloads(server, args.offers, args.recruiters, args.miss_ratio, args.page_size)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            for route in args.routes:
+                make_request = workloads[route]
+                await measure(client, make_request, args.warmup, 1)
+                for concurrency in args.concurrency:
+                    result = await measure(client, make_request, args.requests, concurrency)
+                    logger.info(
+                        f"{route} c={concurrency}: {result['throughput']} req/s, "
+                        f"p50 {result['p50Ms']}ms, p99 {result['p99Ms']}ms, {result['errors']} errors"
+                    )
+                    results.append({"route": route, "concurrency": concurrency, **result})
+
+    return {
+        "config": {
+            "engine": args.engine,
+            "writeBehind": args.write_behind,
+            "fuzzyMatch": server.FUZZY_MATCH_ENABLED,
+            "offers": args.offers,
+            "recruiters": args.recruiters,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "missRatio": args.miss_ratio,
+            "pageSize": args.page_size,
+            "concurrency": args.concurrency
+        },
+        "results": results
+    }
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Flag routes whose throughput, tail latency or error count regressed beyond `tolerance`"""
+    baseline_results = {(result["route"], result["concurrency"]): result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        previous = baseline_results.get((result["route"], result["concurrency"]))
+        if previous is None:
+            continue
+        checks = [
+            ("throughput", result["throughput"] < previous["throughput"] * (1 - tolerance)),
+            ("p95Ms", result["p95Ms"] > previous["p95Ms"] * (1 + tolerance)),
+            ("p99Ms", result["p99Ms"] > previous["p99Ms"] * (1 + tolerance)),
+            ("errors", result["errors"] > previous["errors"])
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append({
+                    "route": result["route"],
+                    "concurrency": result["concurrency"],
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": result[metric]
+                })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--engine", choices=["memory", "sqlite"], default="sqlite",
+                        help="local storage stand-in (sqlite uses a temporary file)")
+    parser.add_argument("--offers", type=parse_count, default=parse_count("1k"),
+                        help="offers to seed, e.g. 1k, 100k, 10M")
+    parser.add_argument("--recruiters", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500, help="requests per route and concurrency level")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=ROUTES)
+    parser.add_argument("--page-size", type=int, default=100, help="recruiter/offers page size (at most 500)")
+    parser.add_argument("--miss-ratio", type=float, default=0.1, help="share of verify-offer lookups for unknown offers")
+    parser.add_argument("--write-behind", action="store_true", help="issue offers through the group-commit writer")
+    parser.add_argument("--output", type=Path, help="also write the JSON report here, e.g. to store a baseline")
+    parser.add_argument("--baseline", type=Path, help="stored report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.environ['STORAGE_ENGINE'] = args.engine
+        os.environ['SQLITE_PATH'] = str(Path(work_dir) / "benchmark.db")
+        os.environ['OFFER_SIGNING_KEYS_DIR'] = str(Path(work_dir) / "keys")
+        os.environ['OFFER_WRITE_BEHIND'] = str(args.write_behind).lower()
+        report = asyncio.run(run(args))
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        report["comparison"] = {"baseline": str(args.baseline), "tolerance": args.tolerance, "regressions": regressions}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    print(output)
+
+    if report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
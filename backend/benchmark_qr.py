@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Compare the JSON and compact (base45 CBOR) QR payloads: size, QR version and render time"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import segno
+
+from server import (
+    offer_signing_keys, generate_offer_hash, generate_qr_payload, generate_digital_signature,
+    generate_qr_data, generate_qr_compact, parse_qr_data, render_qr_png
+)
+
+def measure(qr_texts: list) -> dict:
+    qr = segno.make(qr_texts[0], error='m')
+
+    start = time.perf_counter()
+    for qr_text in qr_texts:
+        segno.make(qr_text, error='m')
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    images = [render_qr_png(qr_text) for qr_text in qr_texts]
+    render_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for qr_text in qr_texts:
+        parse_qr_data(qr_text)
+    parse_seconds = time.perf_counter() - start
+
+    return {
+        "payloadBytes": round(sum(len(qr_text.encode()) for qr_text in qr_texts) / len(qr_texts)),
+        "qrMode": qr.mode,
+        "qrVersion": qr.version,
+        "qrModules": qr.symbol_size(border=0)[0],
+        "pngBytes": round(sum(len(image) for image in images) / len(images)),
+        "qrEncodeMs": round(encode_seconds / len(qr_texts) * 1000, 3),
+        "pngRenderMs": round(render_seconds / len(qr_texts) * 1000, 3),
+        "parseUs": round(parse_seconds / len(qr_texts) * 1e6, 2)
+    }
+
+def run(iterations: int) -> dict:
+    offer_data = {
+        'candidateName': "Alice Smith",
+        'companyName': "TechCorp Inc",
+        'recruiterEmail': "hr@techcorp.com",
+        'position': "Software Engineer",
+        'salary': "$120,000",
+        'startDate': "2025-07-15",
+        'timestamp': "2025-01-01 00:00:00.123000"
+    }
+    signed = []
+    for i in range(iterations):
+        payload = generate_qr_payload(offer_data, generate_offer_hash(dict(offer_data, startDate=str(i))))
+        signed.append((payload, generate_digital_signature(payload)))
+
+    results = {
+        "iterations": iterations,
+        "json": measure([generate_qr_data(payload, signature) for payload, signature in signed]),
+        "compact": measure([generate_qr_compact(payload, signature) for payload, signature in signed])
+    }
+    results["payloadBytesSaved"] = round(1 - results["compact"]["payloadBytes"] / results["json"]["payloadBytes"], 3)
+    results["renderSpeedup"] = round(results["json"]["pngRenderMs"] / results["compact"]["pngRenderMs"], 2)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as keys_dir:
+        offer_signing_keys.load(Path(keys_dir), "benchmark")
+        print(json.dumps(run(args.iterations), indent=2))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for offer signing and offline signature verification"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from server import (
+    offer_signing_keys, generate_offer_hash, generate_qr_payload,
+    generate_digital_signature, generate_qr_data, verify_qr_signature
+)
+
+def run(iterations: int) -> dict:
+    offer_data = {
+        'candidateName': "Alice Smith",
+        'companyName': "TechCorp Inc",
+        'recruiterEmail': "hr@techcorp.com",
+        'position': "Software Engineer",
+        'salary': "$120,000",
+        'startDate': "2025-07-15",
+        'timestamp': "2025-01-01 00:00:00"
+    }
+    payloads = [generate_qr_payload(offer_data, generate_offer_hash(dict(offer_data, timestamp=str(i))))
+                for i in range(iterations)]
+
+    start = time.perf_counter()
+    qr_payloads = [json.loads(generate_qr_data(payload, generate_digital_signature(payload))) for payload in payloads]
+    sign_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    verified = sum(verify_qr_signature(qr_payload) for qr_payload in qr_payloads)
+    verify_seconds = time.perf_counter() - start
+
+    assert verified == iterations
+    return {
+        "iterations": iterations,
+        "signsPerSecond": round(iterations / sign_seconds),
+        "verifiesPerSecond": round(iterations / verify_seconds)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as keys_dir:
+        offer_signing_keys.load(Path(keys_dir), "benchmark")
+        print(json.dumps(run(args.iterations), indent=2))
@@ -0,0 +1,335 @@
+"""In-process metrics for OfferTrust.
+
+Counters, gauges and histograms live in one registry rendered in the
+Prometheus text format by /api/metrics. Three sources feed it:
+
+- MetricsMiddleware: per-route request counts, errors and latency.
+- MongoCommandMetrics / MongoPoolMetrics: pymongo listeners timing every
+  database command and every connection-pool checkout. The SQLite engine
+  records the same series around its executor.
+- sample_event_loop_lag: a background task measuring event-loop lag.
+
+When enabled, the middleware also adds a Server-Timing header with the
+database time spent on each request.
+"""
+from typing import Dict, Optional, Tuple
+from contextvars import ContextVar
+import asyncio
+import threading
+import time
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """A named metric with one series per label-value tuple"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class CounterMetric(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            series = sorted(self.series.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in series]
+
+class GaugeMetric(Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self.lock:
+            self.series[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            series = sorted(self.series.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in series]
+
+class HistogramMetric(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value: float):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # Per-bucket counts (made cumulative when rendered), then sum and count
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self.lock:
+            series = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self.series.items())
+        lines = []
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            series_labels = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{series_labels} {total}")
+            lines.append(f"{self.name}_count{series_labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """All metrics exposed on /api/metrics"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(CounterMetric(
+    "offertrust_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+http_errors = registry.register(CounterMetric(
+    "offertrust_http_request_errors_total", "HTTP requests that failed with a 5xx or an unhandled exception", ("method", "route")
+))
+http_latency = registry.register(HistogramMetric(
+    "offertrust_http_request_duration_seconds", "Time from request to the end of the response body", ("method", "route")
+))
+db_latency = registry.register(HistogramMetric(
+    "offertrust_db_command_duration_seconds", "Database command duration", ("collection", "operation"), FAST_BUCKETS
+))
+db_failures = registry.register(CounterMetric(
+    "offertrust_db_command_failures_total", "Database commands that failed", ("collection", "operation")
+))
+pool_wait = registry.register(HistogramMetric(
+    "offertrust_db_pool_checkout_wait_seconds", "Time spent waiting for a database connection", ("pool",), FAST_BUCKETS
+))
+pool_in_use = registry.register(GaugeMetric(
+    "offertrust_db_pool_connections_in_use", "Database connections currently checked out", ("pool",)
+))
+loop_lag = registry.register(HistogramMetric(
+    "offertrust_event_loop_lag_seconds", "How late the event loop ran a scheduled wakeup", (), FAST_BUCKETS
+))
+loop_lag_last = registry.register(GaugeMetric(
+    "offertrust_event_loop_lag_last_seconds", "Most recent event loop lag sample"
+))
+
+class RequestTimings:
+    """Database time accumulated by one request, for the Server-Timing header"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Dict[str, list] = {}
+
+    def add(self, name: str, seconds: float):
+        with self.lock:
+            entry = self.entries.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def header(self, total: float) -> str:
+        with self.lock:
+            entries = sorted(self.entries.items())
+        parts = [f'{name};dur={seconds * 1000:.2f};desc="{count}x"' for name, (seconds, count) in entries]
+        parts.append(f"app;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+# Set by MetricsMiddleware for requests that report Server-Timing. Motor copies
+# the context into its executor threads, so the listeners below see it too.
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def record_db_command(collection: str, operation: str, seconds: float, failed: bool = False):
+    """Record one database command from any storage engine"""
+    db_latency.observe(collection, operation, value=seconds)
+    if failed:
+        db_failures.inc(collection, operation)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add("db", seconds)
+
+def record_pool_wait(pool: str, seconds: float):
+    """Record how long a command waited for a database connection"""
+    pool_wait.observe(pool, value=seconds)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add("dbWait", seconds)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and operation"""
+
+    def __init__(self):
+        self.collections = {}
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return event.request_id, event.connection_id
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self.collections[self._key(event)] = target if isinstance(target, str) else event.database_name
+
+    def succeeded(self, event):
+        collection = self.collections.pop(self._key(event), "unknown")
+        record_db_command(collection, event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self.collections.pop(self._key(event), "unknown")
+        record_db_command(collection, event.command_name, event.duration_micros / 1e6, failed=True)
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Measures connection checkout waits; pymongo emits start and end on the same thread"""
+
+    def __init__(self):
+        self.checkout_started = threading.local()
+
+    @staticmethod
+    def _pool(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def connection_check_out_started(self, event):
+        setattr(self.checkout_started, self._pool(event), time.perf_counter())
+
+    def _checkout_finished(self, event):
+        pool = self._pool(event)
+        started = getattr(self.checkout_started, pool, None)
+        if started is not None:
+            delattr(self.checkout_started, pool)
+            record_pool_wait(pool, time.perf_counter() - started)
+
+    def connection_checked_out(self, event):
+        self._checkout_finished(event)
+        pool_in_use.inc(self._pool(event))
+
+    def connection_check_out_failed(self, event):
+        self._checkout_finished(event)
+
+    def connection_checked_in(self, event):
+        pool_in_use.inc(self._pool(event), amount=-1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+async def sample_event_loop_lag(interval: float):
+    """Background task: sleep `interval` and record how late the loop woke us"""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - scheduled - interval)
+        loop_lag.observe(value=lag)
+        loop_lag_last.set(value=lag)
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route counts, errors and latency.
+
+    Routes are labelled with their path template ("/api/offers/{hash_value}"),
+    never the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+        self.route_paths = None
+
+    def route_label(self, scope) -> str:
+        if self.route_paths is None:
+            # Starlette records the matched endpoint on the scope; map it back to its template
+            self.route_paths = {route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")}
+        return self.route_paths.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = RequestTimings() if self.server_timing else None
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings is not None:
+                    header = timings.header(time.perf_counter() - start)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            request_timings.reset(token)
+            method = scope["method"]
+            route = self.route_label(scope)
+            http_requests.inc(method, route, str(status))
+            if status >= 500:
+                http_errors.inc(method, route)
+            http_latency.observe(method, route, value=time.perf_counter() - start)
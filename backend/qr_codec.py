@@ -0,0 +1,216 @@
+"""Compact, versioned encoding of signed offer QR payloads.
+
+The JSON QR payload spends most of its bytes on key names, a 64-character hex
+hash and a base64 signature, and its lower-case text forces QR byte mode. The
+compact form is a version prefix followed by the base45 (RFC 9285) text of a
+CBOR (RFC 8949) array:
+
+    OT1:<base45 of [kid, hash, candidate, company, recruiter, position,
+                    timestamp, signature]>
+
+- hash and signature are raw bytes (32 and 64) instead of hex and base64.
+- timestamp is an integer of microseconds since the epoch when the payload's
+  timestamp is str() of a naive datetime, otherwise the original text.
+- "type" and "verifyUrl" are implied by the version and rebuilt on decode.
+
+Every character of the result is in the QR alphanumeric set, which packs
+5.5 bits per character instead of 8. decode_qr rebuilds the exact JSON
+payload dict, so the Ed25519 signature is the one over the canonical JSON
+payload and both forms verify the same way. Only the CBOR major types the
+payload needs are implemented.
+"""
+from datetime import datetime, timedelta
+import base64
+import re
+
+QR_VERSION = 1
+QR_PREFIX = f"OT{QR_VERSION}:"
+QR_PAYLOAD_TYPE = "offer_verification"
+
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+_BASE45_VALUES = {char: value for value, char in enumerate(BASE45_ALPHABET)}
+
+_EPOCH = datetime(1970, 1, 1)
+_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# CBOR major types and the null simple value
+_UINT, _BYTES, _TEXT, _ARRAY = 0, 2, 3, 4
+_NULL = 0xf6
+
+def b45encode(data: bytes) -> str:
+    chars = []
+    for i in range(0, len(data) - 1, 2):
+        n = data[i] * 256 + data[i + 1]
+        n, c = divmod(n, 45)
+        e, d = divmod(n, 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e])
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d])
+    return "".join(chars)
+
+def b45decode(text: str) -> bytes:
+    if len(text) % 3 == 1:
+        raise ValueError("Invalid base45 length")
+    try:
+        values = [_BASE45_VALUES[char] for char in text]
+    except KeyError:
+        raise ValueError("Invalid base45 character") from None
+    data = bytearray()
+    end = len(values) - len(values) % 3
+    for i in range(0, end, 3):
+        n = values[i] + values[i + 1] * 45 + values[i + 2] * 2025
+        if n > 0xffff:
+            raise ValueError("Invalid base45 group")
+        data += n.to_bytes(2, "big")
+    if end < len(values):
+        n = values[end] + values[end + 1] * 45
+        if n > 0xff:
+            raise ValueError("Invalid base45 group")
+        data.append(n)
+    return bytes(data)
+
+def _cbor_head(major: int, value: int) -> bytes:
+    if value < 24:
+        return bytes([major << 5 | value])
+    for info, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+        if value < 1 << (8 * size):
+            return bytes([major << 5 | info]) + value.to_bytes(size, "big")
+    raise ValueError("Integer too large for CBOR")
+
+def cbor_encode(value) -> bytes:
+    """Encode None, unsigned ints, bytes, str and lists as CBOR"""
+    if value is None:
+        return bytes([_NULL])
+    if isinstance(value, bool):
+        raise TypeError("Booleans are not supported")
+    if isinstance(value, int):
+        if value < 0:
+            raise ValueError("Negative integers are not supported")
+        return _cbor_head(_UINT, value)
+    if isinstance(value, bytes):
+        return _cbor_head(_BYTES, len(value)) + value
+    if isinstance(value, str):
+        encoded = value.encode()
+        return _cbor_head(_TEXT, len(encoded)) + encoded
+    if isinstance(value, (list, tuple)):
+        return _cbor_head(_ARRAY, len(value)) + b"".join(cbor_encode(item) for item in value)
+    raise TypeError(f"Cannot encode {type(value).__name__} as CBOR")
+
+def _cbor_read(data: bytes, offset: int):
+    if offset >= len(data):
+        raise ValueError("Truncated CBOR")
+    initial = data[offset]
+    offset += 1
+    if initial == _NULL:
+        return None, offset
+    major, info = initial >> 5, initial & 0x1f
+    if info < 24:
+        argument = info
+    elif info <= 27:
+        size = 1 << (info - 24)
+        if offset + size > len(data):
+            raise ValueError("Truncated CBOR")
+        argument = int.from_bytes(data[offset:offset + size], "big")
+        offset += size
+    else:
+        raise ValueError("Unsupported CBOR length")
+
+    if major == _UINT:
+        return argument, offset
+    if major in (_BYTES, _TEXT):
+        end = offset + argument
+        if end > len(data):
+            raise ValueError("Truncated CBOR")
+        chunk = data[offset:end]
+        return (chunk if major == _BYTES else chunk.decode()), end
+    if major == _ARRAY:
+        if argument > len(data) - offset:
+            raise ValueError("Truncated CBOR")
+        items = []
+        for _ in range(argument):
+            item, offset = _cbor_read(data, offset)
+            items.append(item)
+        return items, offset
+    raise ValueError(f"Unsupported CBOR major type {major}")
+
+def cbor_decode(data: bytes):
+    value, offset = _cbor_read(data, 0)
+    if offset != len(data):
+        raise ValueError("Trailing bytes after CBOR value")
+    return value
+
+def _encode_timestamp(timestamp: str):
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return timestamp
+    if parsed.tzinfo is not None or str(parsed) != timestamp or parsed < _EPOCH:
+        return timestamp
+    return (parsed - _EPOCH) // timedelta(microseconds=1)
+
+def _decode_timestamp(value) -> str:
+    if isinstance(value, int):
+        try:
+            return str(_EPOCH + timedelta(microseconds=value))
+        except OverflowError:
+            raise ValueError("QR code timestamp out of range") from None
+    return value
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def encode_qr(payload: dict, signature: str) -> str:
+    """Encode a signed QR payload (see generate_qr_payload) in the compact form"""
+    hash_value = payload.get("hash")
+    if not isinstance(hash_value, str) or not _HASH_PATTERN.fullmatch(hash_value):
+        raise ValueError("QR payload hash must be 64 lower-case hex characters")
+    if payload.get("type") != QR_PAYLOAD_TYPE or payload.get("verifyUrl") != f"/verify?hash={hash_value}":
+        raise ValueError(f"QR payload cannot be encoded as version {QR_VERSION}")
+    signature_bytes = base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4))
+    if _b64url(signature_bytes) != signature:
+        raise ValueError("Signature is not unpadded base64url")
+
+    return QR_PREFIX + b45encode(cbor_encode([
+        payload["kid"],
+        bytes.fromhex(hash_value),
+        payload["candidate"],
+        payload["company"],
+        payload["recruiter"],
+        payload["position"],
+        _encode_timestamp(payload["timestamp"]),
+        signature_bytes
+    ]))
+
+def decode_qr(text: str) -> dict:
+    """Parse a compact QR code back into the signed JSON payload dict, signature included"""
+    if not text.startswith(QR_PREFIX):
+        raise ValueError("Unsupported QR code version")
+    try:
+        fields = cbor_decode(b45decode(text[len(QR_PREFIX):]))
+    except UnicodeDecodeError:
+        raise ValueError("Invalid text in QR code") from None
+    if not isinstance(fields, list) or len(fields) != 8:
+        raise ValueError("Malformed QR code")
+
+    kid, hash_bytes, candidate, company, recruiter, position, timestamp, signature = fields
+    if not isinstance(hash_bytes, bytes) or len(hash_bytes) != 32 or not isinstance(signature, bytes):
+        raise ValueError("Malformed QR code")
+    if not all(isinstance(value, str) for value in (kid, candidate, company, recruiter)):
+        raise ValueError("Malformed QR code")
+    if not isinstance(position, (str, type(None))) or not isinstance(timestamp, (str, int)):
+        raise ValueError("Malformed QR code")
+
+    hash_value = hash_bytes.hex()
+    return {
+        "type": QR_PAYLOAD_TYPE,
+        "kid": kid,
+        "hash": hash_value,
+        "candidate": candidate,
+        "company": company,
+        "recruiter": recruiter,
+        "position": position,
+        "timestamp": _decode_timestamp(timestamp),
+        "verifyUrl": f"/verify?hash={hash_value}",
+        "signature": _b64url(signature)
+    }
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Recompute the per-recruiter and per-company offer counters from verified_offers.
+
+Totals, status and month counts are replaced in one aggregation pass over the
+offers; verification hits are kept, since offers do not record them. Offers
+issued while the rebuild runs may be counted twice or not at all, so run it
+during quiet hours or run it again afterwards.
+"""
+import asyncio
+import logging
+import time
+
+from server import storage, offer_stats, create_indexes
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def main():
+    await storage.connect()
+    try:
+        await create_indexes()
+        start = time.perf_counter()
+        documents = await offer_stats.rebuild()
+        logger.info(f"Rebuilt {documents} offer stats documents in {time.perf_counter() - start:.1f}s")
+    finally:
+        await storage.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
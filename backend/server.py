@@ -1,28 +1,191 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, UploadFile, File, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
-from motor.motor_asyncio import AsyncIOMotorClient
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from multipart.multipart import MultipartParser, parse_options_header
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from pathlib import Path
 import os
 import logging
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
+import base64
 import hashlib
+import hmac
 import json
+import jwt
+import math
+import time
+import csv
+import gzip
+import io
+import re
+import shutil
+import tempfile
+import multiprocessing
+import threading
+import bisect
+import sys
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from storage import DuplicateContentError, DuplicateOfferError, create_store
+from metrics import MetricsMiddleware, registry as metrics_registry, sample_event_loop_lag
+from qr_codec import QR_PAYLOAD_TYPE, decode_qr, encode_qr
+
+# Optional document parsers used by /api/upload-file
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:
+    pytesseract = None
+
+# Optional fast JSON encoder for API responses
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional QR code renderer used by /api/offers/{hash}/qr.png
+try:
+    import segno
+except ImportError:
+    segno = None
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Storage engine: "mongo", "sqlite" or "memory". Connections are opened in the lifespan handler
+STORAGE_ENGINE = os.environ.get('STORAGE_ENGINE', 'mongo')
+storage = create_store(
+    STORAGE_ENGINE,
+    mongo_url=os.environ.get('MONGO_URL'),
+    db_name=os.environ.get('DB_NAME'),
+    sqlite_path=os.environ.get('SQLITE_PATH', str(ROOT_DIR / 'offertrust.db')),
+    write_concern=os.environ.get('STORAGE_WRITE_CONCERN', '1'),
+    journal=os.environ.get('STORAGE_WRITE_JOURNAL', 'false').lower() == 'true'
+)
+
+# Offer lookup cache settings
+OFFER_CACHE_SIZE = int(os.environ.get('OFFER_CACHE_SIZE', '10000'))
+OFFER_CACHE_TTL = float(os.environ.get('OFFER_CACHE_TTL', '300'))
 
-# Create the main app
-app = FastAPI(title="OfferTrust API", version="1.0.0")
+# Negative lookup (Bloom) filter settings
+BLOOM_FALSE_POSITIVE_RATE = float(os.environ.get('BLOOM_FALSE_POSITIVE_RATE', '0.001'))
+BLOOM_MIN_CAPACITY = int(os.environ.get('BLOOM_MIN_CAPACITY', '100000'))
+BLOOM_SYNC_INTERVAL = float(os.environ.get('BLOOM_SYNC_INTERVAL', '5'))
+BLOOM_REBUILD_INTERVAL = float(os.environ.get('BLOOM_REBUILD_INTERVAL', '3600'))
+# A miss is trusted while the last sync began at most BLOOM_MAX_STALENESS seconds ago, so an offer another
+# worker stored within that window can be reported missing; 0 confirms every miss with an indexed lookup
+BLOOM_MAX_STALENESS = float(os.environ.get('BLOOM_MAX_STALENESS', str(BLOOM_SYNC_INTERVAL * 2)))
+
+# Batch verification settings
+VERIFY_BATCH_MAX_SIZE = int(os.environ.get('VERIFY_BATCH_MAX_SIZE', '100000'))
+VERIFY_BATCH_CHUNK_SIZE = int(os.environ.get('VERIFY_BATCH_CHUNK_SIZE', '1000'))
+VERIFY_BATCH_MAX_CONCURRENCY = int(os.environ.get('VERIFY_BATCH_MAX_CONCURRENCY', '4'))
+
+# Bulk issuance settings
+BULK_ISSUE_CHUNK_SIZE = int(os.environ.get('BULK_ISSUE_CHUNK_SIZE', '500'))
+
+# QR code image settings
+QR_IMAGE_CACHE_SIZE = int(os.environ.get('QR_IMAGE_CACHE_SIZE', '1000'))
+QR_IMAGE_CACHE_TTL = float(os.environ.get('QR_IMAGE_CACHE_TTL', '86400'))
+QR_IMAGE_SCALE = int(os.environ.get('QR_IMAGE_SCALE', '4'))
+
+# Offer signing keys: <kid>.pem private keys (and <kid>.pub.pem retired public keys)
+OFFER_SIGNING_KEYS_DIR = Path(os.environ.get('OFFER_SIGNING_KEYS_DIR', str(ROOT_DIR / 'keys')))
+OFFER_SIGNING_KEY_ID = os.environ.get('OFFER_SIGNING_KEY_ID', 'offertrust-1')
+
+# Recruiter tokens: EdDSA JWTs signed with a separate key ring laid out like the offer signing keys.
+# Verified tokens are cached by digest for up to RECRUITER_TOKEN_CACHE_TTL seconds
+RECRUITER_TOKEN_KEYS_DIR = Path(os.environ.get('RECRUITER_TOKEN_KEYS_DIR', str(OFFER_SIGNING_KEYS_DIR / 'recruiter')))
+RECRUITER_TOKEN_KEY_ID = os.environ.get('RECRUITER_TOKEN_KEY_ID', 'recruiter-1')
+RECRUITER_TOKEN_TTL = float(os.environ.get('RECRUITER_TOKEN_TTL', str(8 * 3600)))
+RECRUITER_TOKEN_CACHE_SIZE = int(os.environ.get('RECRUITER_TOKEN_CACHE_SIZE', '10000'))
+RECRUITER_TOKEN_CACHE_TTL = float(os.environ.get('RECRUITER_TOKEN_CACHE_TTL', '300'))
+RECRUITER_TOKEN_ISSUER = "offertrust"
+# Recruiter tokens are only issued to callers presenting this admin token in X-Admin-Token,
+# as the recruiter's email is not otherwise proven. Unset disables /auth/recruiter
+RECRUITER_AUTH_ADMIN_TOKEN = os.environ.get('RECRUITER_AUTH_ADMIN_TOKEN', '')
+
+# Merkle anchoring settings
+MERKLE_BATCH_SIZE = int(os.environ.get('MERKLE_BATCH_SIZE', '1024'))
+MERKLE_BATCH_MAX_AGE = float(os.environ.get('MERKLE_BATCH_MAX_AGE', '300'))
+MERKLE_POLL_INTERVAL = float(os.environ.get('MERKLE_POLL_INTERVAL', '10'))
+MERKLE_BATCH_LEASE = float(os.environ.get('MERKLE_BATCH_LEASE', '300'))
+
+# Upload ingestion settings
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', '2'))
+UPLOAD_MAX_PENDING = int(os.environ.get('UPLOAD_MAX_PENDING', '8'))
+UPLOAD_PARSE_TIMEOUT = float(os.environ.get('UPLOAD_PARSE_TIMEOUT', '20'))
+UPLOAD_CACHE_SIZE = int(os.environ.get('UPLOAD_CACHE_SIZE', '1000'))
+UPLOAD_CACHE_TTL = float(os.environ.get('UPLOAD_CACHE_TTL', '3600'))
+
+# Fuzzy matching settings
+FUZZY_MATCH_ENABLED = os.environ.get('FUZZY_MATCH_ENABLED', 'true').lower() == 'true'
+FUZZY_MATCH_THRESHOLD = float(os.environ.get('FUZZY_MATCH_THRESHOLD', '0.8'))
+FUZZY_MATCH_LIMIT = int(os.environ.get('FUZZY_MATCH_LIMIT', '3'))
+FUZZY_SYNC_INTERVAL = float(os.environ.get('FUZZY_SYNC_INTERVAL', '5'))
+
+# Group-commit (write-behind) settings for generate-offer
+OFFER_WRITE_BEHIND = os.environ.get('OFFER_WRITE_BEHIND', 'false').lower() == 'true'
+OFFER_WRITE_BATCH_SIZE = int(os.environ.get('OFFER_WRITE_BATCH_SIZE', '256'))
+OFFER_WRITE_MAX_DELAY = float(os.environ.get('OFFER_WRITE_MAX_DELAY_MS', '5')) / 1000
+OFFER_WRITE_MAX_PENDING = int(os.environ.get('OFFER_WRITE_MAX_PENDING', '10000'))
+
+# Idempotent issuance: Idempotency-Key records expire after IDEMPOTENCY_KEY_TTL; a claim whose request has not
+# finished within IDEMPOTENCY_LEASE may be taken over, and a retry waits up to IDEMPOTENCY_WAIT for it to finish
+IDEMPOTENCY_KEY_TTL = float(os.environ.get('IDEMPOTENCY_KEY_TTL', str(24 * 3600)))
+IDEMPOTENCY_LEASE = float(os.environ.get('IDEMPOTENCY_LEASE', '30'))
+IDEMPOTENCY_WAIT = float(os.environ.get('IDEMPOTENCY_WAIT', '5'))
+IDEMPOTENCY_POLL_INTERVAL = float(os.environ.get('IDEMPOTENCY_POLL_INTERVAL', '0.05'))
+# Unique index on each verified offer's content hash (its fields without the timestamp)
+OFFER_CONTENT_DEDUPE = os.environ.get('OFFER_CONTENT_DEDUPE', 'false').lower() == 'true'
+
+# Revocation list settings
+REVOCATION_SYNC_INTERVAL = float(os.environ.get('REVOCATION_SYNC_INTERVAL', '1'))
+REVOCATION_SYNC_BATCH_SIZE = int(os.environ.get('REVOCATION_SYNC_BATCH_SIZE', '1000'))
+REVOCATION_GAP_TIMEOUT = float(os.environ.get('REVOCATION_GAP_TIMEOUT', '30'))
+
+# Verification audit log settings: AUDIT_LOG_SINK is "storage", "file" (rotated gzip NDJSON) or "off"
+AUDIT_LOG_SINK = os.environ.get('AUDIT_LOG_SINK', 'storage')
+AUDIT_LOG_DIR = Path(os.environ.get('AUDIT_LOG_DIR', str(ROOT_DIR / 'audit')))
+AUDIT_LOG_FILE_MAX_BYTES = int(os.environ.get('AUDIT_LOG_FILE_MAX_BYTES', str(64 * 1024 * 1024)))
+AUDIT_LOG_BUFFER_SIZE = int(os.environ.get('AUDIT_LOG_BUFFER_SIZE', '50000'))
+AUDIT_LOG_BATCH_SIZE = int(os.environ.get('AUDIT_LOG_BATCH_SIZE', '1000'))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', '1'))
+AUDIT_LOG_RETENTION_DAYS = float(os.environ.get('AUDIT_LOG_RETENTION_DAYS', '90'))
+# Client fingerprints are only recorded when AUDIT_FINGERPRINT_SALT is set. X-Forwarded-For is only honoured
+# on requests arriving from one of the comma-separated AUDIT_TRUSTED_PROXIES addresses
+AUDIT_FINGERPRINT_SALT = os.environ.get('AUDIT_FINGERPRINT_SALT', '')
+AUDIT_TRUSTED_PROXIES = frozenset(
+    address.strip() for address in os.environ.get('AUDIT_TRUSTED_PROXIES', '').split(',') if address.strip()
+)
+
+# Offer stats settings
+OFFER_STATS_FLUSH_INTERVAL = float(os.environ.get('OFFER_STATS_FLUSH_INTERVAL', '1'))
+
+# Metrics settings
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'false').lower() == 'true'
+METRICS_LOOP_LAG_INTERVAL = float(os.environ.get('METRICS_LOOP_LAG_INTERVAL', '0.5'))
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -47,16 +210,24 @@ class GenerateOfferRequest(BaseModel):
     salary: Optional[str] = None
     startDate: Optional[str] = None
     companyName: str
-    recruiterEmail: str
+    # Taken from the recruiter token when omitted
+    recruiterEmail: Optional[str] = None
     recruiterName: str
 
+class SignatureVerificationRequest(BaseModel):
+    qrData: str
+
 class GenerateOfferResponse(BaseModel):
     success: bool
     hash: str
     digitalSignature: str
     qrData: str
+    qrCompact: str
     message: str
 
+class RevokeOfferRequest(BaseModel):
+    reason: Optional[str] = None
+
 class RecruiterAuth(BaseModel):
     email: str
     companyName: Optional[str] = None
@@ -72,268 +243,3038 @@ class VerifiedOffer(BaseModel):
     position: str
     salary: Optional[str] = None
     startDate: Optional[str] = None
+    verificationKey: str
+    contentHash: Optional[str] = None
     dateSigned: datetime = Field(default_factory=datetime.utcnow)
     status: str = "verified"
 
+# JSON responses
+DefaultJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+def json_response(content, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """Encode a handler result once, skipping FastAPI's response_model re-validation and jsonable_encoder pass.
+
+    Models are dumped to Python values, which orjson encodes like Pydantic's JSON
+    mode: datetimes as ISO 8601 (naive stays naive) and UUIDs as strings.
+    """
+    if isinstance(content, BaseModel):
+        content = content.model_dump()
+    if orjson is None:
+        content = jsonable_encoder(content)
+    return DefaultJSONResponse(content, status_code=status_code, headers=headers)
+
+def dumps_json(content) -> bytes:
+    """Encode a JSON-ready value (e.g. an NDJSON line) with the response encoder"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content).encode()
+
 # Utility functions
 def generate_offer_hash(offer_data: dict) -> str:
     """Generate SHA-256 hash for offer data"""
     data_string = "|".join([
-        offer_data.get('candidateName', ''),
-        offer_data.get('companyName', ''),
-        offer_data.get('recruiterEmail', ''),
-        offer_data.get('position', ''),
-        offer_data.get('salary', ''),
-        offer_data.get('startDate', ''),
+        offer_data.get('candidateName') or '',
+        offer_data.get('companyName') or '',
+        offer_data.get('recruiterEmail') or '',
+        offer_data.get('position') or '',
+        offer_data.get('salary') or '',
+        offer_data.get('startDate') or '',
         offer_data.get('timestamp', str(datetime.utcnow()))
     ])
     return hashlib.sha256(data_string.encode()).hexdigest()
 
-def generate_digital_signature(hash_value: str) -> str:
-    """Generate simulated digital signature"""
-    signature_data = f"OFFERTRUST_{hash_value}_SECRET"
-    signature_hash = hashlib.sha256(signature_data.encode()).hexdigest()
-    return f"DS-{signature_hash[:16].upper()}"
+def generate_content_hash(offer_data: dict) -> str:
+    """Generate the SHA-256 of an offer's normalized fields, without its timestamp, to spot duplicate issuance"""
+    content_string = "\x1f".join(
+        normalize_match_value(offer_data.get(field))
+        for field in ('candidateName', 'candidateEmail', 'companyName', 'recruiterEmail', 'position', 'salary', 'startDate')
+    )
+    return hashlib.sha256(content_string.encode()).hexdigest()
+
+def normalize_match_value(value: Optional[str]) -> str:
+    """Casefold and trim a value used for offer matching"""
+    return " ".join((value or "").casefold().split())
 
-def generate_qr_data(offer_data: dict, hash_value: str) -> str:
-    """Generate QR code data"""
-    qr_data = {
-        "type": "offer_verification",
+def recruiter_filter_key(recruiter_email: str) -> str:
+    """Membership filter key recording that a recruiter has issued offers"""
+    return "recruiter\x1f" + normalize_match_value(recruiter_email)
+
+def offer_filter_keys(offer: dict) -> List[str]:
+    """The membership filter keys of a stored offer"""
+    keys = [offer['hash']]
+    if offer.get('verificationKey'):
+        keys.append(offer['verificationKey'])
+    if offer.get('recruiterEmail'):
+        keys.append(recruiter_filter_key(offer['recruiterEmail']))
+    return keys
+
+def generate_verification_key(full_name: str, company_name: str, recruiter_email: str) -> str:
+    """Generate the normalized match key used to look up offers on verification"""
+    key_string = "\x1f".join([
+        normalize_match_value(full_name),
+        normalize_match_value(company_name),
+        normalize_match_value(recruiter_email)
+    ])
+    return hashlib.sha256(key_string.encode()).hexdigest()
+
+class OfferSigningKeys:
+    """Ed25519 key ring used to sign offer QR payloads (a second ring signs recruiter tokens).
+
+    The active key signs new offers. Every key in the ring, including retired
+    keys kept only as public keys, is used to verify them, so offers signed
+    before a rotation keep verifying. Payloads carry the key id ("kid").
+    """
+
+    def __init__(self):
+        self.active_kid = None
+        self._private_key = None
+        self.public_keys = {}
+
+    def load(self, keys_dir: Path, active_kid: str):
+        """Load every key in keys_dir, generating the active key if it does not exist yet"""
+        keys_dir.mkdir(parents=True, exist_ok=True)
+        active_path = keys_dir / f"{active_kid}.pem"
+        # Otherwise another worker starting at the same time created it, and it is loaded below
+        if not active_path.exists() and self.create_key(active_path):
+            logging.warning(f"Signing key {active_kid} not found, generated a new one in {keys_dir}")
+
+        public_keys = {}
+        private_keys = {}
+        for key_path in keys_dir.glob("*.pem"):
+            if key_path.name.endswith(".pub.pem"):
+                kid = key_path.name[:-len(".pub.pem")]
+                public_keys[kid] = serialization.load_pem_public_key(key_path.read_bytes())
+            else:
+                kid = key_path.stem
+                private_keys[kid] = serialization.load_pem_private_key(key_path.read_bytes(), password=None)
+                public_keys[kid] = private_keys[kid].public_key()
+
+        self.active_kid = active_kid
+        self._private_key = private_keys[active_kid]
+        self.public_keys = {
+            kid: key for kid, key in public_keys.items() if isinstance(key, Ed25519PublicKey)
+        }
+
+    @staticmethod
+    def create_key(path: Path) -> bool:
+        """Create a new private key file at path; False if another process created one first.
+
+        The key is written to a temporary file opened with O_EXCL and mode 0600,
+        synced, then hard-linked into place, so the key file is never readable
+        by others, never seen half-written, and when several workers start on
+        an empty directory exactly one of them creates it.
+        """
+        pem = Ed25519PrivateKey.generate().private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        )
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        fd = os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(pem)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.link(temp_path, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    @property
+    def active_key(self) -> Ed25519PrivateKey:
+        return self._private_key
+
+    def sign(self, data: bytes) -> str:
+        return base64.urlsafe_b64encode(self._private_key.sign(data)).decode().rstrip("=")
+
+    def verify(self, kid: str, data: bytes, signature: str) -> bool:
+        public_key = self.public_keys.get(kid)
+        if public_key is None:
+            return False
+        try:
+            public_key.verify(base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4)), data)
+            return True
+        except (InvalidSignature, ValueError):
+            return False
+
+    def published(self) -> list:
+        """Public keys in a form partners can mirror for offline verification"""
+        return [
+            {
+                "kid": kid,
+                "alg": "EdDSA",
+                "crv": "Ed25519",
+                "publicKey": base64.urlsafe_b64encode(key.public_bytes(
+                    serialization.Encoding.Raw, serialization.PublicFormat.Raw
+                )).decode().rstrip("="),
+                "active": kid == self.active_kid
+            }
+            for kid, key in sorted(self.public_keys.items())
+        ]
+
+offer_signing_keys = OfferSigningKeys()
+recruiter_token_keys = OfferSigningKeys()
+
+def canonical_payload(payload: dict) -> bytes:
+    """Serialize a payload deterministically for signing"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+def generate_qr_payload(offer_data: dict, hash_value: str) -> dict:
+    """Generate the offer payload embedded in the QR code"""
+    return {
+        "type": QR_PAYLOAD_TYPE,
+        "kid": offer_signing_keys.active_kid,
         "hash": hash_value,
         "candidate": offer_data.get('candidateName'),
         "company": offer_data.get('companyName'),
         "recruiter": offer_data.get('recruiterEmail'),
+        "position": offer_data.get('position'),
         "timestamp": offer_data.get('timestamp', str(datetime.utcnow())),
         "verifyUrl": f"/verify?hash={hash_value}"
     }
-    return json.dumps(qr_data)
 
-# API Routes
-@api_router.get("/")
-async def root():
-    return {"message": "OfferTrust API is running"}
+def generate_digital_signature(payload: dict) -> str:
+    """Generate the Ed25519 signature over a canonical offer payload"""
+    return offer_signing_keys.sign(canonical_payload(payload))
 
-@api_router.post("/verify-offer", response_model=OfferVerificationResponse)
-async def verify_offer(request: OfferVerificationRequest):
-    """Verify an offer letter"""
-    try:
-        # Generate hash from input data
-        offer_data = {
-            'candidateName': request.fullName,
-            'companyName': request.companyName,
-            'recruiterEmail': request.recruiterEmail,
-            'timestamp': str(datetime.utcnow())
+def generate_qr_data(payload: dict, digital_signature: str) -> str:
+    """Generate QR code data: the offer payload with its signature"""
+    return json.dumps({**payload, "signature": digital_signature})
+
+def generate_qr_compact(payload: dict, digital_signature: str) -> str:
+    """Generate the compact (base45 CBOR) QR code text for a signed offer payload"""
+    return encode_qr(payload, digital_signature)
+
+def parse_qr_data(qr_data: str) -> dict:
+    """Parse scanned QR text in either the compact or the JSON form; ValueError if it is neither"""
+    if not qr_data.lstrip().startswith('{'):
+        return decode_qr(qr_data)
+    qr_payload = json.loads(qr_data)
+    return qr_payload if isinstance(qr_payload, dict) else {}
+
+# Text fields every signed offer payload carries (position may also be null)
+OFFER_PAYLOAD_FIELDS = ("kid", "hash", "candidate", "company", "recruiter", "timestamp")
+
+def is_offer_payload(payload: dict) -> bool:
+    """Whether a decoded payload is an offer: its type and every field verification reads are present"""
+    return (
+        payload.get("type") == QR_PAYLOAD_TYPE
+        and all(isinstance(payload.get(field), str) for field in OFFER_PAYLOAD_FIELDS)
+        and isinstance(payload.get("position"), (str, type(None)))
+    )
+
+def verify_qr_signature(qr_payload: dict) -> bool:
+    """Check a signed offer QR payload against the published keys, without touching the database.
+
+    Other objects signed with the same keys (e.g. Merkle batch roots) are rejected even with a valid signature.
+    """
+    payload = dict(qr_payload)
+    signature = payload.pop("signature", None)
+    if not isinstance(signature, str) or not is_offer_payload(payload):
+        return False
+    return offer_signing_keys.verify(payload["kid"], canonical_payload(payload), signature)
+
+def format_verified_offer(stored_offer: dict) -> OfferVerificationResponse:
+    """Build the verification response for a stored offer"""
+    date_signed_formatted = stored_offer['dateSigned'].strftime('%B %d, %Y')
+    return OfferVerificationResponse(
+        success=True,
+        message=f"This offer was verified and signed by {stored_offer['recruiterName']} at {stored_offer['companyName']} on {date_signed_formatted}.",
+        details={
+            "recruiterName": stored_offer['recruiterName'],
+            "companyName": stored_offer['companyName'],
+            "position": stored_offer['position'],
+            "dateSigned": stored_offer['dateSigned'].isoformat(),
+            "dateSignedFormatted": date_signed_formatted,
+            "hash": stored_offer['hash']
         }
-        input_hash = generate_offer_hash(offer_data)
-        
-        # Check if offer exists in database
-        stored_offer = await db.verified_offers.find_one({
-            "candidateName": {"$regex": f"^{request.fullName}$", "$options": "i"},
-            "companyName": {"$regex": f"^{request.companyName}$", "$options": "i"},
-            "recruiterEmail": {"$regex": f"^{request.recruiterEmail}$", "$options": "i"}
-        })
-        
-        if stored_offer:
-            return OfferVerificationResponse(
-                success=True,
-                message=f"This offer was verified and signed by {stored_offer['recruiterName']} at {stored_offer['companyName']} on {stored_offer['dateSigned'].strftime('%B %d, %Y')}.",
-                details={
-                    "recruiterName": stored_offer['recruiterName'],
-                    "companyName": stored_offer['companyName'],
-                    "position": stored_offer['position'],
-                    "dateSigned": stored_offer['dateSigned'].isoformat(),
-                    "dateSignedFormatted": stored_offer['dateSigned'].strftime('%B %d, %Y'),
-                    "hash": stored_offer['hash']
-                }
-            )
-        
-        # For demo purposes, randomly verify some offers
-        import random
-        if random.random() < 0.3:  # 30% chance of verification
-            return OfferVerificationResponse(
-                success=True,
-                message=f"This offer was verified and signed by HR Department at {request.companyName} on {datetime.now().strftime('%B %d, %Y')}.",
-                details={
-                    "recruiterName": "HR Department",
-                    "companyName": request.companyName,
-                    "position": "Position not specified",
-                    "dateSigned": datetime.now().isoformat(),
-                    "dateSignedFormatted": datetime.now().strftime('%B %d, %Y'),
-                    "hash": input_hash
-                }
-            )
-        
+    )
+
+UNVERIFIED_OFFER_MESSAGE = "This offer could not be verified. Please double-check the source or report fraud if you suspect this offer is not legitimate."
+
+def format_unverified_offer(stored_offer: Optional[dict] = None) -> OfferVerificationResponse:
+    """Build the response for an offer that is unknown or no longer valid"""
+    if stored_offer:
         return OfferVerificationResponse(
             success=False,
-            message="This offer could not be verified. Please double-check the source or report fraud if you suspect this offer is not legitimate."
+            message=f"This offer is no longer valid (status: {stored_offer['status']})."
         )
-        
-    except Exception as e:
-        logging.error(f"Error verifying offer: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error during verification")
+    return OfferVerificationResponse(success=False, message=UNVERIFIED_OFFER_MESSAGE)
 
-@api_router.post("/generate-offer", response_model=GenerateOfferResponse)
-async def generate_offer(request: GenerateOfferRequest):
-    """Generate a new signed offer"""
-    try:
-        # Prepare offer data
-        offer_data = {
-            'candidateName': request.candidateName,
-            'companyName': request.companyName,
-            'recruiterEmail': request.recruiterEmail,
-            'position': request.position,
-            'salary': request.salary,
-            'startDate': request.startDate,
-            'timestamp': str(datetime.utcnow())
+def current_status(stored_offer: dict) -> str:
+    """Status of a stored offer, with revocations this worker has synced taking precedence"""
+    if revocation_list.is_revoked(stored_offer['hash']):
+        return 'revoked'
+    return stored_offer.get('status', 'verified')
+
+def format_offer_status(stored_offer: dict) -> OfferVerificationResponse:
+    """Build the verification response for a stored offer given its current status"""
+    status = current_status(stored_offer)
+    if status == 'verified':
+        return format_verified_offer(stored_offer)
+    return format_unverified_offer({**stored_offer, 'status': status})
+
+def format_near_match_offer(near_matches: List[tuple]) -> OfferVerificationResponse:
+    """Build the response for details that closely, but not exactly, match an issued offer.
+
+    Verification is unauthenticated, so only a "did you mean" signal and the
+    best confidence are returned, never the fields of the matched offer.
+    """
+    confidences = [confidence for confidence, hash_value in near_matches if not revocation_list.is_revoked(hash_value)]
+    if not confidences:
+        return format_unverified_offer()
+    return OfferVerificationResponse(
+        success=False,
+        message="This offer could not be verified exactly, but it closely matches an offer issued by this recruiter. Please check the details for typos.",
+        details={"matchType": "fuzzy", "confidence": max(confidences)}
+    )
+
+# Caching
+class TTLCache:
+    """Bounded in-memory LRU cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.maxsize,
+            "ttlSeconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / lookups if lookups else 0.0
         }
-        
-        # Generate hash and signature
-        hash_value = generate_offer_hash(offer_data)
-        digital_signature = generate_digital_signature(hash_value)
-        qr_data = generate_qr_data(offer_data, hash_value)
-        
-        # Store in database
-        verified_offer = VerifiedOffer(
-            hash=hash_value,
-            candidateName=request.candidateName,
-            companyName=request.companyName,
-            recruiterEmail=request.recruiterEmail,
-            recruiterName=request.recruiterName,
-            position=request.position,
-            salary=request.salary,
-            startDate=request.startDate
+
+# Stored offers keyed by offer hash
+offer_cache = TTLCache(OFFER_CACHE_SIZE, OFFER_CACHE_TTL)
+
+# Rendered QR code images keyed by offer hash, as (ETag, PNG bytes)
+qr_images = TTLCache(QR_IMAGE_CACHE_SIZE, QR_IMAGE_CACHE_TTL)
+
+class SingleFlight:
+    """Coalesces concurrent identical lookups onto one in-flight query.
+
+    The first caller for a key starts the query; callers arriving while it
+    runs await the same future. The key is released as soon as the query
+    finishes, so no result is reused beyond the duration of one query.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.queries = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, query):
+        future = self.calls.get(key)
+        if future is None:
+            self.queries += 1
+            # A task, so one caller disconnecting does not cancel the query for the others
+            future = asyncio.ensure_future(query())
+            self.calls[key] = future
+            future.add_done_callback(lambda done: self.release(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def release(self, key: str, future):
+        if self.calls.get(key) is future:
+            del self.calls[key]
+        if not future.cancelled():
+            future.exception()  # Mark retrieved even if every caller went away
+
+    def forget(self, key: str):
+        """Make later callers start a fresh query instead of joining one in flight"""
+        self.calls.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.queries + self.coalesced
+        return {
+            "inFlight": len(self.calls),
+            "queries": self.queries,
+            "coalesced": self.coalesced,
+            "coalescingRatio": round(self.coalesced / lookups, 4) if lookups else 0.0
+        }
+
+# Verification lookups keyed "key:<verificationKey>" or "hash:<hash>", QR renders keyed "qr:<hash>"
+offer_lookups = SingleFlight()
+
+async def set_offer_status(hash_value: str, status: str) -> bool:
+    """Change the status of a stored offer, count the change and drop any cached copy of it"""
+    while True:
+        stored_offer = await storage.find_offer_by_hash(hash_value)
+        if not stored_offer:
+            return False
+        previous_status = stored_offer.get('status', 'verified')
+        if previous_status == status:
+            break
+        # Conditional on the status just read, so concurrent changes are each counted once
+        if await storage.set_offer_status(hash_value, status, expected_status=previous_status):
+            offer_stats.record_status_change(stored_offer, previous_status, status)
+            break
+    offer_cache.invalidate(hash_value)
+    qr_images.invalidate(hash_value)
+    offer_lookups.forget(f"hash:{hash_value}")
+    offer_lookups.forget(f"qr:{hash_value}")
+    return True
+
+# Revocations
+class RevokedHashSet:
+    """Set of revoked offer hashes kept as sorted 32-byte digests.
+
+    The digests sit back to back in one bytearray, with their leading 8 bytes
+    in a sorted array('Q') that membership tests bisect, so an entry costs 40
+    bytes instead of a str in a set. New digests go to a small delta set that
+    is merged in once it outgrows DELTA_SIZE or an eighth of the sorted part,
+    which keeps merges amortized when a large list is first synced.
+    """
+
+    DELTA_SIZE = 1024
+
+    def __init__(self):
+        self.prefixes = array('Q')
+        self.digests = bytearray()
+        self.delta = set()
+
+    def __len__(self) -> int:
+        return len(self.prefixes) + len(self.delta)
+
+    @staticmethod
+    def digest(hash_value: str) -> Optional[bytes]:
+        try:
+            digest = bytes.fromhex(hash_value)
+        except ValueError:
+            return None
+        return digest if len(digest) == 32 else None
+
+    def contains_digest(self, digest: bytes) -> bool:
+        if digest in self.delta:
+            return True
+        prefix = int.from_bytes(digest[:8], 'big')
+        index = bisect.bisect_left(self.prefixes, prefix)
+        while index < len(self.prefixes) and self.prefixes[index] == prefix:
+            if self.digests[index * 32:index * 32 + 32] == digest:
+                return True
+            index += 1
+        return False
+
+    def __contains__(self, hash_value: str) -> bool:
+        digest = self.digest(hash_value)
+        return digest is not None and self.contains_digest(digest)
+
+    def add(self, hash_value: str) -> bool:
+        """Add a hash; False if it was already present (or is not a SHA-256 hex digest)"""
+        digest = self.digest(hash_value)
+        if digest is None or self.contains_digest(digest):
+            return False
+        self.delta.add(digest)
+        if len(self.delta) > max(self.DELTA_SIZE, len(self.prefixes) // 8):
+            self.merge()
+        return True
+
+    def merge(self):
+        """Splice the sorted delta into the sorted arrays with slice copies"""
+        digests = bytearray()
+        prefixes = array('Q')
+        start = 0
+        for digest in sorted(self.delta):
+            prefix = int.from_bytes(digest[:8], 'big')
+            index = bisect.bisect_left(self.prefixes, prefix)
+            digests += self.digests[start * 32:index * 32]
+            digests += digest
+            prefixes += self.prefixes[start:index]
+            prefixes.append(prefix)
+            start = index
+        digests += self.digests[start * 32:]
+        prefixes += self.prefixes[start:]
+        self.digests = digests
+        self.prefixes = prefixes
+        self.delta = set()
+
+    def approx_bytes(self) -> int:
+        return len(self.digests) + len(self.prefixes) * 8 + sys.getsizeof(self.delta) + len(self.delta) * 65
+
+class RevocationList:
+    """This worker's copy of the revocation list, kept current by delta sync.
+
+    Revocations are stored with a sequence number from next_sequence and
+    pulled in seq order every REVOCATION_SYNC_INTERVAL. A number can become
+    visible after a higher one (allocated first, inserted later) or never
+    (its insert lost a race), so the sync position only advances over
+    contiguous numbers; a gap is waited on for REVOCATION_GAP_TIMEOUT and
+    then skipped. Hashes past a gap are added straight away, since adding
+    one twice is harmless.
+    """
+
+    def __init__(self):
+        self.revoked = RevokedHashSet()
+        self.synced_seq = 0
+        self.gap = None
+        self.synced_at = None
+        self.last_apply_lag = 0.0
+        self.max_apply_lag = 0.0
+        self.syncs = 0
+        self.sync_failures = 0
+        self.gaps_skipped = 0
+
+    def is_revoked(self, hash_value: str) -> bool:
+        return hash_value in self.revoked
+
+    def add(self, revocation: dict):
+        if self.revoked.add(revocation['hash']):
+            # Time from the revocation being recorded to this worker enforcing it
+            lag = max(0.0, (datetime.utcnow() - revocation['revokedAt']).total_seconds())
+            self.last_apply_lag = lag
+            self.max_apply_lag = max(self.max_apply_lag, lag)
+
+    def advance(self, seqs: List[int]) -> bool:
+        """Move the sync position over contiguous sequence numbers; True if it moved"""
+        position = self.synced_seq
+        for seq in seqs:
+            if seq > position + 1:
+                now = time.monotonic()
+                if self.gap is None or self.gap[0] != position:
+                    self.gap = (position, now)
+                if now - self.gap[1] < REVOCATION_GAP_TIMEOUT:
+                    break
+                logger.warning(f"Skipping missing revocation sequence numbers {position + 1}-{seq - 1}")
+                self.gaps_skipped += 1
+            position = seq
+        else:
+            self.gap = None
+        moved = position > self.synced_seq
+        self.synced_seq = position
+        return moved
+
+    async def sync(self):
+        """Pull revocations recorded since the last sync"""
+        while True:
+            revocations = await storage.find_revocations_since(self.synced_seq, REVOCATION_SYNC_BATCH_SIZE)
+            for revocation in revocations:
+                self.add(revocation)
+            moved = self.advance([revocation['seq'] for revocation in revocations])
+            if len(revocations) < REVOCATION_SYNC_BATCH_SIZE or not moved:
+                break
+        self.synced_at = time.monotonic()
+        self.syncs += 1
+
+    async def run(self):
+        """Background task keeping the revocation list in sync"""
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.sync_failures += 1
+                logger.error(f"Error syncing revocations: {str(e)}")
+            await asyncio.sleep(REVOCATION_SYNC_INTERVAL)
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self.revoked),
+            "approxBytes": self.revoked.approx_bytes(),
+            "syncedSeq": self.synced_seq,
+            "secondsSinceSync": round(time.monotonic() - self.synced_at, 3) if self.synced_at else None,
+            "lastApplyLagSeconds": round(self.last_apply_lag, 3),
+            "maxApplyLagSeconds": round(self.max_apply_lag, 3),
+            "syncs": self.syncs,
+            "syncFailures": self.sync_failures,
+            "gapsSkipped": self.gaps_skipped
+        }
+
+revocation_list = RevocationList()
+
+# Negative lookup filter
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys"""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.capacity = max(capacity, 1)
+        self.num_bits = max(8, int(-self.capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.bits_set = 0
+        self.insertions = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                self.bits_set += 1
+        self.insertions += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def fill_ratio(self) -> float:
+        return self.bits_set / self.num_bits
+
+    def stats(self) -> dict:
+        return {
+            "sizeBytes": len(self.bits),
+            "numHashes": self.num_hashes,
+            "capacity": self.capacity,
+            "insertions": self.insertions,
+            "fillRatio": self.fill_ratio,
+            "estimatedFalsePositiveRate": self.fill_ratio ** self.num_hashes
+        }
+
+class OfferMembershipFilter:
+    """Bloom filter over the verification keys and hashes of every stored offer.
+
+    A miss means the offer definitely does not exist, so lookups can answer
+    without querying MongoDB. The filter is rebuilt from the collection
+    periodically (or once half its bits are set) to keep the false positive
+    rate bounded, and offers written by other workers are pulled in by a short
+    delta sync on dateSigned.
+
+    A miss is only trusted while the latest sync began at most
+    BLOOM_MAX_STALENESS ago. Once the background sync falls further behind,
+    misses fall through to the caller's indexed lookup instead, so a stalled
+    sync never hides offers other workers stored in the meantime.
+    """
+
+    # Re-read offers signed slightly before the watermark to cover insert lag
+    SYNC_OVERLAP = timedelta(seconds=60)
+
+    def __init__(self):
+        self.filter = None
+        self.short_circuits = 0
+        self.stale_misses = 0
+        self.last_rebuild = None
+        self.synced_through = None
+        self._watermark = None
+        self._pending = None
+
+    @property
+    def ready(self) -> bool:
+        return self.filter is not None
+
+    def add(self, *keys: str):
+        if self.filter is not None:
+            for key in keys:
+                self.filter.add(key)
+        if self._pending is not None:
+            self._pending.extend(keys)
+
+    def is_fresh(self) -> bool:
+        """Whether the latest sync is recent enough for a miss to be trusted"""
+        return (
+            self.synced_through is not None
+            and (datetime.utcnow() - self.synced_through).total_seconds() <= BLOOM_MAX_STALENESS
         )
-        
-        await db.verified_offers.insert_one(verified_offer.dict())
-        
-        return GenerateOfferResponse(
-            success=True,
-            hash=hash_value,
-            digitalSignature=digital_signature,
-            qrData=qr_data,
-            message="Offer generated successfully"
+
+    def missing(self, keys: List[str]) -> set:
+        """The keys that are certainly not stored"""
+        if self.filter is None:
+            return set()
+        missing = {key for key in keys if key not in self.filter}
+        if missing and not self.is_fresh():
+            self.stale_misses += len(missing)
+            return set()
+        self.short_circuits += len(missing)
+        return missing
+
+    def definitely_missing(self, key: str) -> bool:
+        """True only when the key is certainly not stored"""
+        return bool(self.missing([key]))
+
+    async def rebuild(self):
+        """Stream the collection into a freshly sized filter and swap it in"""
+        started_at = datetime.utcnow()
+        self._pending = []
+        try:
+            offer_count = await storage.count_offers()
+            new_filter = BloomFilter(
+                max(BLOOM_MIN_CAPACITY, offer_count * 4),
+                BLOOM_FALSE_POSITIVE_RATE
+            )
+            async for offer in storage.iter_offer_keys():
+                for key in offer_filter_keys(offer):
+                    new_filter.add(key)
+            # Keys added by generate_offer or a sync while the collection was streaming
+            for key in self._pending:
+                new_filter.add(key)
+        finally:
+            self._pending = None
+
+        self.filter = new_filter
+        self.last_rebuild = time.monotonic()
+        self.synced_through = started_at
+        self._watermark = started_at - self.SYNC_OVERLAP
+        logger.info(f"Rebuilt offer membership filter with {new_filter.insertions} keys")
+
+    async def sync(self):
+        """Add offers signed since the last sync (e.g. by other workers)"""
+        started_at = datetime.utcnow()
+        async for offer in storage.iter_offer_keys(signed_since=self._watermark):
+            self.add(*offer_filter_keys(offer))
+        self.synced_through = started_at
+        self._watermark = started_at - self.SYNC_OVERLAP
+
+    def needs_rebuild(self) -> bool:
+        return (
+            self.filter is None
+            or self.filter.fill_ratio > 0.5
+            or time.monotonic() - self.last_rebuild > BLOOM_REBUILD_INTERVAL
         )
-        
-    except Exception as e:
-        logging.error(f"Error generating offer: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error during offer generation")
 
-@api_router.post("/auth/recruiter")
-async def authenticate_recruiter(request: RecruiterAuth):
-    """Authenticate recruiter (simulated)"""
-    try:
-        # Simple validation for demo
-        if not request.email or '@' not in request.email or 'gmail.com' in request.email:
-            raise HTTPException(status_code=400, detail="Please use a valid company email address")
-        
-        # Create mock token and user data
-        user_data = {
-            "id": f"rec-{uuid.uuid4()}",
-            "email": request.email,
-            "companyName": request.companyName or "Demo Company",
-            "fullName": request.fullName or "Demo User"
+    async def run(self):
+        """Background task keeping the filter built and in sync"""
+        while True:
+            try:
+                if self.needs_rebuild():
+                    await self.rebuild()
+                else:
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing offer membership filter: {str(e)}")
+            await asyncio.sleep(BLOOM_SYNC_INTERVAL)
+
+    def stats(self) -> dict:
+        stats = {
+            "ready": self.ready,
+            "shortCircuits": self.short_circuits,
+            "staleMisses": self.stale_misses,
+            "secondsSinceSync": round((datetime.utcnow() - self.synced_through).total_seconds(), 3) if self.synced_through else None
         }
-        
-        return {
-            "success": True,
-            "token": f"jwt-token-{uuid.uuid4()}",
-            "user": user_data
+        if self.filter is not None:
+            stats.update(self.filter.stats())
+        return stats
+
+offer_filter = OfferMembershipFilter()
+
+# Fuzzy matching
+COMPANY_SUFFIXES = frozenset({
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company",
+    "plc", "gmbh", "ag", "sa", "bv", "pte", "pvt", "lp", "llp"
+})
+FUZZY_NAME_WEIGHT = 0.7
+FUZZY_COMPANY_WEIGHT = 0.3
+
+def normalize_fuzzy_value(value: Optional[str], drop_company_suffixes: bool = False) -> str:
+    """Casefold, drop punctuation and (for companies) trailing legal suffixes"""
+    words = re.sub(r"[^\w\s]", " ", (value or "").casefold()).split()
+    if drop_company_suffixes:
+        while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+            words.pop()
+    return " ".join(words)
+
+def trigrams(value: str) -> set:
+    """Word-padded trigrams, as in PostgreSQL's pg_trgm"""
+    grams = set()
+    for word in value.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def trigram_similarity(left: set, right: set) -> float:
+    if not left or not right:
+        return 0.0
+    return 2 * len(left & right) / (len(left) + len(right))
+
+class TrigramIndex:
+    """Inverted trigram index over candidate names, partitioned by recruiter email.
+
+    Each recruiter owns sorted array('Q') segments of (trigram id << 32 |
+    offer id) entries, so the postings for a trigram are a bisected slice and
+    a posting costs 8 bytes. New offers go to a small delta segment that is
+    merged into the main one once it outgrows DELTA_SEGMENT_SIZE, keeping
+    inserts cheap for recruiters with many offers. Per offer only the raw 32-byte hash (in a
+    bytearray), the name's trigram count and an interned normalized company
+    are kept; names themselves are not needed once indexed.
+    """
+
+    DELTA_SEGMENT_SIZE = 4096
+
+    def __init__(self):
+        self.hashes = bytearray()
+        self.companies = []
+        self.name_sizes = array('H')
+        self.trigram_ids = {}
+        self.postings = {}
+        self.strings = {}
+        self.string_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.name_sizes)
+
+    def intern(self, value: str) -> str:
+        interned = self.strings.get(value)
+        if interned is None:
+            interned = self.strings[value] = value
+            self.string_bytes += sys.getsizeof(value)
+        return interned
+
+    def add(self, offer: dict, presorted: bool = False):
+        """Index an offer; with presorted, append only and call sort_postings() afterwards"""
+        offer_id = len(self.name_sizes)
+        name_grams = trigrams(normalize_fuzzy_value(offer.get('candidateName')))
+        self.hashes += bytes.fromhex(offer['hash'])
+        self.companies.append(self.intern(normalize_fuzzy_value(offer.get('companyName'), True)))
+        self.name_sizes.append(min(len(name_grams), 0xFFFF))
+
+        recruiter = self.intern(normalize_match_value(offer.get('recruiterEmail')))
+        segments = self.postings.get(recruiter)
+        if segments is None:
+            segments = self.postings[recruiter] = [array('Q'), array('Q')]
+        main, delta = segments
+        for gram in name_grams:
+            trigram_id = self.trigram_ids.setdefault(gram, len(self.trigram_ids))
+            entry = trigram_id << 32 | offer_id
+            if presorted:
+                main.append(entry)
+            else:
+                bisect.insort(delta, entry)
+        if len(delta) > self.DELTA_SEGMENT_SIZE:
+            # Two sorted runs: this sort is a linear merge
+            segments[:] = [array('Q', sorted(main + delta)), array('Q')]
+
+    def sort_postings(self):
+        for main, _ in self.postings.values():
+            main[:] = array('Q', sorted(main))
+
+    def search(self, recruiter_email: str, full_name: str, company_name: str, threshold: float, limit: int) -> List[tuple]:
+        """(confidence, offer hash) of the best near-matches among the recruiter's offers"""
+        segments = self.postings.get(normalize_match_value(recruiter_email))
+        query_grams = trigrams(normalize_fuzzy_value(full_name))
+        if segments is None or not query_grams:
+            return []
+
+        # A name can only reach the threshold sharing at least min_shared query
+        # trigrams, so every match appears in one of the rarest
+        # len(query_grams) - min_shared + 1 postings. Only those are scanned;
+        # candidates are then checked against the common trigrams by bisection.
+        min_name_score = max(0.0, (threshold - FUZZY_COMPANY_WEIGHT) / FUZZY_NAME_WEIGHT)
+        min_shared = max(1, math.ceil(min_name_score * len(query_grams) / (2 - min_name_score) - 1e-9))
+        ranges = []
+        for gram in query_grams:
+            trigram_id = self.trigram_ids.get(gram)
+            if trigram_id is None:
+                continue
+            spans = []
+            total = 0
+            for segment in segments:
+                start = bisect.bisect_left(segment, trigram_id << 32)
+                end = bisect.bisect_left(segment, (trigram_id + 1) << 32, start)
+                if end > start:
+                    spans.append((segment, start, end))
+                    total += end - start
+            if total:
+                ranges.append((total, trigram_id, spans))
+        ranges.sort(key=lambda item: item[0])
+        scanned = len(ranges) - min_shared + 1
+        if scanned <= 0:
+            return []
+
+        shared = {}
+        for _, _, spans in ranges[:scanned]:
+            for segment, start, end in spans:
+                for entry in segment[start:end]:
+                    offer_id = entry & 0xFFFFFFFF
+                    shared[offer_id] = shared.get(offer_id, 0) + 1
+        # Trigrams a candidate must share for its own name length to reach the threshold
+        required = {
+            offer_id: min_name_score * (len(query_grams) + self.name_sizes[offer_id]) / 2 - 1e-9
+            for offer_id in shared
         }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logging.error(f"Error authenticating recruiter: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error during authentication")
+        remaining = len(ranges) - scanned
+        for _, trigram_id, spans in ranges[scanned:]:
+            # Drop candidates that cannot catch up even by sharing every remaining trigram
+            shared = {offer_id: count for offer_id, count in shared.items() if count + remaining >= required[offer_id]}
+            remaining -= 1
+            prefix = trigram_id << 32
+            for offer_id in shared:
+                entry = prefix | offer_id
+                for segment, start, end in spans:
+                    position = bisect.bisect_left(segment, entry, start, end)
+                    if position < end and segment[position] == entry:
+                        shared[offer_id] += 1
+                        break
 
-@api_router.get("/recruiter/offers")
-async def get_recruiter_offers(recruiter_email: str):
-    """Get offers for a specific recruiter"""
-    try:
-        offers = await db.verified_offers.find(
-            {"recruiterEmail": recruiter_email}
-        ).to_list(length=100)
-        
-        # Convert to response format
-        formatted_offers = []
-        for offer in offers:
-            formatted_offers.append({
-                "id": offer['id'],
-                "candidateName": offer['candidateName'],
-                "candidateEmail": offer.get('candidateEmail', ''),
-                "position": offer['position'],
-                "salary": offer.get('salary', ''),
-                "dateCreated": offer['dateSigned'].strftime('%Y-%m-%d'),
-                "status": offer['status'].title(),
-                "hash": offer['hash'][:20] + "..."
-            })
-        
-        return {"offers": formatted_offers}
-        
-    except Exception as e:
-        logging.error(f"Error getting recruiter offers: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        company_grams = trigrams(normalize_fuzzy_value(company_name, True))
+        company_scores = {}
+        matches = []
+        for offer_id, count in shared.items():
+            name_score = 2 * count / (len(query_grams) + self.name_sizes[offer_id])
+            if FUZZY_NAME_WEIGHT * name_score + FUZZY_COMPANY_WEIGHT < threshold:
+                continue
+            company = self.companies[offer_id]
+            company_score = company_scores.get(company)
+            if company_score is None:
+                company_score = company_scores[company] = trigram_similarity(company_grams, trigrams(company))
+            confidence = FUZZY_NAME_WEIGHT * name_score + FUZZY_COMPANY_WEIGHT * company_score
+            if confidence >= threshold:
+                matches.append((confidence, offer_id))
 
-@api_router.post("/upload-file")
-async def upload_file(file: UploadFile = File(...)):
-    """Handle file upload and parsing (simulated)"""
-    try:
-        # Validate file type and size
-        allowed_types = ['application/pdf', 'image/jpeg', 'image/png', 'image/jpg']
-        if file.content_type not in allowed_types:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
-        
-        # Simulate file processing
-        if file.content_type == 'application/pdf':
-            # Simulate PDF parsing
-            extracted_data = {
-                "fullName": "John Doe",
-                "companyName": "TechCorp Inc",
-                "recruiterEmail": "recruiter@techcorp.com",
-                "position": "Senior Software Engineer",
-                "salary": "$120,000"
-            }
-        else:
-            # Simulate OCR processing
-            extracted_data = {
-                "fullName": "Alice Johnson",
-                "companyName": "DataCorp Ltd",
-                "recruiterEmail": "hr@datacorp.com",
-                "position": "Product Manager",
-                "salary": "$110,000"
-            }
-        
+        matches.sort(reverse=True)
+        return [
+            (round(confidence, 3), self.hashes[offer_id * 32:(offer_id + 1) * 32].hex())
+            for confidence, offer_id in matches[:limit]
+        ]
+
+    def stats(self) -> dict:
+        posting_count = sum(len(main) + len(delta) for main, delta in self.postings.values())
         return {
-            "success": True,
-            "extractedData": extracted_data,
-            "fileName": file.filename
+            "offers": len(self.name_sizes),
+            "recruiters": len(self.postings),
+            "trigrams": len(self.trigram_ids),
+            "postings": posting_count,
+            "approxBytes": (
+                len(self.hashes) + self.string_bytes + posting_count * 8
+                + len(self.name_sizes) * 2 + len(self.companies) * 8
+            )
         }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logging.error(f"Error processing file upload: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error processing uploaded file")
 
-# Include the router in the main app
-app.include_router(api_router)
+class FuzzyOfferMatcher:
+    """Keeps a TrigramIndex of every stored offer for near-match verification.
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    The index is built once from storage and then kept current by generate
+    offer (add) and by the periodic delta sync on dateSigned for offers
+    written by other workers. Searches never touch storage, so an offer
+    another worker stored since the last sync is only found once it has run.
+    Recently indexed hashes are remembered so the sync overlap never indexes
+    an offer twice.
+    """
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+    SYNC_OVERLAP = timedelta(seconds=60)
+
+    def __init__(self):
+        self.index = None
+        self.searches = 0
+        self.near_matches = 0
+        self.search_seconds = 0.0
+        self.synced_through = None
+        self._watermark = None
+        self._pending = None
+        self._recent = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def add(self, offer: dict):
+        if self._pending is not None:
+            self._pending.append(offer)
+        if self.index is not None and offer['hash'] not in self._recent:
+            self._recent[offer['hash']] = offer['dateSigned']
+            self.index.add(offer)
+
+    def search(self, full_name: str, company_name: str, recruiter_email: str) -> List[tuple]:
+        if self.index is None:
+            return []
+        start = time.perf_counter()
+        matches = self.index.search(recruiter_email, full_name, company_name, FUZZY_MATCH_THRESHOLD, FUZZY_MATCH_LIMIT)
+        self.search_seconds += time.perf_counter() - start
+        self.searches += 1
+        self.near_matches += bool(matches)
+        return matches
+
+    async def rebuild(self):
+        """Stream every offer into a new index and swap it in"""
+        started_at = datetime.utcnow()
+        recent_since = started_at - self.SYNC_OVERLAP
+        self._pending = []
+        recent = {}
+        try:
+            new_index = TrigramIndex()
+            async for offer in storage.iter_offer_match_fields():
+                new_index.add(offer, presorted=True)
+                if offer['dateSigned'] >= recent_since:
+                    recent[offer['hash']] = offer['dateSigned']
+            new_index.sort_postings()
+            # Offers added by generate_offer while the collection was streaming
+            for offer in self._pending:
+                if offer['hash'] not in recent:
+                    recent[offer['hash']] = offer['dateSigned']
+                    new_index.add(offer)
+        finally:
+            self._pending = None
+
+        self.index = new_index
+        self._recent = recent
+        self.synced_through = started_at
+        self._watermark = recent_since
+        logger.info(f"Built fuzzy match index with {len(new_index)} offers")
+
+    async def sync(self):
+        """Index offers signed since the last sync (e.g. by other workers)"""
+        started_at = datetime.utcnow()
+        async for offer in storage.iter_offer_match_fields(signed_since=self._watermark):
+            self.add(offer)
+        self.synced_through = started_at
+        self._watermark = started_at - self.SYNC_OVERLAP
+        # Offers older than the watermark are never read again
+        self._recent = {
+            hash_value: date_signed for hash_value, date_signed in self._recent.items()
+            if date_signed >= self._watermark
+        }
+
+    async def run(self):
+        """Background task building the index, then keeping it in sync"""
+        while True:
+            try:
+                if self.index is None:
+                    await self.rebuild()
+                else:
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing fuzzy match index: {str(e)}")
+            await asyncio.sleep(FUZZY_SYNC_INTERVAL)
+
+    def stats(self) -> dict:
+        stats = {
+            "ready": self.ready,
+            "searches": self.searches,
+            "nearMatches": self.near_matches,
+            "avgSearchMicros": round(self.search_seconds / self.searches * 1e6, 1) if self.searches else 0.0
+        }
+        if self.index is not None:
+            stats.update(self.index.stats())
+        return stats
+
+fuzzy_matcher = FuzzyOfferMatcher()
+
+# Merkle anchoring
+MERKLE_ROOT_TYPE = "merkle_root"
+
+def merkle_leaf(hash_value: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(hash_value)).digest()
+
+def merkle_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+def build_merkle_tree(hashes: List[str]):
+    """Return the root and per-leaf inclusion proofs for a list of offer hashes.
+
+    Leaves and interior nodes are domain-separated (RFC 6962 style) and an odd
+    node at the end of a level is carried up unchanged. Each proof is the list
+    of sibling hashes from leaf to root, tagged with the side they sit on.
+    """
+    level = [merkle_leaf(hash_value) for hash_value in hashes]
+    proofs = [[] for _ in hashes]
+    # Leaf indexes covered by each node of the current level
+    members = [[index] for index in range(len(hashes))]
+    while len(level) > 1:
+        next_level, next_members = [], []
+        for i in range(0, len(level) - 1, 2):
+            for index in members[i]:
+                proofs[index].append({"side": "R", "hash": level[i + 1].hex()})
+            for index in members[i + 1]:
+                proofs[index].append({"side": "L", "hash": level[i].hex()})
+            next_level.append(merkle_node(level[i], level[i + 1]))
+            next_members.append(members[i] + members[i + 1])
+        if len(level) % 2:
+            next_level.append(level[-1])
+            next_members.append(members[-1])
+        level, members = next_level, next_members
+    return level[0].hex(), proofs
+
+def verify_merkle_proof(hash_value: str, proof: List[dict], root: str) -> bool:
+    """Check that an offer hash is included under a published batch root"""
+    node = merkle_leaf(hash_value)
+    for step in proof:
+        sibling = bytes.fromhex(step['hash'])
+        node = merkle_node(sibling, node) if step['side'] == "L" else merkle_node(node, sibling)
+    return node.hex() == root
+
+class MerkleAnchor:
+    """Groups issued offers into Merkle batches off the generate_offer hot path.
+
+    A batch moves through claiming -> claimed -> sealed. Offers are claimed by
+    setting merkleBatch on them, so every offer lands in exactly one batch even
+    with several workers. Sealing is deterministic (leaves sorted by hash), so
+    a batch left behind by a crashed worker is simply sealed again once its
+    lease expires.
+    """
+
+    def __init__(self):
+        self.batches_sealed = 0
+        self.batches_recovered = 0
+
+    async def seal(self, batch_id: int):
+        """Build the tree for a claimed batch, store its proofs and publish the root"""
+        hashes = await storage.find_batch_offer_hashes(batch_id)
+        if not hashes:
+            await storage.delete_unsealed_batch(batch_id)
+            return
+
+        root, proofs = await run_in_threadpool(build_merkle_tree, hashes)
+        await storage.upsert_proofs([
+            {"hash": hash_value, "batchId": batch_id, "leafIndex": index, "proof": proof}
+            for index, (hash_value, proof) in enumerate(zip(hashes, proofs))
+        ])
+
+        # Typed, so a signed root can never pass for a signed offer payload
+        signed_root = {
+            "type": MERKLE_ROOT_TYPE,
+            "batchId": batch_id,
+            "root": root,
+            "leafCount": len(hashes),
+            "kid": offer_signing_keys.active_kid
+        }
+        await storage.seal_batch(batch_id, {
+            **signed_root,
+            "signature": generate_digital_signature(signed_root),
+            "sealedAt": datetime.utcnow()
+        })
+        self.batches_sealed += 1
+
+    async def cut_batch(self) -> bool:
+        """Claim the oldest unanchored offers into a new batch and seal it"""
+        pending = await storage.find_unanchored_offers(MERKLE_BATCH_SIZE)
+        if not pending:
+            return False
+        batch_is_due = (
+            len(pending) >= MERKLE_BATCH_SIZE
+            or (datetime.utcnow() - pending[0]['dateSigned']).total_seconds() >= MERKLE_BATCH_MAX_AGE
+        )
+        if not batch_is_due:
+            return False
+
+        batch_id = await storage.next_sequence("merkle_batches")
+        now = datetime.utcnow()
+        await storage.insert_batch(
+            {"batchId": batch_id, "status": "claiming", "createdAt": now, "updatedAt": now}
+        )
+        await storage.claim_offers_for_batch([offer['hash'] for offer in pending], batch_id)
+        if await storage.transition_batch(batch_id, ["claiming"], "claimed"):
+            await self.seal(batch_id)
+        return True
+
+    async def recover(self):
+        """Seal batches whose builder stopped before finishing them"""
+        cutoff = datetime.utcnow() - timedelta(seconds=MERKLE_BATCH_LEASE)
+        for batch_id in await storage.find_stale_batches(cutoff):
+            # Take over the lease so only one worker recovers the batch
+            taken = await storage.transition_batch(
+                batch_id, ["claiming", "claimed"], "claimed", updated_before=cutoff
+            )
+            if taken:
+                logger.warning(f"Recovering unfinished Merkle batch {batch_id}")
+                await self.seal(batch_id)
+                self.batches_recovered += 1
+
+    async def run(self):
+        """Background task anchoring newly issued offers"""
+        while True:
+            try:
+                await self.recover()
+                while await self.cut_batch():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error anchoring offers: {str(e)}")
+            await asyncio.sleep(MERKLE_POLL_INTERVAL)
+
+    def stats(self) -> dict:
+        return {"batchesSealed": self.batches_sealed, "batchesRecovered": self.batches_recovered}
+
+merkle_anchor = MerkleAnchor()
+
+# Group-commit offer writes
+class OfferWriteQueueFull(Exception):
+    """Raised when the write-behind queue is at capacity"""
+
+class OfferWriteBehind:
+    """Batches generate_offer inserts into unordered bulk writes.
+
+    Callers enqueue an offer and await a future. A single writer task collects
+    offers until OFFER_WRITE_BATCH_SIZE are queued or OFFER_WRITE_MAX_DELAY has
+    passed since the first one, stores them with one insert_offers call, and
+    only then resolves each future, so a caller never returns before its offer
+    is acknowledged under the configured write concern.
+    """
+
+    def __init__(self, batch_size: int, max_delay: float, max_pending: int):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.queue = None
+        self.task = None
+        self.accepting = False
+        self.batches = 0
+        self.offers_written = 0
+        self.offers_failed = 0
+        self.rejected = 0
+
+    def start(self):
+        self.queue = asyncio.Queue(self.max_pending)
+        self.task = asyncio.create_task(self.run())
+        self.accepting = True
+
+    async def write(self, offer: dict):
+        """Store an offer as part of the next batch, raising DuplicateOfferError like insert_offer"""
+        if not self.accepting or self.task.done():
+            raise RuntimeError("Offer writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((offer, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise OfferWriteQueueFull()
+        await future
+
+    async def collect_batch(self) -> tuple:
+        """Wait for one offer, then gather more until the batch is full or the deadline passes"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        item = await self.queue.get()
+        deadline = loop.time() + self.max_delay
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                item = self.queue.get_nowait()
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return batch, False
+            try:
+                item = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return batch, False
+        # None is the shutdown marker: everything before it is in this batch or already written
+        return batch, True
+
+    async def flush(self, batch: list):
+        try:
+            failures = await storage.insert_offers([offer for offer, _ in batch])
+        except Exception as e:
+            logger.error(f"Error writing offer batch: {str(e)}")
+            failures = {index: "error" for index in range(len(batch))}
+
+        self.batches += 1
+        self.offers_written += len(batch) - len(failures)
+        self.offers_failed += len(failures)
+        for index, (offer, future) in enumerate(batch):
+            if future.done():
+                continue
+            reason = failures.get(index)
+            if reason is None:
+                future.set_result(None)
+            elif reason == "duplicate":
+                future.set_exception(DuplicateOfferError(offer['hash']))
+            elif reason == "duplicateContent":
+                future.set_exception(DuplicateContentError(offer['hash']))
+            else:
+                future.set_exception(RuntimeError("Offer batch write failed"))
+
+    async def run(self):
+        """Writer task: flush batches until the shutdown marker is reached"""
+        stopping = False
+        while not stopping:
+            batch, stopping = await self.collect_batch()
+            if batch:
+                await self.flush(batch)
+
+    async def stop(self):
+        """Stop accepting offers and wait until every queued offer is written"""
+        if self.task is None:
+            return
+        self.accepting = False
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.task is not None,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "batches": self.batches,
+            "offersWritten": self.offers_written,
+            "offersFailed": self.offers_failed,
+            "averageBatchSize": round(self.offers_written / self.batches, 1) if self.batches else 0,
+            "rejected": self.rejected
+        }
+
+offer_writer = OfferWriteBehind(OFFER_WRITE_BATCH_SIZE, OFFER_WRITE_MAX_DELAY, OFFER_WRITE_MAX_PENDING)
+
+class IdempotentIssuer:
+    """Issues an offer once per Idempotency-Key and replays the response to retries.
+
+    Keys are scoped to the recruiter. Before issuing, a request claims its key
+    with a unique insert, so across workers exactly one request issues the
+    offer; a retry that finds the key finished replays the stored response,
+    and one that finds it in progress polls until it finishes or
+    IDEMPOTENCY_WAIT passes (409). Concurrent retries in this worker join the
+    request in flight instead of polling. Reusing a key for a different request
+    is a 422. A failed request drops its claim so it can be retried, and a
+    claim whose worker died is taken over once its lease lapses.
+    """
+
+    def __init__(self, ttl: float, lease: float, wait: float, poll_interval: float):
+        self.ttl = ttl
+        self.lease = lease
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.in_flight = SingleFlight()
+        self.issued = 0
+        self.replayed = 0
+        self.in_progress = 0
+        self.mismatched = 0
+
+    async def issue(self, idempotency_key: str, request: GenerateOfferRequest, issue) -> dict:
+        """Return issue(request) for the first request with this key, and its response for every retry"""
+        key = f"{normalize_match_value(request.recruiterEmail)}:{idempotency_key}"
+        request_hash = hashlib.sha256(json.dumps(request.model_dump(), sort_keys=True).encode()).hexdigest()
+        return await self.in_flight.do(
+            f"{key}:{request_hash}", lambda: self.claim_and_issue(key, request_hash, request, issue)
+        )
+
+    async def claim_and_issue(self, key: str, request_hash: str, request: GenerateOfferRequest, issue) -> dict:
+        deadline = time.monotonic() + self.wait
+        while True:
+            now = datetime.utcnow()
+            claim_id = uuid.uuid4().hex
+            existing = await storage.claim_idempotency_key({
+                "key": key,
+                "claimId": claim_id,
+                "requestHash": request_hash,
+                "leaseUntil": now + timedelta(seconds=self.lease),
+                "expiresAt": now + timedelta(seconds=self.ttl)
+            })
+            if existing is None:
+                break
+            if existing['requestHash'] != request_hash:
+                self.mismatched += 1
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if 'response' in existing:
+                self.replayed += 1
+                return existing['response']
+            if time.monotonic() >= deadline:
+                self.in_progress += 1
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            response = (await issue(request)).model_dump()
+        except BaseException:
+            await asyncio.shield(storage.release_idempotency_key(key, claim_id))
+            raise
+        if not await storage.complete_idempotency_key(key, claim_id, response):
+            logger.warning(f"Idempotency-Key claim {key} lapsed before its offer {response['hash']} was stored")
+        self.issued += 1
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "inFlight": len(self.in_flight.calls),
+            "joined": self.in_flight.coalesced,
+            "issued": self.issued,
+            "replayed": self.replayed,
+            "inProgress": self.in_progress,
+            "mismatched": self.mismatched
+        }
+
+idempotent_issuer = IdempotentIssuer(IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_LEASE, IDEMPOTENCY_WAIT, IDEMPOTENCY_POLL_INTERVAL)
+
+# Offer stats
+def empty_offer_stats() -> dict:
+    return {"total": 0, "byStatus": {}, "byMonth": {}, "verificationHits": 0}
+
+class OfferStatsRecorder:
+    """Materialized per-recruiter and per-company offer counters.
+
+    Issuance, status changes and verification hits are summed in memory and
+    flushed every OFFER_STATS_FLUSH_INTERVAL as one batch of atomic $inc
+    upserts, so neither issuance nor verification waits on a counter write.
+    Pending counters are flushed on shutdown (flush_offer_stats), but those a
+    crashed worker had not flushed are lost; rebuild() recomputes
+    everything except verification hits from verified_offers in one
+    aggregation pass.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.flushes = 0
+        self.flush_failures = 0
+        self.rebuilds = 0
+
+    @staticmethod
+    def stats_keys(offer: dict) -> List[tuple]:
+        """(scope, key) of the recruiter and company stats documents an offer counts towards"""
+        return [
+            ("recruiter", normalize_match_value(offer.get('recruiterEmail'))),
+            ("company", normalize_match_value(offer.get('companyName')))
+        ]
+
+    def add(self, offer: dict, counters: dict):
+        for stats_key in self.stats_keys(offer):
+            self.pending.setdefault(stats_key, Counter()).update(counters)
+
+    def record_issued(self, offer: dict):
+        self.add(offer, {
+            "total": 1,
+            f"byStatus.{offer.get('status', 'verified')}": 1,
+            f"byMonth.{offer['dateSigned'].strftime('%Y-%m')}": 1
+        })
+
+    def record_status_change(self, offer: dict, previous_status: str, status: str):
+        self.add(offer, {f"byStatus.{previous_status}": -1, f"byStatus.{status}": 1})
+
+    def record_verification(self, offer: dict):
+        self.add(offer, {"verificationHits": 1})
+
+    async def flush(self):
+        """Write the pending increments; keep them for the next flush if the write fails"""
+        if not self.pending:
+            return
+        increments, self.pending = self.pending, {}
+        try:
+            await storage.increment_offer_stats({
+                stats_key: {field: value for field, value in counters.items() if value}
+                for stats_key, counters in increments.items()
+            })
+            self.flushes += 1
+        except Exception:
+            self.flush_failures += 1
+            for stats_key, counters in increments.items():
+                self.pending.setdefault(stats_key, Counter()).update(counters)
+            raise
+
+    async def run(self):
+        """Background task flushing counters"""
+        while True:
+            await asyncio.sleep(OFFER_STATS_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing offer stats: {str(e)}")
+
+    async def find(self, scope: str, key: str) -> dict:
+        """Stored counters for a stats document plus this worker's unflushed increments"""
+        stats = await storage.find_offer_stats(scope, key) or empty_offer_stats()
+        for field, value in self.pending.get((scope, key), {}).items():
+            group, _, name = field.partition(".")
+            if name:
+                stats[group][name] = stats[group].get(name, 0) + value
+            else:
+                stats[group] += value
+        return stats
+
+    async def rebuild(self) -> int:
+        """Recompute offer counts from verified_offers; returns the number of stats documents"""
+        stats = {}
+        for group in await storage.aggregate_offer_counts():
+            for stats_key in self.stats_keys(group):
+                counts = stats.setdefault(stats_key, empty_offer_stats())
+                counts["total"] += group["count"]
+                counts["byStatus"][group["status"]] = counts["byStatus"].get(group["status"], 0) + group["count"]
+                if group["month"]:
+                    counts["byMonth"][group["month"]] = counts["byMonth"].get(group["month"], 0) + group["count"]
+        await storage.replace_offer_counts(stats)
+        self.rebuilds += 1
+        return len(stats)
+
+    def stats(self) -> dict:
+        return {
+            "pendingDocuments": len(self.pending),
+            "flushes": self.flushes,
+            "flushFailures": self.flush_failures,
+            "rebuilds": self.rebuilds
+        }
+
+offer_stats = OfferStatsRecorder()
+
+# Verification audit log
+class AuditFileSink:
+    """Appends audit events to gzip-compressed NDJSON files.
+
+    A new file is started every hour and once max_bytes of NDJSON have been
+    written to the current one. File names carry the process id, so workers
+    never share a file.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.file = None
+        self.path = None
+        self.hour = None
+        self.bytes_written = 0
+        self.files_opened = 0
+        self.lock = threading.Lock()
+
+    def rotate(self, now: datetime):
+        self.close_file()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f"verification-audit-{now:%Y%m%dT%H%M%S}-{os.getpid()}.ndjson.gz"
+        self.file = gzip.open(self.path, "ab")
+        self.hour = now.replace(minute=0, second=0, microsecond=0)
+        self.bytes_written = 0
+        self.files_opened += 1
+
+    def write(self, events: List[dict]):
+        """Append a batch (runs in a worker thread)"""
+        data = "".join(
+            json.dumps({**event, "timestamp": event['timestamp'].isoformat()}) + "\n" for event in events
+        ).encode()
+        with self.lock:
+            now = datetime.utcnow()
+            if self.file is None or self.bytes_written >= self.max_bytes or now.replace(minute=0, second=0, microsecond=0) != self.hour:
+                self.rotate(now)
+            self.file.write(data)
+            # Sync-flush the batch so a crash loses at most the batch being written
+            self.file.flush()
+            self.bytes_written += len(data)
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        with self.lock:
+            self.close_file()
+
+class VerificationAuditLog:
+    """Bounded record of verification attempts, written in batches off the request path.
+
+    record() never waits: events go to an in-memory buffer of at most
+    AUDIT_LOG_BUFFER_SIZE, and once it is full new events are dropped and
+    counted. A writer task drains the buffer in batches of AUDIT_LOG_BATCH_SIZE
+    as soon as one is full, or every AUDIT_LOG_FLUSH_INTERVAL, to storage or to
+    rotated gzip NDJSON files. A batch that fails to write is counted, not
+    retried.
+    """
+
+    def __init__(self, sink: str, buffer_size: int, batch_size: int):
+        self.sink = sink
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.buffer = deque()
+        self.batch_ready = asyncio.Event()
+        self.task = None
+        self.stopping = False
+        self.file_sink = AuditFileSink(AUDIT_LOG_DIR, AUDIT_LOG_FILE_MAX_BYTES) if sink == "file" else None
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink != "off"
+
+    def record(self, event: dict):
+        if not self.enabled:
+            return
+        if len(self.buffer) >= self.buffer_size:
+            self.dropped += 1
+            return
+        self.buffer.append(event)
+        self.recorded += 1
+        if len(self.buffer) >= self.batch_size:
+            self.batch_ready.set()
+
+    async def flush(self):
+        """Write everything buffered, one batch at a time"""
+        while self.buffer:
+            batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+            try:
+                if self.file_sink is not None:
+                    await run_in_threadpool(self.file_sink.write, batch)
+                else:
+                    await storage.insert_audit_events(batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"Error writing verification audit events: {str(e)}")
+
+    def start(self):
+        self.stopping = False
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        """Writer task flushing the buffer until stop() is called"""
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(self.batch_ready.wait(), AUDIT_LOG_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.batch_ready.clear()
+            await self.flush()
+
+    async def stop(self):
+        """Let the writer finish its batch, write what is still buffered and close the current file"""
+        if self.task is not None:
+            self.stopping = True
+            self.batch_ready.set()
+            await self.task
+            self.task = None
+        await self.flush()
+        if self.file_sink is not None:
+            self.file_sink.close()
+
+    def stats(self) -> dict:
+        stats = {
+            "sink": self.sink,
+            "fingerprinting": bool(AUDIT_FINGERPRINT_SALT),
+            "buffered": len(self.buffer),
+            "bufferSize": self.buffer_size,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches
+        }
+        if self.file_sink is not None:
+            stats["filesOpened"] = self.file_sink.files_opened
+            stats["currentFile"] = str(self.file_sink.path) if self.file_sink.path else None
+        return stats
+
+audit_log = VerificationAuditLog(AUDIT_LOG_SINK, AUDIT_LOG_BUFFER_SIZE, AUDIT_LOG_BATCH_SIZE)
+
+def client_address(request: Request) -> str:
+    """The client's address: the peer's, or behind trusted proxies the nearest X-Forwarded-For hop they did not add"""
+    address = request.client.host if request.client else ''
+    if address not in AUDIT_TRUSTED_PROXIES:
+        return address
+    # Hops are appended left to right, so only those added by trusted proxies can be believed
+    for hop in reversed(request.headers.get('x-forwarded-for', '').split(',')):
+        hop = hop.strip()
+        if hop:
+            address = hop
+            if hop not in AUDIT_TRUSTED_PROXIES:
+                break
+    return address
+
+def client_fingerprint(request: Request) -> Optional[str]:
+    """Pseudonymous client id: a salted hash of the client address and user agent (None without a salt)"""
+    if not AUDIT_FINGERPRINT_SALT:
+        return None
+    address = client_address(request)
+    fingerprint = "\x1f".join([AUDIT_FINGERPRINT_SALT, address, request.headers.get('user-agent', '')])
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+
+def verification_outcome(response: Optional[OfferVerificationResponse]) -> str:
+    if response is None or (not response.success and response.message == UNVERIFIED_OFFER_MESSAGE):
+        return "notFound"
+    if response.success:
+        return "verified"
+    if response.details and response.details.get('matchType') == 'fuzzy':
+        return "nearMatch"
+    return "invalid"
+
+def audit_verification(
+    fingerprint: Optional[str],
+    method: str,
+    source: str,
+    response: Optional[OfferVerificationResponse],
+    full_name: Optional[str] = None,
+    company_name: Optional[str] = None,
+    recruiter_email: Optional[str] = None,
+    hash_value: Optional[str] = None
+):
+    """Queue an audit event for one verification attempt"""
+    if not audit_log.enabled:
+        return
+    company_name = company_name or ((response.details or {}).get('companyName') if response else None)
+    event = {
+        "timestamp": datetime.utcnow(),
+        "method": method,
+        "source": source,
+        "outcome": verification_outcome(response),
+        "companyKey": normalize_match_value(company_name) if company_name else None,
+        "companyName": company_name,
+        "fullName": full_name,
+        "recruiterEmail": recruiter_email,
+        "hash": hash_value,
+        "clientFingerprint": fingerprint
+    }
+    audit_log.record({field: value for field, value in event.items() if value is not None})
+
+def sign_offer(request: GenerateOfferRequest):
+    """Hash and sign an offer request, returning the offer to store with its signature and QR data"""
+    # Millisecond precision, so str(dateSigned) read back from any engine is the signed timestamp
+    signed_at = datetime.utcnow()
+    signed_at = signed_at.replace(microsecond=signed_at.microsecond // 1000 * 1000)
+    offer_data = {
+        'candidateName': request.candidateName,
+        'companyName': request.companyName,
+        'recruiterEmail': request.recruiterEmail,
+        'position': request.position,
+        'salary': request.salary,
+        'startDate': request.startDate,
+        'timestamp': str(signed_at)
+    }
+    
+    # Generate hash and signature
+    hash_value = generate_offer_hash(offer_data)
+    qr_payload = generate_qr_payload(offer_data, hash_value)
+    digital_signature = generate_digital_signature(qr_payload)
+    qr_data = generate_qr_data(qr_payload, digital_signature)
+    qr_compact = generate_qr_compact(qr_payload, digital_signature)
+    
+    # Every field is already validated, so the stored offer is constructed without validating it again
+    verified_offer = VerifiedOffer.model_construct(
+        hash=hash_value,
+        candidateName=request.candidateName,
+        companyName=request.companyName,
+        recruiterEmail=request.recruiterEmail,
+        recruiterName=request.recruiterName,
+        position=request.position,
+        salary=request.salary,
+        startDate=request.startDate,
+        verificationKey=generate_verification_key(
+            request.candidateName, request.companyName, request.recruiterEmail
+        ),
+        contentHash=generate_content_hash({**offer_data, 'candidateEmail': request.candidateEmail}),
+        dateSigned=signed_at
+    ).model_dump()
+    return verified_offer, digital_signature, qr_data, qr_compact
+
+async def lookup_offer(full_name: str, company_name: str, recruiter_email: str) -> OfferVerificationResponse:
+    """Verify an offer by candidate name, company and recruiter email"""
+    # Check if offer exists in database (indexed equality lookup on the match key)
+    verification_key = generate_verification_key(full_name, company_name, recruiter_email)
+    if not offer_filter.definitely_missing(verification_key):
+        stored_offer = await offer_lookups.do(
+            f"key:{verification_key}", lambda: storage.find_offer_by_key(verification_key)
+        )
+        
+        if stored_offer:
+            response = format_offer_status(stored_offer)
+            if response.success:
+                offer_stats.record_verification(stored_offer)
+            return response
+
+    # Near-matches are only searched among the recruiter's own offers, so skip
+    # the search when the filter knows the recruiter has issued none
+    if FUZZY_MATCH_ENABLED and not offer_filter.definitely_missing(recruiter_filter_key(recruiter_email)):
+        near_matches = fuzzy_matcher.search(full_name, company_name, recruiter_email)
+        if near_matches:
+            return format_near_match_offer(near_matches)
+    
+    return format_unverified_offer()
+
+# Recruiter tokens
+class RecruiterTokens:
+    """Stateless recruiter sessions: EdDSA JWTs carrying the recruiter's email and company.
+
+    Tokens are checked against the recruiter token key ring with no database
+    lookup. The "kid" header names the signing key, so after a rotation the
+    retired key keeps verifying the tokens it signed until they expire. Tokens
+    that verified are kept in an LRU keyed by their SHA-256 digest, so repeat
+    requests skip the signature check while the entry is fresh and the token
+    has not expired.
+    """
+
+    def __init__(self, keys: OfferSigningKeys, ttl: float, cache_size: int, cache_ttl: float):
+        self.keys = keys
+        self.ttl = ttl
+        self.verified = TTLCache(cache_size, cache_ttl)
+        self.issued = 0
+        self.rejected = 0
+
+    def issue(self, email: str, company_name: str, full_name: str) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": RECRUITER_TOKEN_ISSUER,
+            "sub": email,
+            "company": company_name,
+            "name": full_name,
+            "iat": now,
+            "exp": now + int(self.ttl)
+        }
+        self.issued += 1
+        return jwt.encode(claims, self.keys.active_key, algorithm="EdDSA", headers={"kid": self.keys.active_kid})
+
+    def verify(self, token: str) -> dict:
+        """Claims of a valid token, raising a 401 HTTPException otherwise"""
+        digest = hashlib.sha256(token.encode()).digest()
+        claims = self.verified.get(digest)
+        if claims is not None:
+            if claims['exp'] > time.time():
+                return claims
+            self.verified.invalidate(digest)
+
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+            public_key = self.keys.public_keys.get(kid) if isinstance(kid, str) else None
+            if public_key is None:
+                raise jwt.InvalidKeyError("Unknown key id")
+            # The leeway absorbs clock skew between the workers that issue and verify a token
+            claims = jwt.decode(
+                token, public_key, algorithms=["EdDSA"], issuer=RECRUITER_TOKEN_ISSUER, leeway=30,
+                options={"require": ["exp", "iat", "sub"]}
+            )
+        except jwt.PyJWTError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=401, detail="Invalid or expired recruiter token", headers={"WWW-Authenticate": "Bearer"}
+            )
+        self.verified.set(digest, claims)
+        return claims
+
+    def stats(self) -> dict:
+        return {
+            "activeKid": self.keys.active_kid,
+            "issued": self.issued,
+            "rejected": self.rejected,
+            "verifiedCache": self.verified.stats()
+        }
+
+recruiter_tokens = RecruiterTokens(
+    recruiter_token_keys, RECRUITER_TOKEN_TTL, RECRUITER_TOKEN_CACHE_SIZE, RECRUITER_TOKEN_CACHE_TTL
+)
+recruiter_bearer = HTTPBearer(auto_error=False)
+
+async def current_recruiter(credentials: Optional[HTTPAuthorizationCredentials] = Depends(recruiter_bearer)) -> dict:
+    """Dependency resolving the verified claims of the request's "Authorization: Bearer" recruiter token"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Recruiter token required", headers={"WWW-Authenticate": "Bearer"})
+    return recruiter_tokens.verify(credentials.credentials)
+
+def authorized_recruiter_email(recruiter: dict, recruiter_email: Optional[str]) -> str:
+    """The recruiter email a request acts as: the token's, which a recruiter email it names must match"""
+    if recruiter_email is None:
+        return recruiter['sub']
+    if normalize_match_value(recruiter_email) != normalize_match_value(recruiter['sub']):
+        raise HTTPException(status_code=403, detail="Recruiter token does not match the recruiter email")
+    return recruiter_email
+
+async def require_recruiter_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency admitting only callers presenting RECRUITER_AUTH_ADMIN_TOKEN"""
+    if not RECRUITER_AUTH_ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Recruiter sign-in is not configured")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), RECRUITER_AUTH_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+# API Routes
+@api_router.get("/")
+async def root():
+    return {"message": "OfferTrust API is running"}
+
+@api_router.post("/verify-offer", response_model=OfferVerificationResponse)
+async def verify_offer(request: OfferVerificationRequest, http_request: Request):
+    """Verify an offer letter"""
+    try:
+        response = await lookup_offer(request.fullName, request.companyName, request.recruiterEmail)
+        audit_verification(
+            client_fingerprint(http_request), "details", request.source, response,
+            full_name=request.fullName, company_name=request.companyName, recruiter_email=request.recruiterEmail
+        )
+        return json_response(response)
+        
+    except Exception as e:
+        logging.error(f"Error verifying offer: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during verification")
+
+async def lookup_offer_by_hash(hash_value: str) -> Optional[OfferVerificationResponse]:
+    """Verify an offer by its hash; None if no such offer exists"""
+    if revocation_list.is_revoked(hash_value):
+        return format_unverified_offer({"status": "revoked"})
+
+    stored_offer = offer_cache.get(hash_value)
+    if stored_offer is None:
+        if offer_filter.definitely_missing(hash_value):
+            return None
+
+        stored_offer = await offer_lookups.do(f"hash:{hash_value}", lambda: storage.find_offer_by_hash(hash_value))
+        if not stored_offer:
+            return None
+        offer_cache.set(hash_value, stored_offer)
+
+    response = format_offer_status(stored_offer)
+    if response.success:
+        offer_stats.record_verification(stored_offer)
+    return response
+
+@api_router.get("/offers/{hash_value}", response_model=OfferVerificationResponse)
+async def get_offer_by_hash(hash_value: str, http_request: Request):
+    """Look up a signed offer by its hash (QR code scans)"""
+    try:
+        hash_value = hash_value.lower()
+        response = await lookup_offer_by_hash(hash_value)
+        audit_verification(client_fingerprint(http_request), "hash", "qr", response, hash_value=hash_value)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        return json_response(response)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error looking up offer by hash: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during verification")
+
+# The image of an offer only changes if the signing key rotates, and then its ETag changes with it
+QR_IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def qr_payload_for_offer(stored_offer: dict) -> dict:
+    """Rebuild the QR payload of a stored offer (offers are signed with str(dateSigned) as their timestamp)"""
+    return generate_qr_payload({
+        'candidateName': stored_offer['candidateName'],
+        'companyName': stored_offer['companyName'],
+        'recruiterEmail': stored_offer['recruiterEmail'],
+        'position': stored_offer.get('position'),
+        'timestamp': str(stored_offer['dateSigned'])
+    }, stored_offer['hash'])
+
+def render_qr_png(qr_text: str) -> bytes:
+    """Render QR code text as a PNG image (runs in a worker thread)"""
+    buffer = io.BytesIO()
+    segno.make(qr_text, error='m').save(buffer, kind='png', scale=QR_IMAGE_SCALE, border=4)
+    return buffer.getvalue()
+
+async def render_offer_qr(hash_value: str) -> Optional[tuple]:
+    """Sign and render the compact QR code of a stored offer: (status, ETag, PNG), or None if unknown"""
+    stored_offer = await storage.find_offer_by_hash(hash_value)
+    if not stored_offer:
+        return None
+    qr_payload = qr_payload_for_offer(stored_offer)
+    qr_text = generate_qr_compact(qr_payload, generate_digital_signature(qr_payload))
+    image = await run_in_threadpool(render_qr_png, qr_text)
+    return current_status(stored_offer), f'"{hashlib.sha256(image).hexdigest()[:32]}"', image
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+@api_router.get("/offers/{hash_value}/qr.png")
+async def get_offer_qr_image(hash_value: str, http_request: Request):
+    """Serve the compact QR code of a verified offer as a PNG, rendered once per hash"""
+    try:
+        if segno is None:
+            raise HTTPException(status_code=501, detail="QR code rendering is not available")
+        hash_value = hash_value.lower()
+        if revocation_list.is_revoked(hash_value):
+            raise HTTPException(status_code=410, detail="Offer is no longer valid (status: revoked)")
+
+        cached = qr_images.get(hash_value)
+        if cached is None:
+            if offer_filter.definitely_missing(hash_value):
+                raise HTTPException(status_code=404, detail="Offer not found")
+            rendered = await offer_lookups.do(f"qr:{hash_value}", lambda: render_offer_qr(hash_value))
+            if rendered is None:
+                raise HTTPException(status_code=404, detail="Offer not found")
+            status, etag, image = rendered
+            if status != 'verified':
+                raise HTTPException(status_code=410, detail=f"Offer is no longer valid (status: {status})")
+            cached = (etag, image)
+            qr_images.set(hash_value, cached)
+
+        etag, image = cached
+        headers = {"ETag": etag, "Cache-Control": QR_IMAGE_CACHE_CONTROL}
+        if etag_matches(http_request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=image, media_type="image/png", headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error rendering offer QR code: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.post("/offers/{hash_value}/revoke")
+async def revoke_offer(hash_value: str, request: RevokeOfferRequest, recruiter: dict = Depends(current_recruiter)):
+    """Rescind an issued offer so it no longer verifies (only its issuing recruiter may)"""
+    try:
+        hash_value = hash_value.lower()
+        stored_offer = await storage.find_offer_by_hash(hash_value)
+        if not stored_offer:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        if normalize_match_value(stored_offer['recruiterEmail']) != normalize_match_value(recruiter['sub']):
+            raise HTTPException(status_code=403, detail="Only the recruiter who issued an offer can revoke it")
+
+        # Revoking twice returns the original revocation
+        revocation = await storage.find_revocation(hash_value)
+        if revocation is None:
+            revocation = {
+                "seq": await storage.next_sequence("revocations"),
+                "hash": hash_value,
+                "reason": request.reason,
+                "revokedBy": recruiter['sub'],
+                "revokedAt": datetime.utcnow()
+            }
+            if not await storage.insert_revocation(revocation):
+                revocation = await storage.find_revocation(hash_value)
+        revocation_list.add(revocation)
+        await set_offer_status(hash_value, "revoked")
+
+        return {
+            "success": True,
+            "hash": hash_value,
+            "seq": revocation['seq'],
+            "reason": revocation.get('reason'),
+            "revokedAt": revocation['revokedAt'].isoformat()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error revoking offer: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+batch_verification_slots = asyncio.Semaphore(VERIFY_BATCH_MAX_CONCURRENCY)
+
+async def verify_offer_chunk(offers: List[OfferVerificationRequest]) -> List[OfferVerificationResponse]:
+    """Verify a chunk of offers with a single $in query on verificationKey"""
+    keys = [
+        generate_verification_key(offer.fullName, offer.companyName, offer.recruiterEmail)
+        for offer in offers
+    ]
+    missing_keys = offer_filter.missing(keys)
+    candidate_keys = list({key for key in keys if key not in missing_keys})
+
+    latest_by_key = {}
+    if candidate_keys:
+        for stored_offer in await storage.find_offers_by_keys(candidate_keys):
+            current = latest_by_key.get(stored_offer['verificationKey'])
+            if current is None or stored_offer['dateSigned'] > current['dateSigned']:
+                latest_by_key[stored_offer['verificationKey']] = stored_offer
+
+    responses = []
+    for key in keys:
+        stored_offer = latest_by_key.get(key)
+        if stored_offer is None:
+            responses.append(format_unverified_offer())
+            continue
+        response = format_offer_status(stored_offer)
+        if response.success:
+            offer_stats.record_verification(stored_offer)
+        responses.append(response)
+    return responses
+
+async def verify_hash_chunk(hashes: List[str]) -> List[OfferVerificationResponse]:
+    """Verify a chunk of offer hashes with a single $in query on hash"""
+    hashes = [hash_value.lower() for hash_value in hashes]
+    stored_offers = {}
+    for hash_value in hashes:
+        if revocation_list.is_revoked(hash_value):
+            stored_offers[hash_value] = {"hash": hash_value, "status": "revoked"}
+            continue
+        stored_offer = offer_cache.get(hash_value)
+        if stored_offer is not None:
+            stored_offers[hash_value] = stored_offer
+
+    unknown_hashes = [hash_value for hash_value in hashes if hash_value not in stored_offers]
+    missing_hashes = offer_filter.missing(unknown_hashes)
+    candidate_hashes = list({hash_value for hash_value in unknown_hashes if hash_value not in missing_hashes})
+    if candidate_hashes:
+        for stored_offer in await storage.find_offers_by_hashes(candidate_hashes):
+            offer_cache.set(stored_offer['hash'], stored_offer)
+            stored_offers[stored_offer['hash']] = stored_offer
+
+    responses = []
+    for hash_value in hashes:
+        stored_offer = stored_offers.get(hash_value)
+        if stored_offer is None:
+            responses.append(format_unverified_offer())
+            continue
+        response = format_offer_status(stored_offer)
+        if response.success:
+            offer_stats.record_verification(stored_offer)
+        responses.append(response)
+    return responses
+
+def audit_batch_chunk(fingerprint: Optional[str], items: list, responses: List[OfferVerificationResponse]):
+    for item, response in zip(items, responses):
+        if isinstance(item, str):
+            audit_verification(fingerprint, "hash", "batch", response, hash_value=item.lower())
+        else:
+            audit_verification(
+                fingerprint, "details", "batch", response,
+                full_name=item.fullName, company_name=item.companyName, recruiter_email=item.recruiterEmail
+            )
+
+def read_batch_chunk(rows, chunk_size: int) -> list:
+    """Parse up to chunk_size batch lines into (offer request or hash, error) pairs (runs in a worker thread)"""
+    chunk = []
+    for _, row, error in rows:
+        if error is None:
+            if set(row) == {"hash"} and isinstance(row["hash"], str):
+                chunk.append((row["hash"], None))
+            else:
+                try:
+                    chunk.append((OfferVerificationRequest(**row), None))
+                except ValidationError as e:
+                    chunk.append((None, format_validation_error(e)))
+        else:
+            chunk.append((None, error))
+        if len(chunk) >= chunk_size:
+            break
+    return chunk
+
+async def verify_batch_chunk(items: list) -> List[OfferVerificationResponse]:
+    """Verify a chunk of offer requests and hashes, returning responses in input order"""
+    offers = [item for item in items if not isinstance(item, str)]
+    hashes = [item for item in items if isinstance(item, str)]
+    offer_responses = iter(await verify_offer_chunk(offers) if offers else [])
+    hash_responses = iter(await verify_hash_chunk(hashes) if hashes else [])
+    return [next(hash_responses) if isinstance(item, str) else next(offer_responses) for item in items]
+
+async def stream_batch_verification(spool, release_slot, fingerprint: Optional[str]):
+    """Yield NDJSON verification results chunk by chunk, in input order, parsing the spooled body as it goes"""
+    rows = read_offer_rows(spool, "ndjson")
+    try:
+        index = 0
+        while True:
+            try:
+                chunk = await run_in_threadpool(read_batch_chunk, rows, VERIFY_BATCH_CHUNK_SIZE)
+            except UnicodeDecodeError:
+                yield dumps_json({"index": index, "success": False, "message": "Batch is not valid UTF-8"}) + b"\n"
+                break
+            if not chunk:
+                break
+
+            items = [item for item, error in chunk if error is None]
+            try:
+                responses = await verify_batch_chunk(items)
+            except Exception as e:
+                logging.error(f"Error verifying offer batch: {str(e)}")
+                responses = [
+                    OfferVerificationResponse(success=False, message="Internal server error during verification")
+                ] * len(items)
+            audit_batch_chunk(fingerprint, items, responses)
+
+            responses = iter(responses)
+            lines = []
+            for _, error in chunk:
+                if error is None:
+                    response = next(responses)
+                else:
+                    response = OfferVerificationResponse(success=False, message=f"Invalid batch item: {error}")
+                lines.append(dumps_json({"index": index, **response.model_dump()}))
+                index += 1
+            yield b"\n".join(lines) + b"\n"
+    finally:
+        release_slot()
+
+async def spool_batch_body(request: Request, spool) -> int:
+    """Copy the request body into spool as it arrives, returning its line count and refusing more than VERIFY_BATCH_MAX_SIZE"""
+    lines = 0
+    last_byte = b"\n"
+    has_content = False
+    async for data in request.stream():
+        if not data:
+            continue
+        lines += data.count(b"\n")
+        last_byte = data[-1:]
+        has_content = has_content or bool(data.strip())
+        if lines + (last_byte != b"\n") > VERIFY_BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch too large: at most {VERIFY_BATCH_MAX_SIZE} offers per request"
+            )
+        spool.write(data)
+    spool.seek(0)
+    return lines + (last_byte != b"\n") if has_content else 0
+
+@api_router.post("/verify-offers/batch")
+async def verify_offers_batch(http_request: Request):
+    """Verify many offers at once from an NDJSON body, streaming results back as NDJSON.
+
+    Each line is an offer ({"fullName", "companyName", "recruiterEmail"}) or
+    {"hash": ...}. The body is spooled as it arrives and parsed chunk by chunk
+    while results stream, so memory stays flat however large the batch.
+    """
+    if http_request.headers.get('content-type', '').split(';')[0].strip() == 'application/json':
+        raise HTTPException(
+            status_code=415, detail='Send the batch as NDJSON: one offer or {"hash": ...} object per line'
+        )
+
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    try:
+        if await spool_batch_body(http_request, spool) == 0:
+            raise HTTPException(status_code=400, detail="Provide offers or hashes to verify")
+        if batch_verification_slots.locked():
+            raise HTTPException(status_code=429, detail="Too many batch verifications in progress, retry later")
+    except BaseException:
+        spool.close()
+        raise
+
+    await batch_verification_slots.acquire()
+    released = False
+
+    def release_slot():
+        # Called from the stream's cleanup and again once the response is done,
+        # so the slot and spool are freed even if the client disconnects before streaming starts
+        nonlocal released
+        if not released:
+            released = True
+            batch_verification_slots.release()
+        spool.close()
+
+    return StreamingResponse(
+        stream_batch_verification(spool, release_slot, client_fingerprint(http_request)),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(release_slot)
+    )
+
+async def verify_qr_payload(qr_payload: dict) -> OfferVerificationResponse:
+    """Verify a decoded QR payload by its signature, consulting the database only for status"""
+    if not verify_qr_signature(qr_payload):
+        return format_unverified_offer()
+
+    hash_value = qr_payload['hash']
+    if revocation_list.is_revoked(hash_value):
+        return format_unverified_offer({"status": "revoked"})
+
+    stored_offer = None
+    if not offer_filter.definitely_missing(hash_value):
+        stored_offer = await storage.find_offer_by_hash(hash_value)
+    if stored_offer and stored_offer.get('status', 'verified') != 'verified':
+        return format_unverified_offer(stored_offer)
+
+    offer_stats.record_verification(
+        stored_offer or {"recruiterEmail": qr_payload['recruiter'], "companyName": qr_payload['company']}
+    )
+    return OfferVerificationResponse(
+        success=True,
+        message=f"This offer to {qr_payload['candidate']} was digitally signed by {qr_payload['company']} ({qr_payload['recruiter']}).",
+        details={
+            "companyName": qr_payload['company'],
+            "recruiterEmail": qr_payload['recruiter'],
+            "position": qr_payload.get('position'),
+            "timestamp": qr_payload['timestamp'],
+            "hash": hash_value,
+            "kid": qr_payload['kid']
+        }
+    )
+
+@api_router.post("/verify-signature", response_model=OfferVerificationResponse)
+async def verify_signature(request: SignatureVerificationRequest, http_request: Request):
+    """Verify a scanned QR payload by its signature, consulting the database only for status"""
+    try:
+        try:
+            qr_payload = parse_qr_data(request.qrData)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="QR data is not valid JSON")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"QR data is not a valid offer code: {e}")
+
+        response = await verify_qr_payload(qr_payload)
+        # The claimed company is recorded even for forged payloads, which is what fraud analytics look for
+        audit_verification(
+            client_fingerprint(http_request), "signature", "qr", response,
+            full_name=str(qr_payload.get('candidate') or '') or None,
+            company_name=str(qr_payload.get('company') or '') or None,
+            recruiter_email=str(qr_payload.get('recruiter') or '') or None,
+            hash_value=str(qr_payload.get('hash') or '') or None
+        )
+        return json_response(response)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error verifying offer signature: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during verification")
+
+@api_router.get("/offers/{hash_value}/proof")
+async def get_offer_proof(hash_value: str):
+    """Return the Merkle inclusion proof anchoring an offer in a published batch"""
+    try:
+        hash_value = hash_value.lower()
+        proof = await storage.find_proof(hash_value)
+        if not proof:
+            raise HTTPException(status_code=404, detail="Offer not found or not anchored yet")
+
+        batch = await storage.find_sealed_batch(proof['batchId'])
+        if not batch:
+            raise HTTPException(status_code=404, detail="Offer not found or not anchored yet")
+
+        # The batch fields the root signature covers, plus the signature (batches sealed before roots were typed have no type)
+        return {
+            **proof,
+            **{field: batch[field] for field in ("type", "root", "leafCount", "kid", "signature") if field in batch}
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting offer proof: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.get("/merkle/roots")
+async def get_merkle_roots(after: int = 0, limit: int = Query(1000, ge=1, le=10000)):
+    """List sealed batch roots after a batch id, for partners mirroring them"""
+    try:
+        roots = await storage.list_sealed_batches(after, limit)
+        for root in roots:
+            root['sealedAt'] = root['sealedAt'].isoformat()
+        return {"roots": roots}
+
+    except Exception as e:
+        logging.error(f"Error listing Merkle roots: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.get("/signing-keys")
+async def get_signing_keys():
+    """Publish the public keys offers are signed with"""
+    return {"keys": offer_signing_keys.published()}
+
+@api_router.get("/stats")
+async def get_stats():
+    """Report in-process cache and filter statistics"""
+    return {
+        "offerCache": offer_cache.stats(),
+        "qrImages": qr_images.stats(),
+        "offerFilter": offer_filter.stats(),
+        "merkleAnchor": merkle_anchor.stats(),
+        "uploadCache": upload_cache.stats(),
+        "offerWriter": offer_writer.stats(),
+        "idempotency": idempotent_issuer.stats(),
+        "lookupCoalescing": offer_lookups.stats(),
+        "fuzzyMatch": fuzzy_matcher.stats(),
+        "offerStats": offer_stats.stats(),
+        "revocations": revocation_list.stats(),
+        "auditLog": audit_log.stats(),
+        "recruiterTokens": recruiter_tokens.stats()
+    }
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose request, database and event-loop metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/audit/verifications")
+async def get_verification_audit(
+    company_name: Optional[str] = None,
+    hours: float = Query(24, gt=0, le=AUDIT_LOG_RETENTION_DAYS * 24),
+    limit: int = Query(100, ge=1, le=1000),
+    recruiter: dict = Depends(current_recruiter)
+):
+    """Aggregate recent verification attempts for the signed-in recruiter's company"""
+    if AUDIT_LOG_SINK != "storage":
+        raise HTTPException(status_code=404, detail="Verification audit queries need AUDIT_LOG_SINK=storage")
+    company_key = normalize_match_value(recruiter.get('company'))
+    if not company_key or (company_name and normalize_match_value(company_name) != company_key):
+        raise HTTPException(status_code=403, detail="Recruiter token does not match company_name")
+    try:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        companies = await storage.aggregate_audit_events(since, company_key, limit)
+        for company in companies:
+            company['lastAttempt'] = company['lastAttempt'].isoformat()
+        return {"since": since.isoformat(), "companies": companies}
+
+    except Exception as e:
+        logging.error(f"Error aggregating verification audit: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+async def issue_offer(request: GenerateOfferRequest) -> GenerateOfferResponse:
+    """Sign and store a new offer"""
+    stored_offer, digital_signature, qr_data, qr_compact = sign_offer(request)
+    hash_value = stored_offer['hash']
+    
+    # Store in database
+    if OFFER_WRITE_BEHIND:
+        await offer_writer.write(stored_offer)
+    else:
+        await storage.insert_offer(stored_offer)
+    offer_filter.add(*offer_filter_keys(stored_offer))
+    fuzzy_matcher.add(stored_offer)
+    offer_stats.record_issued(stored_offer)
+    
+    return GenerateOfferResponse(
+        success=True,
+        hash=hash_value,
+        digitalSignature=digital_signature,
+        qrData=qr_data,
+        qrCompact=qr_compact,
+        message="Offer generated successfully"
+    )
+
+@api_router.post("/generate-offer", response_model=GenerateOfferResponse)
+async def generate_offer(request: GenerateOfferRequest, http_request: Request, recruiter: dict = Depends(current_recruiter)):
+    """Generate a new signed offer as the signed-in recruiter (once per Idempotency-Key header, if one is sent)"""
+    try:
+        request = request.model_copy(update={"recruiterEmail": authorized_recruiter_email(recruiter, request.recruiterEmail)})
+        idempotency_key = http_request.headers.get('idempotency-key')
+        if idempotency_key is None:
+            return json_response(await issue_offer(request))
+        if not 0 < len(idempotency_key) <= 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be 1 to 255 characters")
+        return json_response(await idempotent_issuer.issue(idempotency_key, request, issue_offer))
+        
+    except HTTPException:
+        raise
+    except DuplicateContentError:
+        raise HTTPException(status_code=409, detail="An identical offer has already been issued")
+    except OfferWriteQueueFull:
+        raise HTTPException(status_code=503, detail="Too many offers being issued, please retry shortly")
+    except Exception as e:
+        logging.error(f"Error generating offer: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during offer generation")
+
+# Bulk issuance
+def detect_bulk_file_format(file: UploadFile) -> Optional[str]:
+    """Return "csv" or "ndjson" for a supported bulk upload, otherwise None"""
+    file_name = (file.filename or '').lower()
+    if file_name.endswith('.csv') or file.content_type in ('text/csv', 'application/vnd.ms-excel'):
+        return "csv"
+    if file_name.endswith(('.ndjson', '.jsonl')) or file.content_type in ('application/x-ndjson', 'application/jsonl'):
+        return "ndjson"
+    return None
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+def read_offer_rows(stream, file_format: str):
+    """Lazily yield (row number, row dict or None, error or None) from an uploaded file"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == "csv":
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            yield row_number, {
+                key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                for key, value in row.items() if key
+            }, None
+    else:
+        row_number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                yield row_number, None, "Invalid JSON"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "Expected a JSON object"
+                continue
+            yield row_number, row, None
+
+def sign_offer_chunk(rows, chunk_size: int, recruiter: dict) -> list:
+    """Validate, hash and sign up to chunk_size rows as the token's recruiter (runs in a worker thread)"""
+    chunk = []
+    for row_number, row, error in rows:
+        if error is None:
+            try:
+                request = GenerateOfferRequest(**row)
+                request = request.model_copy(
+                    update={"recruiterEmail": authorized_recruiter_email(recruiter, request.recruiterEmail)}
+                )
+                chunk.append((row_number, sign_offer(request), None))
+            except ValidationError as e:
+                chunk.append((row_number, None, format_validation_error(e)))
+            except HTTPException as e:
+                chunk.append((row_number, None, e.detail))
+        else:
+            chunk.append((row_number, None, error))
+        if len(chunk) >= chunk_size:
+            break
+    return chunk
+
+async def stream_bulk_issuance(spool, file_format: str, recruiter: dict):
+    """Issue offers chunk by chunk, yielding one NDJSON result line per row"""
+    issued = failed = 0
+    rows = read_offer_rows(spool, file_format)
+
+    def sign_next_chunk():
+        return asyncio.ensure_future(run_in_threadpool(sign_offer_chunk, rows, BULK_ISSUE_CHUNK_SIZE, recruiter))
+
+    # Sign the next chunk in a worker thread while the current one is written
+    pending = sign_next_chunk()
+    try:
+        while True:
+            try:
+                chunk = await pending
+            except UnicodeDecodeError:
+                yield dumps_json({"success": False, "error": "File is not valid UTF-8"}) + b"\n"
+                break
+            if not chunk:
+                break
+            pending = sign_next_chunk()
+
+            # Row numbers whose insert failed, mapped to the error to report
+            write_errors = {}
+            signed = [(row_number, signed_offer) for row_number, signed_offer, _ in chunk if signed_offer]
+            if signed:
+                try:
+                    failures = await storage.insert_offers([signed_offer[0] for _, signed_offer in signed])
+                    for index, reason in failures.items():
+                        write_errors[signed[index][0]] = {
+                            "duplicate": "Duplicate offer",
+                            "duplicateContent": "An identical offer has already been issued"
+                        }.get(reason, "Failed to store offer")
+                except Exception as e:
+                    logging.error(f"Error storing bulk offers: {str(e)}")
+                    for row_number, _ in signed:
+                        write_errors[row_number] = "Failed to store offer"
+
+            lines = []
+            for row_number, signed_offer, error in chunk:
+                error = error or write_errors.get(row_number)
+                if error:
+                    failed += 1
+                    lines.append(dumps_json({"row": row_number, "success": False, "error": error}))
+                    continue
+                stored_offer, digital_signature, qr_data, qr_compact = signed_offer
+                offer_filter.add(*offer_filter_keys(stored_offer))
+                fuzzy_matcher.add(stored_offer)
+                offer_stats.record_issued(stored_offer)
+                issued += 1
+                lines.append(dumps_json({
+                    "row": row_number,
+                    "success": True,
+                    "hash": stored_offer['hash'],
+                    "digitalSignature": digital_signature,
+                    "qrData": qr_data,
+                    "qrCompact": qr_compact
+                }))
+            yield b"\n".join(lines) + b"\n"
+
+        yield dumps_json({"summary": {"issued": issued, "failed": failed}}) + b"\n"
+    finally:
+        # Let an in-flight signing thread finish before closing the file under it
+        await asyncio.gather(pending, return_exceptions=True)
+        spool.close()
+
+@api_router.post("/generate-offers/bulk")
+async def generate_offers_bulk(file: UploadFile = File(...), recruiter: dict = Depends(current_recruiter)):
+    """Issue offers as the signed-in recruiter for every row of an uploaded CSV or NDJSON file, streaming NDJSON results"""
+    file_format = detect_bulk_file_format(file)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type, upload a CSV or NDJSON file")
+
+    # The upload is closed once this handler returns, so hand the stream its own copy
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    try:
+        await run_in_threadpool(shutil.copyfileobj, file.file, spool)
+        spool.seek(0)
+    except Exception as e:
+        spool.close()
+        logging.error(f"Error reading bulk upload: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error processing uploaded file")
+
+    return StreamingResponse(stream_bulk_issuance(spool, file_format, recruiter), media_type="application/x-ndjson")
+
+@api_router.post("/auth/recruiter", dependencies=[Depends(require_recruiter_admin)])
+async def authenticate_recruiter(request: RecruiterAuth):
+    """Issue a recruiter token; admin-gated because the email itself is not verified"""
+    try:
+        # Simple validation for demo
+        if not request.email or '@' not in request.email or 'gmail.com' in request.email:
+            raise HTTPException(status_code=400, detail="Please use a valid company email address")
+        
+        # Create user data and a signed session token carrying it
+        user_data = {
+            "id": f"rec-{uuid.uuid4()}",
+            "email": request.email,
+            "companyName": request.companyName or "Demo Company",
+            "fullName": request.fullName or "Demo User"
+        }
+        
+        return {
+            "success": True,
+            "token": recruiter_tokens.issue(user_data["email"], user_data["companyName"], user_data["fullName"]),
+            "expiresIn": int(RECRUITER_TOKEN_TTL),
+            "user": user_data
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error authenticating recruiter: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during authentication")
+
+def format_recruiter_offer(offer: dict) -> dict:
+    """Convert a stored offer to the recruiter dashboard format"""
+    return {
+        "id": offer['id'],
+        "candidateName": offer['candidateName'],
+        "candidateEmail": offer.get('candidateEmail', ''),
+        "position": offer['position'],
+        "salary": offer.get('salary', ''),
+        "dateCreated": offer['dateSigned'].date().isoformat(),
+        "status": offer['status'].title(),
+        "hash": offer['hash'][:20] + "..."
+    }
+
+def encode_offer_cursor(offer: dict) -> str:
+    """Encode the keyset position after an offer as an opaque cursor token"""
+    position = json.dumps({"d": offer['dateSigned'].isoformat(), "i": offer['id']})
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+def decode_offer_cursor(cursor: str):
+    """Turn a cursor token back into the (dateSigned, id) position it encodes"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(position["d"]), str(position["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Offers per chunk written by the NDJSON stream
+RECRUITER_STREAM_CHUNK_SIZE = 500
+
+async def stream_recruiter_offers(recruiter_email: str, after):
+    """Yield every matching offer as NDJSON, one batch in memory at a time"""
+    lines = []
+    async for offer in storage.iter_recruiter_offers(recruiter_email, after=after):
+        lines.append(dumps_json(format_recruiter_offer(offer)))
+        if len(lines) >= RECRUITER_STREAM_CHUNK_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+@api_router.get("/recruiter/offers")
+async def get_recruiter_offers(
+    recruiter_email: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    stream: bool = False,
+    recruiter: dict = Depends(current_recruiter)
+):
+    """Get the signed-in recruiter's offers, newest first.
+
+    Pass the returned nextCursor to fetch the following page, or stream=true
+    to receive the full history as NDJSON.
+    """
+    try:
+        recruiter_email = authorized_recruiter_email(recruiter, recruiter_email)
+        after = decode_offer_cursor(cursor) if cursor else None
+        
+        if stream:
+            return StreamingResponse(
+                stream_recruiter_offers(recruiter_email, after), media_type="application/x-ndjson"
+            )
+        
+        # Fetch one extra offer to know whether another page follows
+        offers = [
+            offer async for offer in storage.iter_recruiter_offers(recruiter_email, after=after, limit=limit + 1)
+        ]
+        
+        next_cursor = encode_offer_cursor(offers[limit - 1]) if len(offers) > limit else None
+        return json_response({
+            "offers": [format_recruiter_offer(offer) for offer in offers[:limit]],
+            "nextCursor": next_cursor
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting recruiter offers: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.get("/recruiter/stats")
+async def get_recruiter_stats(
+    recruiter_email: Optional[str] = None,
+    company_name: Optional[str] = None,
+    recruiter: dict = Depends(current_recruiter)
+):
+    """Offer totals, counts by status and month, and verification hits for the signed-in recruiter (and optionally their company).
+
+    Counters are buffered in each worker and flushed every
+    OFFER_STATS_FLUSH_INTERVAL seconds (and on shutdown), so increments made by
+    other workers show up within flushIntervalSeconds. Increments a worker had
+    not flushed when it crashed are lost; a rebuild restores every counter
+    except verification hits.
+    """
+    try:
+        recruiter_email = authorized_recruiter_email(recruiter, recruiter_email)
+        if company_name and normalize_match_value(company_name) != normalize_match_value(recruiter.get('company')):
+            raise HTTPException(status_code=403, detail="Recruiter token does not match company_name")
+        response = {
+            "recruiterEmail": recruiter_email,
+            **await offer_stats.find("recruiter", normalize_match_value(recruiter_email)),
+            "flushIntervalSeconds": OFFER_STATS_FLUSH_INTERVAL
+        }
+        if company_name:
+            response["company"] = {
+                "companyName": company_name,
+                **await offer_stats.find("company", normalize_match_value(company_name))
+            }
+        return json_response(response)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting recruiter stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Upload ingestion
+ALLOWED_UPLOAD_TYPES = ['application/pdf', 'image/jpeg', 'image/png', 'image/jpg']
+
+class StreamedUpload:
+    """A file received chunk by chunk into a temporary file, hashed as it arrives"""
+
+    def __init__(self):
+        self.filename = None
+        self.content_type = None
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.path = None
+        self.complete = False
+        self._file = None
+
+    def open(self, filename: str, content_type: str):
+        self.filename = filename
+        self.content_type = content_type
+        self._file = tempfile.NamedTemporaryFile(prefix="offertrust-upload-", delete=False)
+        self.path = self._file.name
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > UPLOAD_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large: uploads are limited to {UPLOAD_MAX_BYTES / (1024 * 1024):g} MB"
+            )
+        self.sha256.update(data)
+        self._file.write(data)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self.complete = self._file is not None
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+            remove_file(self.path)
+
+def remove_file(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+async def receive_upload(request: Request, field_name: str = "file") -> StreamedUpload:
+    """Stream a multipart upload to disk, enforcing the size limit and hashing on the way"""
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    boundary = params.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart file upload")
+    content_length = request.headers.get('content-length', '')
+    # Allow some room for the multipart framing around the file itself
+    if content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES + 64 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large: uploads are limited to {UPLOAD_MAX_BYTES / (1024 * 1024):g} MB"
+        )
+
+    events = []
+    parser = MultipartParser(boundary, {
+        "on_part_begin": lambda: events.append(("part_begin", b"")),
+        "on_header_field": lambda data, start, end: events.append(("header_field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("header_value", data[start:end])),
+        "on_header_end": lambda: events.append(("header_end", b"")),
+        "on_headers_finished": lambda: events.append(("headers_finished", b"")),
+        "on_part_data": lambda data, start, end: events.append(("part_data", data[start:end])),
+        "on_part_end": lambda: events.append(("part_end", b"")),
+    })
+
+    upload = StreamedUpload()
+    headers, header_field, header_value = {}, b"", b""
+    receiving = False
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event, data in events:
+                if event == "part_begin":
+                    headers, header_field, header_value = {}, b"", b""
+                elif event == "header_field":
+                    header_field += data
+                elif event == "header_value":
+                    header_value += data
+                elif event == "header_end":
+                    headers[header_field.lower()] = header_value
+                    header_field, header_value = b"", b""
+                elif event == "headers_finished":
+                    _, options = parse_options_header(headers.get(b'content-disposition', b''))
+                    receiving = (
+                        upload.path is None
+                        and options.get(b'name') == field_name.encode()
+                        and b'filename' in options
+                    )
+                    if receiving:
+                        part_type = headers.get(b'content-type', b'').decode('latin-1')
+                        if part_type not in ALLOWED_UPLOAD_TYPES:
+                            raise HTTPException(status_code=400, detail="Unsupported file type")
+                        upload.open(options[b'filename'].decode('utf-8', 'replace'), part_type)
+                elif event == "part_data" and receiving:
+                    upload.write(data)
+                elif event == "part_end" and receiving:
+                    receiving = False
+                    upload.close()
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        upload.discard()
+        raise
+
+    if not upload.complete:
+        upload.discard()
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    return upload
+
+OFFER_FIELD_PATTERNS = {
+    "fullName": [
+        re.compile(r"^\s*(?:Candidate(?: Name)?|Name)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+        re.compile(r"^\s*Dear\s+((?:[A-Z][\w.'-]*\s*){1,4}?)\s*[,:]", re.MULTILINE),
+    ],
+    "companyName": [
+        re.compile(r"\b(?:Company(?: Name)?|Employer)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+        re.compile(r"\bjoin\s+([A-Z][\w&.' -]*?)\s+(?:as|in)\b"),
+    ],
+    "recruiterEmail": [
+        re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"),
+    ],
+    "position": [
+        re.compile(r"^\s*(?:Position|Job Title|Role)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE),
+        re.compile(r"\bposition of\s+([^.,\n]+)", re.IGNORECASE),
+    ],
+    "salary": [
+        re.compile(r"\$\s?\d[\d,]*(?:\.\d{2})?"),
+    ],
+}
+
+def extract_offer_fields(path: str, content_type: str) -> dict:
+    """Extract offer letter fields from a stored upload (runs in a worker process)"""
+    text = ""
+    if content_type == 'application/pdf':
+        # Only the text layer: a PDF without one (e.g. a scan) yields no fields rather than
+        # whatever the patterns happen to match in its compressed streams or metadata
+        if PdfReader is not None:
+            try:
+                text = "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+            except Exception:
+                text = ""
+    elif pytesseract is not None:
+        with Image.open(path) as image:
+            text = pytesseract.image_to_string(image)
+
+    extracted_data = {}
+    for field, patterns in OFFER_FIELD_PATTERNS.items():
+        extracted_data[field] = None
+        for pattern in patterns:
+            match = pattern.search(text)
+            if match:
+                extracted_data[field] = (match.group(1) if pattern.groups else match.group(0)).strip()
+                break
+    return extracted_data
+
+# Extracted fields keyed by the SHA-256 of the uploaded bytes
+upload_cache = TTLCache(UPLOAD_CACHE_SIZE, UPLOAD_CACHE_TTL)
+upload_slots = asyncio.Semaphore(UPLOAD_MAX_PENDING)
+upload_pool = None
+
+def get_upload_pool() -> ProcessPoolExecutor:
+    global upload_pool
+    if upload_pool is None:
+        upload_pool = ProcessPoolExecutor(
+            max_workers=UPLOAD_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return upload_pool
+
+async def parse_upload(upload: StreamedUpload) -> dict:
+    """Run field extraction in the worker pool with a timeout and bounded queue"""
+    if upload_slots.locked():
+        remove_file(upload.path)
+        raise HTTPException(status_code=503, detail="Too many files being processed, please retry shortly")
+    await upload_slots.acquire()
+
+    future = asyncio.get_running_loop().run_in_executor(
+        get_upload_pool(), extract_offer_fields, upload.path, upload.content_type
+    )
+
+    def release(_):
+        # Only free the slot once the worker is actually done, even after a timeout
+        upload_slots.release()
+        remove_file(upload.path)
+
+    future.add_done_callback(release)
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout=UPLOAD_PARSE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out processing uploaded file")
+
+@api_router.post("/upload-file")
+async def upload_file(request: Request):
+    """Handle file upload: extract the offer fields and verify them"""
+    try:
+        upload = await receive_upload(request)
+        content_hash = upload.sha256.hexdigest()
+        
+        extracted_data = upload_cache.get(content_hash)
+        cached = extracted_data is not None
+        if cached:
+            remove_file(upload.path)
+        else:
+            extracted_data = await parse_upload(upload)
+            upload_cache.set(content_hash, extracted_data)
+        
+        verification = None
+        if extracted_data['fullName'] and extracted_data['companyName'] and extracted_data['recruiterEmail']:
+            verification = await lookup_offer(
+                extracted_data['fullName'], extracted_data['companyName'], extracted_data['recruiterEmail']
+            )
+            audit_verification(
+                client_fingerprint(request), "details", "file", verification,
+                full_name=extracted_data['fullName'], company_name=extracted_data['companyName'],
+                recruiter_email=extracted_data['recruiterEmail']
+            )
+        
+        return {
+            "success": True,
+            "extractedData": extracted_data,
+            "fileName": upload.filename,
+            "sha256": content_hash,
+            "cached": cached,
+            "verification": verification.model_dump() if verification else None
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error processing file upload: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error processing uploaded file")
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def load_signing_keys():
+    """Load the offer signing and recruiter token keys once, before serving requests"""
+    offer_signing_keys.load(OFFER_SIGNING_KEYS_DIR, OFFER_SIGNING_KEY_ID)
+    recruiter_token_keys.load(RECRUITER_TOKEN_KEYS_DIR, RECRUITER_TOKEN_KEY_ID)
+
+async def create_indexes():
+    """Create the indexes the API lookups rely on"""
+    try:
+        await storage.create_indexes()
+        if AUDIT_LOG_SINK == "storage":
+            await storage.create_audit_log(int(AUDIT_LOG_RETENTION_DAYS * 24 * 3600))
+        if OFFER_CONTENT_DEDUPE:
+            await storage.create_offer_content_index()
+    except Exception as e:
+        logger.error(f"Error creating indexes: {str(e)}")
+
+background_tasks = []
+
+async def start_background_tasks():
+    background_tasks.append(asyncio.create_task(offer_filter.run()))
+    if FUZZY_MATCH_ENABLED:
+        background_tasks.append(asyncio.create_task(fuzzy_matcher.run()))
+    background_tasks.append(asyncio.create_task(merkle_anchor.run()))
+    background_tasks.append(asyncio.create_task(offer_stats.run()))
+    background_tasks.append(asyncio.create_task(revocation_list.run()))
+    background_tasks.append(asyncio.create_task(sample_event_loop_lag(METRICS_LOOP_LAG_INTERVAL)))
+
+async def stop_background_tasks():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+
+async def flush_offer_stats():
+    """Write counters still pending when the worker stops"""
+    try:
+        await offer_stats.flush()
+    except Exception as e:
+        logger.error(f"Error flushing offer stats: {str(e)}")
+
+def stop_upload_workers():
+    if upload_pool is not None:
+        upload_pool.shutdown(wait=False, cancel_futures=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connect storage and start background work before serving, tear both down on shutdown"""
+    await storage.connect()
+    load_signing_keys()
+    await create_indexes()
+    await start_background_tasks()
+    if OFFER_WRITE_BEHIND:
+        offer_writer.start()
+    if audit_log.enabled:
+        if not AUDIT_FINGERPRINT_SALT:
+            logger.warning("AUDIT_FINGERPRINT_SALT is not set: verification audit events are recorded without client fingerprints")
+        audit_log.start()
+    try:
+        yield
+    finally:
+        # Drain queued offers and audit events while storage is still open
+        await offer_writer.stop()
+        await audit_log.stop()
+        await stop_background_tasks()
+        await flush_offer_stats()
+        stop_upload_workers()
+        await storage.close()
+
+# Create the main app
+app = FastAPI(title="OfferTrust API", version="1.0.0", lifespan=lifespan, default_response_class=DefaultJSONResponse)
+
+# Include the router in the main app
+app.include_router(api_router)
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Server-Timing"],
+)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Outermost, so request timing covers every other middleware
+app.add_middleware(MetricsMiddleware, server_timing=METRICS_SERVER_TIMING)
@@ -0,0 +1,1261 @@
+"""Storage engines for OfferTrust.
+
+Every handler in server.py talks to an OfferStore rather than to a database
+driver directly. Two engines implement it:
+
+- MongoOfferStore: the production engine, backed by Motor.
+- SQLiteOfferStore: an embedded engine for edge/single-node deployments and
+  tests. It runs SQLite in WAL mode, or entirely in memory with ":memory:".
+
+All documents are plain dicts shaped like VerifiedOffer.model_dump(), with
+dateSigned as a naive UTC datetime.
+"""
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import json
+import re
+import sqlite3
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
+
+from metrics import MongoCommandMetrics, MongoPoolMetrics, record_db_command, record_pool_wait
+
+# Offer fields shown on the recruiter dashboard
+RECRUITER_OFFER_FIELDS = ["id", "candidateName", "candidateEmail", "position", "salary", "dateSigned", "status", "hash"]
+
+# How many rows the iterators fetch per round trip
+ITER_BATCH_SIZE = 1000
+
+# Offer stats counters rebuilt from verified_offers (verificationHits is only ever incremented)
+REBUILT_STATS_FIELDS = ("total", "byStatus", "byMonth")
+
+class DuplicateOfferError(Exception):
+    """Raised when an offer with the same hash is already stored"""
+
+class DuplicateContentError(DuplicateOfferError):
+    """Raised when a verified offer with the same contentHash is stored (see create_offer_content_index)"""
+
+class OfferStore:
+    """Storage contract shared by every engine"""
+
+    async def connect(self):
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+    async def create_indexes(self):
+        raise NotImplementedError
+
+    # Offers
+    async def create_offer_content_index(self):
+        """Reject a verified offer whose contentHash matches another verified offer's"""
+        raise NotImplementedError
+
+    async def insert_offer(self, offer: dict):
+        """Store one offer, raising DuplicateOfferError if its hash exists (DuplicateContentError for its content)"""
+        raise NotImplementedError
+
+    async def insert_offers(self, offers: List[dict]) -> Dict[int, str]:
+        """Store many offers independently; return {index: "duplicate" | "duplicateContent" | "error"} for failures"""
+        raise NotImplementedError
+
+    async def find_offer_by_key(self, verification_key: str) -> Optional[dict]:
+        """Most recently signed offer with this verification key"""
+        raise NotImplementedError
+
+    async def find_offer_by_hash(self, hash_value: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def find_offers_by_keys(self, verification_keys: List[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def find_offers_by_hashes(self, hashes: List[str]) -> List[dict]:
+        raise NotImplementedError
+
+    def iter_recruiter_offers(
+        self, recruiter_email: str, after: Optional[Tuple[datetime, str]] = None, limit: Optional[int] = None
+    ) -> AsyncIterator[dict]:
+        """Dashboard fields of a recruiter's offers, newest first, after a (dateSigned, id) position"""
+        raise NotImplementedError
+
+    async def set_offer_status(self, hash_value: str, status: str, expected_status: Optional[str] = None) -> bool:
+        """Set an offer's status, only if it is currently expected_status when given; True if an offer matched"""
+        raise NotImplementedError
+
+    async def count_offers(self) -> int:
+        """Approximate number of stored offers"""
+        raise NotImplementedError
+
+    def iter_offer_keys(self, signed_since: Optional[datetime] = None) -> AsyncIterator[dict]:
+        """verificationKey, hash and recruiterEmail of every offer, optionally only those signed since a time"""
+        raise NotImplementedError
+
+    def iter_offer_match_fields(self, signed_since: Optional[datetime] = None) -> AsyncIterator[dict]:
+        """hash, candidateName, companyName, recruiterEmail and dateSigned of every offer (for fuzzy matching)"""
+        raise NotImplementedError
+
+    # Counters
+    async def next_sequence(self, name: str) -> int:
+        """Atomically allocate the next value of a named counter"""
+        raise NotImplementedError
+
+    # Revocations
+    async def insert_revocation(self, revocation: dict) -> bool:
+        """Record a revocation (hash, seq, revokedAt, ...); False if the offer is already revoked"""
+        raise NotImplementedError
+
+    async def find_revocation(self, hash_value: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def find_revocations_since(self, after_seq: int, limit: int) -> List[dict]:
+        """Revocations with seq greater than after_seq, in seq order"""
+        raise NotImplementedError
+
+    # Idempotency keys
+    async def claim_idempotency_key(self, record: dict) -> Optional[dict]:
+        """Claim a key (key, claimId, requestHash, leaseUntil, expiresAt); None if claimed, otherwise the record holding it.
+
+        A record that has expired, or whose claim lapsed without a response, is taken over.
+        """
+        raise NotImplementedError
+
+    async def complete_idempotency_key(self, key: str, claim_id: str, response: dict) -> bool:
+        """Store the response of a claimed key; False if the claim was taken over"""
+        raise NotImplementedError
+
+    async def release_idempotency_key(self, key: str, claim_id: str):
+        """Drop a claim that has no response, so the request can be retried"""
+        raise NotImplementedError
+
+    # Verification audit log
+    async def create_audit_log(self, retention_seconds: int):
+        """Prepare the audit log, expiring events after retention_seconds"""
+        raise NotImplementedError
+
+    async def insert_audit_events(self, events: List[dict]):
+        """Append audit events (timestamp, companyKey, outcome, clientFingerprint, ...)"""
+        raise NotImplementedError
+
+    async def aggregate_audit_events(self, since: datetime, company_key: Optional[str] = None, limit: int = 100) -> List[dict]:
+        """Per companyKey since a time: attempts, byOutcome, uniqueClients (of fingerprinted events) and lastAttempt, most attempts first"""
+        raise NotImplementedError
+
+    # Offer stats
+    async def increment_offer_stats(self, increments: Dict[Tuple[str, str], Dict[str, int]]):
+        """Atomically add to counters ("total", "byStatus.<status>", ...) of (scope, key) stats documents"""
+        raise NotImplementedError
+
+    async def find_offer_stats(self, scope: str, key: str) -> Optional[dict]:
+        """total, byStatus, byMonth and verificationHits of one stats document"""
+        raise NotImplementedError
+
+    async def aggregate_offer_counts(self) -> List[dict]:
+        """Offer counts grouped by recruiterEmail, companyName, status and month ("YYYY-MM"), in one pass"""
+        raise NotImplementedError
+
+    async def replace_offer_counts(self, stats: Dict[Tuple[str, str], dict]):
+        """Overwrite total, byStatus and byMonth of every stats document, keeping verificationHits"""
+        raise NotImplementedError
+
+    # Merkle anchoring
+    async def find_unanchored_offers(self, limit: int) -> List[dict]:
+        """hash and dateSigned of the oldest offers not yet in a Merkle batch"""
+        raise NotImplementedError
+
+    async def claim_offers_for_batch(self, hashes: List[str], batch_id: int):
+        """Assign still-unanchored offers among hashes to a batch"""
+        raise NotImplementedError
+
+    async def find_batch_offer_hashes(self, batch_id: int) -> List[str]:
+        """Hashes of the offers in a batch, sorted"""
+        raise NotImplementedError
+
+    async def insert_batch(self, batch: dict):
+        raise NotImplementedError
+
+    async def transition_batch(
+        self, batch_id: int, from_statuses: List[str], to_status: str, updated_before: Optional[datetime] = None
+    ) -> bool:
+        """Move a batch to to_status if it is in one of from_statuses; True if this call moved it"""
+        raise NotImplementedError
+
+    async def seal_batch(self, batch_id: int, fields: dict):
+        raise NotImplementedError
+
+    async def delete_unsealed_batch(self, batch_id: int):
+        raise NotImplementedError
+
+    async def find_stale_batches(self, updated_before: datetime) -> List[int]:
+        """Ids of unsealed batches not touched since updated_before"""
+        raise NotImplementedError
+
+    async def find_sealed_batch(self, batch_id: int) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def list_sealed_batches(self, after: int, limit: int) -> List[dict]:
+        raise NotImplementedError
+
+    async def upsert_proofs(self, proofs: List[dict]):
+        raise NotImplementedError
+
+    async def find_proof(self, hash_value: str) -> Optional[dict]:
+        raise NotImplementedError
+
+class MongoOfferStore(OfferStore):
+    """MongoDB engine using Motor.
+
+    write_concern is the "w" option ("majority", "1", ...); journal adds "j".
+    Unacknowledged writes (w=0) are refused: an issued offer must be stored
+    before the API reports it as issued.
+    """
+
+    def __init__(self, mongo_url: str, db_name: str, write_concern: str = "1", journal: bool = False):
+        self.mongo_url = mongo_url
+        self.db_name = db_name
+        self.write_concern = int(write_concern) if write_concern.isdigit() else write_concern
+        if self.write_concern == 0:
+            raise ValueError("Unacknowledged writes (w=0) are not supported")
+        self.journal = journal
+        self.client = None
+        self.db = None
+
+    async def connect(self):
+        options = {"w": self.write_concern}
+        if self.journal:
+            options["journal"] = True
+        self.client = AsyncIOMotorClient(
+            self.mongo_url, event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()], **options
+        )
+        self.db = self.client[self.db_name]
+
+    async def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    async def create_indexes(self):
+        await self.db.verified_offers.create_index(
+            [("verificationKey", 1), ("dateSigned", -1)],
+            name="verificationKey_dateSigned"
+        )
+        await self.db.verified_offers.create_index("hash", unique=True, name="hash_unique")
+        await self.db.verified_offers.create_index("dateSigned", name="dateSigned")
+        await self.db.verified_offers.create_index(
+            [("recruiterEmail", 1), ("dateSigned", -1), ("id", -1)],
+            name="recruiterEmail_dateSigned_id"
+        )
+        await self.db.verified_offers.create_index(
+            [("merkleBatch", 1), ("dateSigned", 1)], name="merkleBatch_dateSigned"
+        )
+        await self.db.merkle_batches.create_index("batchId", unique=True, name="batchId_unique")
+        await self.db.merkle_batches.create_index([("status", 1), ("updatedAt", 1)], name="status_updatedAt")
+        await self.db.merkle_proofs.create_index("hash", unique=True, name="hash_unique")
+        await self.db.offer_stats.create_index("rebuiltAt", name="rebuiltAt")
+        await self.db.revocations.create_index("seq", unique=True, name="seq_unique")
+        await self.db.revocations.create_index("hash", unique=True, name="hash_unique")
+        await self.db.idempotency_keys.create_index("expiresAt", expireAfterSeconds=0, name="expiresAt_ttl")
+
+    async def create_offer_content_index(self):
+        # Only verified offers conflict, so an offer can be reissued once revoked
+        await self.db.verified_offers.create_index(
+            "contentHash",
+            unique=True,
+            partialFilterExpression={"contentHash": {"$exists": True}, "status": "verified"},
+            name="contentHash_unique"
+        )
+
+    async def insert_offer(self, offer: dict):
+        try:
+            await self.db.verified_offers.insert_one(dict(offer))
+        except DuplicateKeyError as e:
+            if "contentHash" in str(e):
+                raise DuplicateContentError(offer['hash'])
+            raise DuplicateOfferError(offer['hash'])
+
+    async def insert_offers(self, offers: List[dict]) -> Dict[int, str]:
+        if not offers:
+            return {}
+        try:
+            await self.db.verified_offers.insert_many([dict(offer) for offer in offers], ordered=False)
+        except BulkWriteError as e:
+            return {
+                write_error['index']: (
+                    "error" if write_error.get('code') != 11000
+                    else "duplicateContent" if "contentHash" in write_error.get('errmsg', '')
+                    else "duplicate"
+                )
+                for write_error in e.details.get('writeErrors', [])
+            }
+        return {}
+
+    async def find_offer_by_key(self, verification_key: str) -> Optional[dict]:
+        return await self.db.verified_offers.find_one(
+            {"verificationKey": verification_key}, {"_id": 0}, sort=[("dateSigned", -1)]
+        )
+
+    async def find_offer_by_hash(self, hash_value: str) -> Optional[dict]:
+        return await self.db.verified_offers.find_one({"hash": hash_value}, {"_id": 0})
+
+    async def find_offers_by_keys(self, verification_keys: List[str]) -> List[dict]:
+        return await self.db.verified_offers.find(
+            {"verificationKey": {"$in": verification_keys}}, {"_id": 0}
+        ).to_list(length=None)
+
+    async def find_offers_by_hashes(self, hashes: List[str]) -> List[dict]:
+        return await self.db.verified_offers.find(
+            {"hash": {"$in": hashes}}, {"_id": 0}
+        ).to_list(length=None)
+
+    async def iter_recruiter_offers(self, recruiter_email, after=None, limit=None):
+        query = {"recruiterEmail": recruiter_email}
+        if after:
+            date_signed, offer_id = after
+            query["$or"] = [
+                {"dateSigned": {"$lt": date_signed}},
+                {"dateSigned": date_signed, "id": {"$lt": offer_id}}
+            ]
+        projection = {"_id": 0, **{field: 1 for field in RECRUITER_OFFER_FIELDS}}
+        # Newest first, matching the recruiterEmail_dateSigned_id index
+        cursor = self.db.verified_offers.find(
+            query, projection, batch_size=min(limit or ITER_BATCH_SIZE, ITER_BATCH_SIZE)
+        ).sort([("dateSigned", -1), ("id", -1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        async for offer in cursor:
+            yield offer
+
+    async def set_offer_status(self, hash_value: str, status: str, expected_status: Optional[str] = None) -> bool:
+        query = {"hash": hash_value}
+        if expected_status is not None:
+            query["status"] = expected_status
+        result = await self.db.verified_offers.update_one(query, {"$set": {"status": status}})
+        return result.matched_count > 0
+
+    async def count_offers(self) -> int:
+        return await self.db.verified_offers.estimated_document_count()
+
+    async def iter_offer_keys(self, signed_since=None):
+        query = {"dateSigned": {"$gte": signed_since}} if signed_since else {}
+        cursor = self.db.verified_offers.find(
+            query, {"_id": 0, "verificationKey": 1, "hash": 1, "recruiterEmail": 1}, batch_size=10000
+        )
+        async for offer in cursor:
+            yield offer
+
+    async def iter_offer_match_fields(self, signed_since=None):
+        query = {"dateSigned": {"$gte": signed_since}} if signed_since else {}
+        cursor = self.db.verified_offers.find(
+            query,
+            {"_id": 0, "hash": 1, "candidateName": 1, "companyName": 1, "recruiterEmail": 1, "dateSigned": 1},
+            batch_size=10000
+        )
+        async for offer in cursor:
+            yield offer
+
+    async def next_sequence(self, name: str) -> int:
+        counter = await self.db.counters.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter['seq']
+
+    async def insert_revocation(self, revocation: dict) -> bool:
+        try:
+            await self.db.revocations.insert_one(dict(revocation))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def find_revocation(self, hash_value: str) -> Optional[dict]:
+        return await self.db.revocations.find_one({"hash": hash_value}, {"_id": 0})
+
+    async def find_revocations_since(self, after_seq: int, limit: int) -> List[dict]:
+        return await self.db.revocations.find(
+            {"seq": {"$gt": after_seq}}, {"_id": 0}
+        ).sort("seq", 1).limit(limit).to_list(length=limit)
+
+    async def claim_idempotency_key(self, record: dict) -> Optional[dict]:
+        document = {"_id": record['key'], **record}
+        while True:
+            try:
+                await self.db.idempotency_keys.insert_one(document)
+                return None
+            except DuplicateKeyError:
+                pass
+            # The TTL monitor runs about once a minute, so expired records may still be here
+            now = datetime.utcnow()
+            result = await self.db.idempotency_keys.replace_one({
+                "_id": record['key'],
+                "$or": [{"expiresAt": {"$lte": now}}, {"response": {"$exists": False}, "leaseUntil": {"$lte": now}}]
+            }, document)
+            if result.matched_count:
+                return None
+            existing = await self.db.idempotency_keys.find_one({"_id": record['key']}, {"_id": 0})
+            if existing is not None:
+                return existing
+
+    async def complete_idempotency_key(self, key: str, claim_id: str, response: dict) -> bool:
+        result = await self.db.idempotency_keys.update_one(
+            {"_id": key, "claimId": claim_id}, {"$set": {"response": response}}
+        )
+        return result.matched_count > 0
+
+    async def release_idempotency_key(self, key: str, claim_id: str):
+        await self.db.idempotency_keys.delete_one({"_id": key, "claimId": claim_id, "response": {"$exists": False}})
+
+    async def create_audit_log(self, retention_seconds: int):
+        try:
+            # Buckets per company keep per-company range scans compact
+            await self.db.create_collection(
+                "verification_audit",
+                timeseries={"timeField": "timestamp", "metaField": "companyKey", "granularity": "seconds"},
+                expireAfterSeconds=retention_seconds
+            )
+        except CollectionInvalid:
+            try:
+                await self.db.command("collMod", "verification_audit", expireAfterSeconds=retention_seconds)
+            except OperationFailure:
+                pass
+        except OperationFailure:
+            # Servers without time-series collections get a plain collection with a TTL index
+            await self.db.verification_audit.create_index(
+                "timestamp", expireAfterSeconds=retention_seconds, name="timestamp_ttl"
+            )
+        await self.db.verification_audit.create_index([("companyKey", 1), ("timestamp", -1)], name="companyKey_timestamp")
+
+    async def insert_audit_events(self, events: List[dict]):
+        if events:
+            await self.db.verification_audit.insert_many([dict(event) for event in events], ordered=False)
+
+    async def aggregate_audit_events(self, since, company_key=None, limit=100):
+        query = {"timestamp": {"$gte": since}}
+        if company_key is not None:
+            query["companyKey"] = company_key
+        cursor = self.db.verification_audit.aggregate([
+            {"$match": query},
+            {"$facet": {
+                "outcomes": [
+                    {"$group": {
+                        "_id": {"companyKey": "$companyKey", "outcome": "$outcome"},
+                        "count": {"$sum": 1},
+                        "lastAttempt": {"$max": "$timestamp"}
+                    }}
+                ],
+                "clients": [
+                    {"$match": {"clientFingerprint": {"$ne": None}}},
+                    {"$group": {"_id": {"companyKey": "$companyKey", "client": "$clientFingerprint"}}},
+                    {"$group": {"_id": "$_id.companyKey", "uniqueClients": {"$sum": 1}}}
+                ]
+            }}
+        ], allowDiskUse=True)
+        result = (await cursor.to_list(length=1))[0]
+        return _audit_summaries(
+            [
+                (group["_id"]["companyKey"], group["_id"]["outcome"], group["count"], group["lastAttempt"])
+                for group in result["outcomes"]
+            ],
+            [(group["_id"], group["uniqueClients"]) for group in result["clients"]],
+            limit
+        )
+
+    async def increment_offer_stats(self, increments):
+        if increments:
+            await self.db.offer_stats.bulk_write([
+                UpdateOne(
+                    {"_id": f"{scope}:{key}"},
+                    {"$inc": counters, "$setOnInsert": {"scope": scope, "key": key}},
+                    upsert=True
+                )
+                for (scope, key), counters in increments.items()
+            ], ordered=False)
+
+    async def find_offer_stats(self, scope: str, key: str) -> Optional[dict]:
+        stats = await self.db.offer_stats.find_one(
+            {"_id": f"{scope}:{key}"}, {"_id": 0, "total": 1, "byStatus": 1, "byMonth": 1, "verificationHits": 1}
+        )
+        if stats is None:
+            return None
+        return {
+            "total": stats.get("total", 0),
+            "byStatus": stats.get("byStatus", {}),
+            "byMonth": stats.get("byMonth", {}),
+            "verificationHits": stats.get("verificationHits", 0)
+        }
+
+    async def aggregate_offer_counts(self) -> List[dict]:
+        cursor = self.db.verified_offers.aggregate([
+            {"$group": {
+                "_id": {
+                    "recruiterEmail": "$recruiterEmail",
+                    "companyName": "$companyName",
+                    "status": {"$ifNull": ["$status", "verified"]},
+                    "month": {"$dateToString": {"format": "%Y-%m", "date": "$dateSigned"}}
+                },
+                "count": {"$sum": 1}
+            }}
+        ], allowDiskUse=True)
+        return [{**group["_id"], "count": group["count"]} async for group in cursor]
+
+    async def replace_offer_counts(self, stats):
+        # Tag every rebuilt document, then zero the ones this rebuild did not produce
+        rebuilt_at = datetime.utcnow()
+        updates = [
+            UpdateOne(
+                {"_id": f"{scope}:{key}"},
+                {"$set": {
+                    "scope": scope, "key": key, "rebuiltAt": rebuilt_at,
+                    **{field: counts[field] for field in REBUILT_STATS_FIELDS}
+                }},
+                upsert=True
+            )
+            for (scope, key), counts in stats.items()
+        ]
+        for start in range(0, len(updates), ITER_BATCH_SIZE):
+            await self.db.offer_stats.bulk_write(updates[start:start + ITER_BATCH_SIZE], ordered=False)
+        await self.db.offer_stats.update_many(
+            {"rebuiltAt": {"$ne": rebuilt_at}},
+            {"$set": {"total": 0, "byStatus": {}, "byMonth": {}, "rebuiltAt": rebuilt_at}}
+        )
+
+    async def find_unanchored_offers(self, limit: int) -> List[dict]:
+        return await self.db.verified_offers.find(
+            {"merkleBatch": None}, {"_id": 0, "hash": 1, "dateSigned": 1}
+        ).sort("dateSigned", 1).limit(limit).to_list(length=limit)
+
+    async def claim_offers_for_batch(self, hashes: List[str], batch_id: int):
+        await self.db.verified_offers.update_many(
+            {"hash": {"$in": hashes}, "merkleBatch": None},
+            {"$set": {"merkleBatch": batch_id}}
+        )
+
+    async def find_batch_offer_hashes(self, batch_id: int) -> List[str]:
+        leaves = await self.db.verified_offers.find(
+            {"merkleBatch": batch_id}, {"_id": 0, "hash": 1}
+        ).sort("hash", 1).to_list(length=None)
+        return [leaf['hash'] for leaf in leaves]
+
+    async def insert_batch(self, batch: dict):
+        await self.db.merkle_batches.insert_one(dict(batch))
+
+    async def transition_batch(self, batch_id, from_statuses, to_status, updated_before=None) -> bool:
+        query = {"batchId": batch_id, "status": {"$in": from_statuses}}
+        if updated_before:
+            query["updatedAt"] = {"$lt": updated_before}
+        batch = await self.db.merkle_batches.find_one_and_update(
+            query, {"$set": {"status": to_status, "updatedAt": datetime.utcnow()}}
+        )
+        return batch is not None
+
+    async def seal_batch(self, batch_id: int, fields: dict):
+        await self.db.merkle_batches.update_one(
+            {"batchId": batch_id},
+            {"$set": {**fields, "status": "sealed", "updatedAt": datetime.utcnow()}}
+        )
+
+    async def delete_unsealed_batch(self, batch_id: int):
+        await self.db.merkle_batches.delete_one({"batchId": batch_id, "status": {"$ne": "sealed"}})
+
+    async def find_stale_batches(self, updated_before: datetime) -> List[int]:
+        batches = await self.db.merkle_batches.find(
+            {"status": {"$in": ["claiming", "claimed"]}, "updatedAt": {"$lt": updated_before}},
+            {"_id": 0, "batchId": 1}
+        ).to_list(length=None)
+        return [batch['batchId'] for batch in batches]
+
+    async def find_sealed_batch(self, batch_id: int) -> Optional[dict]:
+        return await self.db.merkle_batches.find_one(
+            {"batchId": batch_id, "status": "sealed"},
+            {"_id": 0, "type": 1, "batchId": 1, "root": 1, "leafCount": 1, "kid": 1, "signature": 1, "sealedAt": 1}
+        )
+
+    async def list_sealed_batches(self, after: int, limit: int) -> List[dict]:
+        return await self.db.merkle_batches.find(
+            {"status": "sealed", "batchId": {"$gt": after}},
+            {"_id": 0, "type": 1, "batchId": 1, "root": 1, "leafCount": 1, "kid": 1, "signature": 1, "sealedAt": 1}
+        ).sort("batchId", 1).limit(limit).to_list(length=limit)
+
+    async def upsert_proofs(self, proofs: List[dict]):
+        if proofs:
+            await self.db.merkle_proofs.bulk_write([
+                UpdateOne({"hash": proof['hash']}, {"$set": proof}, upsert=True) for proof in proofs
+            ], ordered=False)
+
+    async def find_proof(self, hash_value: str) -> Optional[dict]:
+        return await self.db.merkle_proofs.find_one({"hash": hash_value}, {"_id": 0})
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verified_offers (
+    hash TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    verificationKey TEXT,
+    recruiterEmail TEXT NOT NULL,
+    dateSigned TEXT NOT NULL,
+    status TEXT NOT NULL,
+    merkleBatch INTEGER,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS verificationKey_dateSigned ON verified_offers (verificationKey, dateSigned DESC);
+CREATE INDEX IF NOT EXISTS dateSigned ON verified_offers (dateSigned);
+CREATE INDEX IF NOT EXISTS recruiterEmail_dateSigned_id ON verified_offers (recruiterEmail, dateSigned DESC, id DESC);
+CREATE INDEX IF NOT EXISTS merkleBatch_dateSigned ON verified_offers (merkleBatch, dateSigned);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS merkle_batches (
+    batchId INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    updatedAt TEXT NOT NULL,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS status_updatedAt ON merkle_batches (status, updatedAt);
+CREATE TABLE IF NOT EXISTS merkle_proofs (
+    hash TEXT PRIMARY KEY,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS offer_stats (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (scope, key, field)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS verification_audit (
+    timestamp TEXT NOT NULL,
+    companyKey TEXT,
+    outcome TEXT NOT NULL,
+    clientFingerprint TEXT,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS companyKey_timestamp ON verification_audit (companyKey, timestamp);
+CREATE INDEX IF NOT EXISTS audit_timestamp ON verification_audit (timestamp);
+CREATE TABLE IF NOT EXISTS revocations (
+    seq INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    expiresAt TEXT NOT NULL,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_expiresAt ON idempotency_keys (expiresAt);
+"""
+
+def _audit_summaries(outcome_counts, client_counts, limit: int) -> List[dict]:
+    """Fold (companyKey, outcome, count, lastAttempt) and (companyKey, uniqueClients) rows into per-company summaries"""
+    summaries = {}
+    for company_key, outcome, count, last_attempt in outcome_counts:
+        summary = summaries.setdefault(company_key, {
+            "companyKey": company_key, "attempts": 0, "byOutcome": {}, "uniqueClients": 0, "lastAttempt": last_attempt
+        })
+        summary["attempts"] += count
+        summary["byOutcome"][outcome] = count
+        summary["lastAttempt"] = max(summary["lastAttempt"], last_attempt)
+    for company_key, unique_clients in client_counts:
+        if company_key in summaries:
+            summaries[company_key]["uniqueClients"] = unique_clients
+    return sorted(summaries.values(), key=lambda summary: summary["attempts"], reverse=True)[:limit]
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+def _decode(document: dict) -> dict:
+    for key, value in document.items():
+        if isinstance(value, dict) and set(value) == {"$date"}:
+            document[key] = datetime.fromisoformat(value["$date"])
+    return document
+
+def _dumps(document: dict) -> str:
+    return json.dumps(document, default=_encode)
+
+def _loads(text: str) -> dict:
+    return _decode(json.loads(text))
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width ISO format so timestamps sort correctly as text
+    return value.strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+@lru_cache(maxsize=256)
+def _statement_labels(sql: str) -> Tuple[str, str]:
+    """(table, operation) metric labels for a SQL statement"""
+    match = STATEMENT_TABLE.search(sql)
+    return (match.group(1) if match else "unknown"), sql.split(None, 1)[0].lower()
+
+class SQLiteOfferStore(OfferStore):
+    """Embedded SQLite engine (WAL mode on disk, or ":memory:").
+
+    All statements run on one connection owned by a single-thread executor,
+    which serializes access without blocking the event loop. With journal,
+    every commit is synced to disk (synchronous=FULL) instead of at WAL
+    checkpoints.
+    """
+
+    def __init__(self, path: str, journal: bool = False):
+        self.path = path
+        self.journal = journal
+        self.audit_retention = None
+        self._connection = None
+        self._executor = None
+
+    async def _run(self, function, *args, labels: Optional[Tuple[str, str]] = None):
+        """Run on the connection's thread; with (table, operation) labels, record queue wait and duration"""
+        if labels is None:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+        queued = time.perf_counter()
+        started = finished = None
+
+        def timed():
+            nonlocal started, finished
+            started = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                finished = time.perf_counter()
+
+        failed = True
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+            failed = False
+            return result
+        finally:
+            if started is not None:
+                # The single connection thread is this engine's pool: queueing for it is the checkout wait
+                record_pool_wait("sqlite", started - queued)
+                record_db_command(labels[0], labels[1], finished - started, failed=failed)
+
+    async def connect(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+
+        def open_connection():
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(f"PRAGMA synchronous={'FULL' if self.journal else 'NORMAL'}")
+            return connection
+
+        self._connection = await self._run(open_connection)
+
+    async def close(self):
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def create_indexes(self):
+        await self._run(self._connection.executescript, SQLITE_SCHEMA)
+
+    async def _fetchall(self, sql: str, parameters=()) -> list:
+        return await self._run(lambda: self._connection.execute(sql, parameters).fetchall(), labels=_statement_labels(sql))
+
+    async def _execute(self, sql: str, parameters=()) -> int:
+        return await self._run(lambda: self._connection.execute(sql, parameters).rowcount, labels=_statement_labels(sql))
+
+    @staticmethod
+    def _offer_row(offer: dict) -> tuple:
+        return (
+            offer['hash'], offer['id'], offer.get('verificationKey'), offer['recruiterEmail'],
+            _timestamp(offer['dateSigned']), offer.get('status', 'verified'), offer.get('merkleBatch'),
+            _dumps(offer)
+        )
+
+    @staticmethod
+    def _offer_document(row) -> dict:
+        status, merkle_batch, document = row
+        offer = _loads(document)
+        offer['status'] = status
+        if merkle_batch is not None:
+            offer['merkleBatch'] = merkle_batch
+        return offer
+
+    async def create_offer_content_index(self):
+        # Only verified offers conflict, so an offer can be reissued once revoked
+        await self._execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS contentHash_unique "
+            "ON verified_offers (json_extract(document, '$.contentHash')) "
+            "WHERE status = 'verified' AND json_extract(document, '$.contentHash') IS NOT NULL"
+        )
+
+    async def insert_offer(self, offer: dict):
+        try:
+            await self._execute("INSERT INTO verified_offers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._offer_row(offer))
+        except sqlite3.IntegrityError as e:
+            if "contentHash" in str(e):
+                raise DuplicateContentError(offer['hash'])
+            raise DuplicateOfferError(offer['hash'])
+
+    async def insert_offers(self, offers: List[dict]) -> Dict[int, str]:
+        rows = [self._offer_row(offer) for offer in offers]
+
+        def insert_all():
+            failures = {}
+            self._connection.execute("BEGIN")
+            try:
+                for index, row in enumerate(rows):
+                    try:
+                        self._connection.execute("INSERT INTO verified_offers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+                    except sqlite3.IntegrityError as e:
+                        failures[index] = "duplicateContent" if "contentHash" in str(e) else "duplicate"
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            return failures
+
+        try:
+            return await self._run(insert_all, labels=("verified_offers", "insert"))
+        except sqlite3.Error:
+            return {index: "error" for index in range(len(offers))}
+
+    async def find_offer_by_key(self, verification_key: str) -> Optional[dict]:
+        rows = await self._fetchall(
+            "SELECT status, merkleBatch, document FROM verified_offers "
+            "WHERE verificationKey = ? ORDER BY dateSigned DESC LIMIT 1",
+            (verification_key,)
+        )
+        return self._offer_document(rows[0]) if rows else None
+
+    async def find_offer_by_hash(self, hash_value: str) -> Optional[dict]:
+        rows = await self._fetchall(
+            "SELECT status, merkleBatch, document FROM verified_offers WHERE hash = ?", (hash_value,)
+        )
+        return self._offer_document(rows[0]) if rows else None
+
+    async def _find_offers_in(self, column: str, values: List[str]) -> List[dict]:
+        offers = []
+        # Stay well under SQLite's bound parameter limit
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            rows = await self._fetchall(
+                f"SELECT status, merkleBatch, document FROM verified_offers "
+                f"WHERE {column} IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            offers.extend(self._offer_document(row) for row in rows)
+        return offers
+
+    async def find_offers_by_keys(self, verification_keys: List[str]) -> List[dict]:
+        return await self._find_offers_in("verificationKey", list(verification_keys))
+
+    async def find_offers_by_hashes(self, hashes: List[str]) -> List[dict]:
+        return await self._find_offers_in("hash", list(hashes))
+
+    async def iter_recruiter_offers(self, recruiter_email, after=None, limit=None):
+        remaining = limit
+        while remaining is None or remaining > 0:
+            batch_size = min(remaining or ITER_BATCH_SIZE, ITER_BATCH_SIZE)
+            if after:
+                date_signed, offer_id = after
+                rows = await self._fetchall(
+                    "SELECT status, merkleBatch, document, dateSigned, id FROM verified_offers "
+                    "WHERE recruiterEmail = ? AND (dateSigned < ? OR (dateSigned = ? AND id < ?)) "
+                    "ORDER BY dateSigned DESC, id DESC LIMIT ?",
+                    (recruiter_email, _timestamp(date_signed), _timestamp(date_signed), offer_id, batch_size)
+                )
+            else:
+                rows = await self._fetchall(
+                    "SELECT status, merkleBatch, document, dateSigned, id FROM verified_offers "
+                    "WHERE recruiterEmail = ? ORDER BY dateSigned DESC, id DESC LIMIT ?",
+                    (recruiter_email, batch_size)
+                )
+            for row in rows:
+                offer = self._offer_document(row[:3])
+                yield {field: offer[field] for field in RECRUITER_OFFER_FIELDS if field in offer}
+            if len(rows) < batch_size:
+                return
+            if remaining is not None:
+                remaining -= len(rows)
+            after = (datetime.fromisoformat(rows[-1][3]), rows[-1][4])
+
+    async def set_offer_status(self, hash_value: str, status: str, expected_status: Optional[str] = None) -> bool:
+        if expected_status is None:
+            return await self._execute(
+                "UPDATE verified_offers SET status = ? WHERE hash = ?", (status, hash_value)
+            ) > 0
+        return await self._execute(
+            "UPDATE verified_offers SET status = ? WHERE hash = ? AND status = ?", (status, hash_value, expected_status)
+        ) > 0
+
+    async def count_offers(self) -> int:
+        rows = await self._fetchall("SELECT COUNT(*) FROM verified_offers")
+        return rows[0][0]
+
+    async def _iter_offer_rows(self, columns: str, signed_since=None):
+        """Page through offers by rowid, or since a time by (dateSigned, rowid) on the dateSigned index"""
+        if signed_since is None:
+            last_rowid = 0
+            while True:
+                rows = await self._fetchall(
+                    f"SELECT rowid, {columns} FROM verified_offers WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, ITER_BATCH_SIZE)
+                )
+                for row in rows:
+                    yield row[1:]
+                if len(rows) < ITER_BATCH_SIZE:
+                    return
+                last_rowid = rows[-1][0]
+
+        # A delta sync only touches offers signed since the watermark
+        rows = await self._fetchall(
+            f"SELECT dateSigned, rowid, {columns} FROM verified_offers "
+            "WHERE dateSigned >= ? ORDER BY dateSigned, rowid LIMIT ?",
+            (_timestamp(signed_since), ITER_BATCH_SIZE)
+        )
+        while True:
+            for row in rows:
+                yield row[2:]
+            if len(rows) < ITER_BATCH_SIZE:
+                return
+            rows = await self._fetchall(
+                f"SELECT dateSigned, rowid, {columns} FROM verified_offers "
+                "WHERE (dateSigned, rowid) > (?, ?) ORDER BY dateSigned, rowid LIMIT ?",
+                (rows[-1][0], rows[-1][1], ITER_BATCH_SIZE)
+            )
+
+    async def iter_offer_keys(self, signed_since=None):
+        async for verification_key, hash_value, recruiter_email in self._iter_offer_rows(
+            "verificationKey, hash, recruiterEmail", signed_since
+        ):
+            yield {"verificationKey": verification_key, "hash": hash_value, "recruiterEmail": recruiter_email}
+
+    async def iter_offer_match_fields(self, signed_since=None):
+        columns = (
+            "hash, json_extract(document, '$.candidateName'), json_extract(document, '$.companyName'), "
+            "recruiterEmail, dateSigned"
+        )
+        async for hash_value, candidate_name, company_name, recruiter_email, date_signed in self._iter_offer_rows(
+            columns, signed_since
+        ):
+            yield {
+                "hash": hash_value,
+                "candidateName": candidate_name,
+                "companyName": company_name,
+                "recruiterEmail": recruiter_email,
+                "dateSigned": datetime.fromisoformat(date_signed)
+            }
+
+    async def next_sequence(self, name: str) -> int:
+        rows = await self._fetchall(
+            "INSERT INTO counters (name, seq) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET seq = seq + 1 RETURNING seq",
+            (name,)
+        )
+        return rows[0][0]
+
+    async def insert_revocation(self, revocation: dict) -> bool:
+        try:
+            await self._execute(
+                "INSERT INTO revocations VALUES (?, ?, ?)", (revocation['seq'], revocation['hash'], _dumps(revocation))
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    async def find_revocation(self, hash_value: str) -> Optional[dict]:
+        rows = await self._fetchall("SELECT document FROM revocations WHERE hash = ?", (hash_value,))
+        return _loads(rows[0][0]) if rows else None
+
+    async def find_revocations_since(self, after_seq: int, limit: int) -> List[dict]:
+        rows = await self._fetchall(
+            "SELECT document FROM revocations WHERE seq > ? ORDER BY seq LIMIT ?", (after_seq, limit)
+        )
+        return [_loads(row[0]) for row in rows]
+
+    async def claim_idempotency_key(self, record: dict) -> Optional[dict]:
+        row = (record['key'], _timestamp(record['expiresAt']), _dumps(record))
+
+        def claim():
+            now = _timestamp(datetime.utcnow())
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired keys are deleted as new ones are claimed
+                self._connection.execute("DELETE FROM idempotency_keys WHERE expiresAt <= ?", (now,))
+                rows = self._connection.execute(
+                    "SELECT document FROM idempotency_keys WHERE key = ?", (record['key'],)
+                ).fetchall()
+                existing = _loads(rows[0][0]) if rows else None
+                if existing is None or ('response' not in existing and _timestamp(existing['leaseUntil']) <= now):
+                    self._connection.execute("INSERT OR REPLACE INTO idempotency_keys VALUES (?, ?, ?)", row)
+                    existing = None
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            return existing
+
+        return await self._run(claim, labels=("idempotency_keys", "claim"))
+
+    async def complete_idempotency_key(self, key: str, claim_id: str, response: dict) -> bool:
+        def complete():
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._connection.execute(
+                    "SELECT document FROM idempotency_keys WHERE key = ?", (key,)
+                ).fetchall()
+                record = _loads(rows[0][0]) if rows else None
+                completed = record is not None and record['claimId'] == claim_id
+                if completed:
+                    self._connection.execute(
+                        "UPDATE idempotency_keys SET document = ? WHERE key = ?",
+                        (_dumps({**record, "response": response}), key)
+                    )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            return completed
+
+        return await self._run(complete, labels=("idempotency_keys", "update"))
+
+    async def release_idempotency_key(self, key: str, claim_id: str):
+        await self._execute(
+            "DELETE FROM idempotency_keys WHERE key = ? AND json_extract(document, '$.claimId') = ? "
+            "AND json_extract(document, '$.response') IS NULL",
+            (key, claim_id)
+        )
+
+    async def create_audit_log(self, retention_seconds: int):
+        # Expired events are deleted as new ones are inserted
+        self.audit_retention = timedelta(seconds=retention_seconds)
+
+    async def insert_audit_events(self, events: List[dict]):
+        rows = [
+            (_timestamp(event['timestamp']), event.get('companyKey'), event['outcome'],
+             event.get('clientFingerprint'), _dumps(event))
+            for event in events
+        ]
+        expired_before = _timestamp(datetime.utcnow() - self.audit_retention) if self.audit_retention else None
+
+        def insert_all():
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany("INSERT INTO verification_audit VALUES (?, ?, ?, ?, ?)", rows)
+                if expired_before:
+                    self._connection.execute("DELETE FROM verification_audit WHERE timestamp < ?", (expired_before,))
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        if rows:
+            await self._run(insert_all, labels=("verification_audit", "insert"))
+
+    async def aggregate_audit_events(self, since, company_key=None, limit=100):
+        condition = "timestamp >= ?"
+        parameters = [_timestamp(since)]
+        if company_key is not None:
+            condition += " AND companyKey = ?"
+            parameters.append(company_key)
+        outcome_counts = await self._fetchall(
+            f"SELECT companyKey, outcome, COUNT(*), MAX(timestamp) FROM verification_audit "
+            f"WHERE {condition} GROUP BY companyKey, outcome",
+            parameters
+        )
+        client_counts = await self._fetchall(
+            f"SELECT companyKey, COUNT(DISTINCT clientFingerprint) FROM verification_audit "
+            f"WHERE {condition} GROUP BY companyKey",
+            parameters
+        )
+        return _audit_summaries(
+            [(company_key, outcome, count, datetime.fromisoformat(last)) for company_key, outcome, count, last in outcome_counts],
+            client_counts,
+            limit
+        )
+
+    async def increment_offer_stats(self, increments):
+        rows = [
+            (scope, key, field, value)
+            for (scope, key), counters in increments.items()
+            for field, value in counters.items()
+        ]
+
+        def increment_all():
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "INSERT INTO offer_stats VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (scope, key, field) DO UPDATE SET value = value + excluded.value",
+                    rows
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        if rows:
+            await self._run(increment_all, labels=("offer_stats", "upsert"))
+
+    async def find_offer_stats(self, scope: str, key: str) -> Optional[dict]:
+        rows = await self._fetchall("SELECT field, value FROM offer_stats WHERE scope = ? AND key = ?", (scope, key))
+        if not rows:
+            return None
+        stats = {"total": 0, "byStatus": {}, "byMonth": {}, "verificationHits": 0}
+        for field, value in rows:
+            group, _, name = field.partition(".")
+            if name:
+                stats[group][name] = value
+            else:
+                stats[group] = value
+        return stats
+
+    async def aggregate_offer_counts(self) -> List[dict]:
+        rows = await self._fetchall(
+            "SELECT recruiterEmail, json_extract(document, '$.companyName'), status, substr(dateSigned, 1, 7), COUNT(*) "
+            "FROM verified_offers GROUP BY 1, 2, 3, 4"
+        )
+        return [
+            {"recruiterEmail": recruiter_email, "companyName": company_name, "status": status, "month": month, "count": count}
+            for recruiter_email, company_name, status, month, count in rows
+        ]
+
+    async def replace_offer_counts(self, stats):
+        rows = []
+        for (scope, key), counts in stats.items():
+            rows.append((scope, key, "total", counts["total"]))
+            rows.extend((scope, key, f"byStatus.{status}", count) for status, count in counts["byStatus"].items())
+            rows.extend((scope, key, f"byMonth.{month}", count) for month, count in counts["byMonth"].items())
+
+        def replace_all():
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.execute("DELETE FROM offer_stats WHERE field != 'verificationHits'")
+                self._connection.executemany("INSERT INTO offer_stats VALUES (?, ?, ?, ?)", rows)
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        await self._run(replace_all, labels=("offer_stats", "replace"))
+
+    async def find_unanchored_offers(self, limit: int) -> List[dict]:
+        rows = await self._fetchall(
+            "SELECT hash, dateSigned FROM verified_offers WHERE merkleBatch IS NULL ORDER BY dateSigned LIMIT ?",
+            (limit,)
+        )
+        return [{"hash": hash_value, "dateSigned": datetime.fromisoformat(date_signed)} for hash_value, date_signed in rows]
+
+    async def claim_offers_for_batch(self, hashes: List[str], batch_id: int):
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            await self._execute(
+                f"UPDATE verified_offers SET merkleBatch = ? "
+                f"WHERE merkleBatch IS NULL AND hash IN ({','.join('?' * len(chunk))})",
+                [batch_id, *chunk]
+            )
+
+    async def find_batch_offer_hashes(self, batch_id: int) -> List[str]:
+        rows = await self._fetchall(
+            "SELECT hash FROM verified_offers WHERE merkleBatch = ? ORDER BY hash", (batch_id,)
+        )
+        return [row[0] for row in rows]
+
+    async def insert_batch(self, batch: dict):
+        await self._execute(
+            "INSERT INTO merkle_batches VALUES (?, ?, ?, ?)",
+            (batch['batchId'], batch['status'], _timestamp(batch['updatedAt']), _dumps(batch))
+        )
+
+    async def _update_batch(self, batch_id: int, fields: dict, condition: str = "", parameters=()) -> bool:
+        def update():
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    f"SELECT document FROM merkle_batches WHERE batchId = ? {condition}", (batch_id, *parameters)
+                ).fetchone()
+                if row is None:
+                    self._connection.execute("COMMIT")
+                    return False
+                batch = {**_loads(row[0]), **fields}
+                self._connection.execute(
+                    "UPDATE merkle_batches SET status = ?, updatedAt = ?, document = ? WHERE batchId = ?",
+                    (batch['status'], _timestamp(batch['updatedAt']), _dumps(batch), batch_id)
+                )
+                self._connection.execute("COMMIT")
+                return True
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        return await self._run(update, labels=("merkle_batches", "update"))
+
+    async def transition_batch(self, batch_id, from_statuses, to_status, updated_before=None) -> bool:
+        condition = f"AND status IN ({','.join('?' * len(from_statuses))})"
+        parameters = list(from_statuses)
+        if updated_before:
+            condition += " AND updatedAt < ?"
+            parameters.append(_timestamp(updated_before))
+        return await self._update_batch(
+            batch_id, {"status": to_status, "updatedAt": datetime.utcnow()}, condition, parameters
+        )
+
+    async def seal_batch(self, batch_id: int, fields: dict):
+        await self._update_batch(batch_id, {**fields, "status": "sealed", "updatedAt": datetime.utcnow()})
+
+    async def delete_unsealed_batch(self, batch_id: int):
+        await self._execute("DELETE FROM merkle_batches WHERE batchId = ? AND status != 'sealed'", (batch_id,))
+
+    async def find_stale_batches(self, updated_before: datetime) -> List[int]:
+        rows = await self._fetchall(
+            "SELECT batchId FROM merkle_batches WHERE status IN ('claiming', 'claimed') AND updatedAt < ?",
+            (_timestamp(updated_before),)
+        )
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _sealed_batch(document: str) -> dict:
+        batch = _loads(document)
+        return {
+            field: batch[field]
+            for field in ("type", "batchId", "root", "leafCount", "kid", "signature", "sealedAt")
+            if field in batch
+        }
+
+    async def find_sealed_batch(self, batch_id: int) -> Optional[dict]:
+        rows = await self._fetchall(
+            "SELECT document FROM merkle_batches WHERE batchId = ? AND status = 'sealed'", (batch_id,)
+        )
+        return self._sealed_batch(rows[0][0]) if rows else None
+
+    async def list_sealed_batches(self, after: int, limit: int) -> List[dict]:
+        rows = await self._fetchall(
+            "SELECT document FROM merkle_batches WHERE status = 'sealed' AND batchId > ? ORDER BY batchId LIMIT ?",
+            (after, limit)
+        )
+        return [self._sealed_batch(row[0]) for row in rows]
+
+    async def upsert_proofs(self, proofs: List[dict]):
+        rows = [(proof['hash'], _dumps(proof)) for proof in proofs]
+        await self._run(lambda: self._connection.executemany(
+            "INSERT INTO merkle_proofs VALUES (?, ?) ON CONFLICT (hash) DO UPDATE SET document = excluded.document",
+            rows
+        ), labels=("merkle_proofs", "upsert"))
+
+    async def find_proof(self, hash_value: str) -> Optional[dict]:
+        rows = await self._fetchall("SELECT document FROM merkle_proofs WHERE hash = ?", (hash_value,))
+        return _loads(rows[0][0]) if rows else None
+
+def create_store(engine: str, **settings) -> OfferStore:
+    """Build the storage engine named in the environment (nothing connects until connect())"""
+    journal = settings.get('journal', False)
+    if engine == "mongo":
+        return MongoOfferStore(
+            settings['mongo_url'], settings['db_name'], settings.get('write_concern', "1"), journal
+        )
+    if engine in ("sqlite", "memory"):
+        return SQLiteOfferStore(":memory:" if engine == "memory" else settings['sqlite_path'], journal)
+    raise ValueError(f"Unknown storage engine: {engine}")
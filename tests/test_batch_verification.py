@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Tests for streamed batch verification in backend/server.py"""
+import json
+import sys
+import unittest
+import uuid
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+from storage import SQLiteOfferStore  # noqa: E402
+
+def make_offer(candidate_name: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "hash": uuid.uuid4().hex + uuid.uuid4().hex,
+        "candidateName": candidate_name,
+        "companyName": "TechCorp Inc",
+        "recruiterEmail": "hr@techcorp.com",
+        "recruiterName": "John Recruiter",
+        "position": "Software Engineer",
+        "verificationKey": server.generate_verification_key(candidate_name, "TechCorp Inc", "hr@techcorp.com"),
+        "dateSigned": datetime.utcnow(),
+        "status": "verified"
+    }
+
+class BatchVerificationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = SQLiteOfferStore(":memory:")
+        await self.store.connect()
+        await self.store.create_indexes()
+        for patcher in (
+            mock.patch.object(server, "storage", self.store),
+            mock.patch.object(server, "AUDIT_LOG_SINK", "off"),
+            mock.patch.object(server, "VERIFY_BATCH_CHUNK_SIZE", 3)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.store.close()
+
+    async def post_batch(self, items: list):
+        body = "\n".join(item if isinstance(item, str) else json.dumps(item) for item in items)
+        return await self.client.post(
+            "/api/verify-offers/batch", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+
+    async def test_results_keep_input_order_across_chunks(self):
+        offers = [make_offer(f"Candidate {index}") for index in range(4)]
+        await self.store.insert_offers(offers)
+        items = []
+        for offer in offers:
+            items.append({"fullName": offer["candidateName"], "companyName": "TechCorp Inc", "recruiterEmail": "hr@techcorp.com"})
+            items.append({"hash": offer["hash"]})
+        items += [{"hash": "0" * 64}, "not json", {"fullName": "Missing Fields"}]
+
+        response = await self.post_batch(items)
+        self.assertEqual(response.status_code, 200)
+        results = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([result["index"] for result in results], list(range(len(items))))
+        self.assertEqual([result["success"] for result in results], [True] * 8 + [False] * 3)
+        self.assertEqual(results[1]["details"]["hash"], offers[0]["hash"])
+        self.assertEqual(results[9]["message"], "Invalid batch item: Invalid JSON")
+
+    async def test_item_cap_is_enforced_while_reading(self):
+        with mock.patch.object(server, "VERIFY_BATCH_MAX_SIZE", 5):
+            response = await self.post_batch([{"hash": "0" * 64}] * 6)
+            self.assertEqual(response.status_code, 413)
+            response = await self.post_batch([{"hash": "0" * 64}] * 5)
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(server.batch_verification_slots.locked())
+
+    async def test_empty_and_json_bodies_are_rejected(self):
+        self.assertEqual((await self.post_batch(["", ""])).status_code, 400)
+        response = await self.client.post("/api/verify-offers/batch", json={"hashes": ["0" * 64]})
+        self.assertEqual(response.status_code, 415)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Tests for fuzzy offer matching in backend/server.py"""
+import hashlib
+import random
+import sys
+import unittest
+import uuid
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+from storage import SQLiteOfferStore  # noqa: E402
+
+def make_offer(candidate_name: str, company_name: str = "TechCorp Inc", recruiter_email: str = "hr@techcorp.com") -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "hash": uuid.uuid4().hex + uuid.uuid4().hex,
+        "candidateName": candidate_name,
+        "companyName": company_name,
+        "recruiterEmail": recruiter_email,
+        "recruiterName": "John Recruiter",
+        "position": "Software Engineer",
+        "verificationKey": f"key-{uuid.uuid4().hex}",
+        "dateSigned": datetime.utcnow(),
+        "status": "verified"
+    }
+
+class TrigramIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(7)
+
+    def word(self, syllables: int) -> str:
+        return "".join(self.rng.choice("bcdfghjklmnprst") + self.rng.choice("aeiou") for _ in range(syllables)).capitalize()
+
+    def make_offers(self, count: int) -> list:
+        return [
+            {
+                "hash": hashlib.sha256(f"offer-{index}".encode()).hexdigest(),
+                "candidateName": f"{self.word(self.rng.randint(1, 3))} {self.word(self.rng.randint(2, 4))}",
+                "companyName": self.rng.choice(["Acme Inc", "Acme", "Beta LLC"]),
+                "recruiterEmail": self.rng.choice(["hr@acme.com", "HR@acme.com ", "jobs@beta.com"])
+            }
+            for index in range(count)
+        ]
+
+    def brute_force(self, offers: list, recruiter_email: str, full_name: str, company_name: str, threshold: float) -> list:
+        query_grams = server.trigrams(server.normalize_fuzzy_value(full_name))
+        company_grams = server.trigrams(server.normalize_fuzzy_value(company_name, True))
+        matches = []
+        for offer in offers:
+            if server.normalize_match_value(offer["recruiterEmail"]) != server.normalize_match_value(recruiter_email):
+                continue
+            name_score = server.trigram_similarity(query_grams, server.trigrams(server.normalize_fuzzy_value(offer["candidateName"])))
+            company_score = server.trigram_similarity(
+                company_grams, server.trigrams(server.normalize_fuzzy_value(offer["companyName"], True))
+            )
+            confidence = server.FUZZY_NAME_WEIGHT * name_score + server.FUZZY_COMPANY_WEIGHT * company_score
+            if confidence >= threshold:
+                matches.append((round(confidence, 3), offer["hash"]))
+        return sorted(matches, key=lambda match: (-match[0], match[1]))
+
+    def misspell(self, name: str) -> str:
+        position = self.rng.randrange(len(name))
+        return name[:position] + self.rng.choice("abcxyz") + name[position + 1:]
+
+    def test_search_matches_a_full_scan(self):
+        offers = self.make_offers(3000)
+        index = server.TrigramIndex()
+        # Bulk-loaded like a rebuild, then incremental adds like new offers
+        for offer in offers[:2000]:
+            index.add(offer, presorted=True)
+        index.sort_postings()
+        for offer in offers[2000:]:
+            index.add(offer)
+
+        for query in range(200):
+            offer = self.rng.choice(offers)
+            full_name = self.misspell(offer["candidateName"])
+            company_name = self.rng.choice(["Acme", "Beta"])
+            threshold = self.rng.choice([0.6, 0.7, 0.8, 0.9])
+            with self.subTest(query=query, name=full_name, threshold=threshold):
+                found = index.search(offer["recruiterEmail"], full_name, company_name, threshold, len(offers))
+                expected = self.brute_force(offers, offer["recruiterEmail"], full_name, company_name, threshold)
+                self.assertEqual(sorted(found, key=lambda match: (-match[0], match[1])), expected)
+
+    def test_delta_segment_merges_without_losing_postings(self):
+        offers = self.make_offers(300)
+        index = server.TrigramIndex()
+        with mock.patch.object(server.TrigramIndex, "DELTA_SEGMENT_SIZE", 64):
+            for offer in offers:
+                index.add(offer)
+        for offer in offers[:50]:
+            found = index.search(offer["recruiterEmail"], offer["candidateName"], offer["companyName"], 0.99, 10)
+            self.assertIn(offer["hash"], [hash_value for _, hash_value in found])
+
+    def test_offers_of_other_recruiters_are_not_returned(self):
+        index = server.TrigramIndex()
+        offer = {"hash": "ab" * 32, "candidateName": "Alice Smith", "companyName": "Acme", "recruiterEmail": "hr@acme.com"}
+        index.add(offer)
+        self.assertEqual(len(index.search(" HR@acme.com", "Alice Smith", "Acme", 0.6, 10)), 1)
+        self.assertEqual(index.search("jobs@beta.com", "Alice Smith", "Acme", 0.6, 10), [])
+        self.assertEqual(index.search("hr@acme.com", "", "Acme", 0.6, 10), [])
+
+class FuzzyOfferMatcherTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = SQLiteOfferStore(":memory:")
+        await self.store.connect()
+        await self.store.create_indexes()
+        patcher = mock.patch.object(server, "storage", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.matcher = server.FuzzyOfferMatcher()
+
+    async def asyncTearDown(self):
+        await self.store.close()
+
+    async def test_finds_offers_added_by_this_worker(self):
+        await self.matcher.rebuild()
+        offer = make_offer("Alice Smith")
+        self.matcher.add(offer)
+        matches = self.matcher.search("Alice Smyth", "TechCorp", "hr@techcorp.com")
+        self.assertEqual([hash_value for _, hash_value in matches], [offer["hash"]])
+
+    async def test_offers_stored_by_another_worker_are_found_after_the_periodic_sync(self):
+        await self.matcher.rebuild()
+        # Stored directly, as another worker would, after this worker's last sync
+        offer = make_offer("Alice Smith")
+        await self.store.insert_offer(offer)
+
+        with mock.patch.object(self.store, "iter_offer_match_fields", side_effect=AssertionError("storage read")):
+            self.assertEqual(self.matcher.search("Alice Smyth", "TechCorp", "hr@techcorp.com"), [])
+        await self.matcher.sync()
+        matches = self.matcher.search("Alice Smyth", "TechCorp", "hr@techcorp.com")
+        self.assertEqual([hash_value for _, hash_value in matches], [offer["hash"]])
+        self.assertEqual(len(self.matcher.index), 1)
+
+class NearMatchVerificationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = SQLiteOfferStore(":memory:")
+        await self.store.connect()
+        await self.store.create_indexes()
+        self.offer = make_offer("Alice Smith")
+        self.offer["verificationKey"] = server.generate_verification_key("Alice Smith", "TechCorp Inc", "hr@techcorp.com")
+        await self.store.insert_offer(self.offer)
+        self.filter = server.OfferMembershipFilter()
+        self.matcher = server.FuzzyOfferMatcher()
+        for patcher in (
+            mock.patch.object(server, "storage", self.store),
+            mock.patch.object(server, "offer_filter", self.filter),
+            mock.patch.object(server, "fuzzy_matcher", self.matcher),
+            mock.patch.object(server, "FUZZY_MATCH_ENABLED", True)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        await self.filter.rebuild()
+        await self.matcher.rebuild()
+
+    async def asyncTearDown(self):
+        await self.store.close()
+
+    async def test_near_match_returns_no_fields_of_the_matched_offer(self):
+        response = await server.lookup_offer("Alice Smyth", "TechCorp Inc", "hr@techcorp.com")
+        self.assertFalse(response.success)
+        self.assertEqual(set(response.details), {"matchType", "confidence"})
+        self.assertEqual(response.details["matchType"], "fuzzy")
+        self.assertGreaterEqual(response.details["confidence"], server.FUZZY_MATCH_THRESHOLD)
+        details = str(response.details)
+        for field in ("candidateName", "position", "dateSigned", "hash"):
+            self.assertNotIn(str(self.offer[field]), details)
+
+    async def test_recruiters_without_offers_skip_the_search(self):
+        response = await server.lookup_offer("Alice Smyth", "TechCorp Inc", "jobs@elsewhere.com")
+        self.assertIsNone(response.details)
+        self.assertEqual(self.matcher.searches, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Tests for Merkle batch anchoring in backend/server.py"""
+import hashlib
+import sys
+import tempfile
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+from storage import SQLiteOfferStore  # noqa: E402
+
+def offer_hashes(count: int) -> list:
+    return [hashlib.sha256(f"offer-{index}".encode()).hexdigest() for index in range(count)]
+
+class MerkleTreeTests(unittest.TestCase):
+    def test_every_proof_verifies(self):
+        for leaf_count in range(1, 40):
+            hashes = offer_hashes(leaf_count)
+            root, proofs = server.build_merkle_tree(hashes)
+            with self.subTest(leaves=leaf_count):
+                self.assertEqual(len(proofs), leaf_count)
+                for hash_value, proof in zip(hashes, proofs):
+                    self.assertTrue(server.verify_merkle_proof(hash_value, proof, root))
+                    # A proof never needs more steps than the tree is tall
+                    self.assertLessEqual(len(proof), max(0, (leaf_count - 1).bit_length()))
+
+    def test_single_leaf_root_is_the_leaf(self):
+        hash_value = offer_hashes(1)[0]
+        root, proofs = server.build_merkle_tree([hash_value])
+        self.assertEqual(root, server.merkle_leaf(hash_value).hex())
+        self.assertEqual(proofs, [[]])
+
+    def test_root_depends_on_every_leaf(self):
+        hashes = offer_hashes(7)
+        root, _ = server.build_merkle_tree(hashes)
+        for index in range(len(hashes)):
+            changed = list(hashes)
+            changed[index] = hashlib.sha256(b"other").hexdigest()
+            self.assertNotEqual(server.build_merkle_tree(changed)[0], root)
+
+    def test_tampered_proofs_fail(self):
+        hashes = offer_hashes(11)
+        root, proofs = server.build_merkle_tree(hashes)
+        for index, (hash_value, proof) in enumerate(zip(hashes, proofs)):
+            with self.subTest(leaf=index):
+                other = hashes[(index + 1) % len(hashes)]
+                self.assertFalse(server.verify_merkle_proof(other, proof, root))
+                self.assertFalse(server.verify_merkle_proof(hash_value, proof, "00" * 32))
+                for step in range(len(proof)):
+                    wrong_sibling = [dict(item) for item in proof]
+                    wrong_sibling[step]["hash"] = hashlib.sha256(b"forged").hexdigest()
+                    self.assertFalse(server.verify_merkle_proof(hash_value, wrong_sibling, root))
+                    wrong_side = [dict(item) for item in proof]
+                    wrong_side[step]["side"] = "L" if proof[step]["side"] == "R" else "R"
+                    self.assertFalse(server.verify_merkle_proof(hash_value, wrong_side, root))
+                if proof:
+                    self.assertFalse(server.verify_merkle_proof(hash_value, proof[:-1], root))
+
+    def test_interior_node_is_not_a_leaf(self):
+        # Domain separation: an interior node cannot be presented as an offer hash
+        hashes = offer_hashes(4)
+        root, proofs = server.build_merkle_tree(hashes)
+        interior = server.merkle_node(server.merkle_leaf(hashes[0]), server.merkle_leaf(hashes[1]))
+        self.assertFalse(server.verify_merkle_proof(interior.hex(), proofs[0][1:], root))
+
+class MerkleAnchorTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = SQLiteOfferStore(":memory:")
+        await self.store.connect()
+        await self.store.create_indexes()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.keys = server.OfferSigningKeys()
+        self.keys.load(Path(self.temp_dir.name), "test-1")
+        for patcher in (
+            mock.patch.object(server, "storage", self.store),
+            mock.patch.object(server, "offer_signing_keys", self.keys),
+            mock.patch.object(server, "MERKLE_BATCH_SIZE", 4)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.anchor = server.MerkleAnchor()
+
+    async def asyncTearDown(self):
+        await self.store.close()
+        self.temp_dir.cleanup()
+
+    async def insert_offers(self, count: int) -> list:
+        offers = [
+            {
+                "id": str(uuid.uuid4()),
+                "hash": uuid.uuid4().hex + uuid.uuid4().hex,
+                "candidateName": f"Candidate {index}",
+                "companyName": "TechCorp Inc",
+                "recruiterEmail": "hr@techcorp.com",
+                "recruiterName": "John Recruiter",
+                "position": "Software Engineer",
+                "verificationKey": f"key-{index}",
+                "dateSigned": datetime.utcnow() - timedelta(seconds=count - index),
+                "status": "verified"
+            }
+            for index in range(count)
+        ]
+        await self.store.insert_offers(offers)
+        return offers
+
+    async def test_batches_are_sealed_with_verifiable_proofs(self):
+        offers = await self.insert_offers(10)
+        self.assertTrue(await self.anchor.cut_batch())
+        self.assertTrue(await self.anchor.cut_batch())
+        # Two offers left: not a full batch, and not old enough to seal anyway
+        self.assertFalse(await self.anchor.cut_batch())
+        self.assertEqual(self.anchor.batches_sealed, 2)
+
+        anchored = 0
+        for offer in offers:
+            proof = await self.store.find_proof(offer["hash"])
+            if proof is None:
+                continue
+            batch = await self.store.find_sealed_batch(proof["batchId"])
+            self.assertTrue(server.verify_merkle_proof(offer["hash"], proof["proof"], batch["root"]))
+            anchored += 1
+        self.assertEqual(anchored, 8)
+
+    async def test_sealed_root_is_signed_and_typed(self):
+        await self.insert_offers(4)
+        await self.anchor.cut_batch()
+        batch = (await self.store.list_sealed_batches(0, 10))[0]
+        self.assertEqual(batch["type"], server.MERKLE_ROOT_TYPE)
+
+        signed_root = {field: batch[field] for field in ("type", "batchId", "root", "leafCount", "kid")}
+        self.assertTrue(self.keys.verify(batch["kid"], server.canonical_payload(signed_root), batch["signature"]))
+        # The root is signed with the offer key but can never pass for an offer
+        self.assertFalse(server.verify_qr_signature({**signed_root, "signature": batch["signature"]}))
+
+    async def test_stale_batch_is_recovered(self):
+        offers = await self.insert_offers(4)
+        long_ago = datetime.utcnow() - timedelta(days=1)
+        await self.store.insert_batch({"batchId": 99, "status": "claimed", "createdAt": long_ago, "updatedAt": long_ago})
+        await self.store.claim_offers_for_batch([offer["hash"] for offer in offers], 99)
+
+        await self.anchor.recover()
+        self.assertEqual(self.anchor.batches_recovered, 1)
+        batch = await self.store.find_sealed_batch(99)
+        self.assertEqual(batch["leafCount"], 4)
+        proof = await self.store.find_proof(offers[2]["hash"])
+        self.assertTrue(server.verify_merkle_proof(offers[2]["hash"], proof["proof"], batch["root"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Tests for the negative lookup Bloom filter in backend/server.py"""
+import sys
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+from storage import SQLiteOfferStore  # noqa: E402
+
+def make_offer(candidate_name: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "hash": uuid.uuid4().hex + uuid.uuid4().hex,
+        "candidateName": candidate_name,
+        "companyName": "TechCorp Inc",
+        "recruiterEmail": "hr@techcorp.com",
+        "recruiterName": "John Recruiter",
+        "position": "Software Engineer",
+        "verificationKey": f"key-{candidate_name}-{uuid.uuid4().hex}",
+        "dateSigned": datetime.utcnow(),
+        "status": "verified"
+    }
+
+class BloomFilterTests(unittest.TestCase):
+    def test_no_false_negatives(self):
+        bloom = server.BloomFilter(1000, 0.01)
+        keys = [uuid.uuid4().hex for _ in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        self.assertEqual(bloom.insertions, 1000)
+
+    def test_false_positive_rate_is_bounded(self):
+        bloom = server.BloomFilter(2000, 0.01)
+        for _ in range(2000):
+            bloom.add(uuid.uuid4().hex)
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(20000))
+        # Sized for 1%: allow generous slack for randomness
+        self.assertLess(false_positives / 20000, 0.03)
+        self.assertLess(bloom.stats()["estimatedFalsePositiveRate"], 0.03)
+
+class OfferMembershipFilterTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = SQLiteOfferStore(":memory:")
+        await self.store.connect()
+        await self.store.create_indexes()
+        patcher = mock.patch.object(server, "storage", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.filter = server.OfferMembershipFilter()
+
+    async def asyncTearDown(self):
+        await self.store.close()
+
+    async def test_not_ready_never_short_circuits(self):
+        self.assertFalse(self.filter.definitely_missing("anything"))
+
+    async def test_rebuild_includes_stored_offers(self):
+        offer = make_offer("Alice")
+        await self.store.insert_offer(offer)
+        await self.filter.rebuild()
+        self.assertFalse(self.filter.definitely_missing(offer["hash"]))
+        self.assertFalse(self.filter.definitely_missing(offer["verificationKey"]))
+        self.assertTrue(self.filter.definitely_missing("unknown"))
+        self.assertEqual(self.filter.short_circuits, 1)
+
+    async def test_rebuild_records_which_recruiters_issued_offers(self):
+        await self.store.insert_offer(make_offer("Alice"))
+        await self.filter.rebuild()
+        self.assertFalse(self.filter.definitely_missing(server.recruiter_filter_key(" HR@techcorp.com")))
+        self.assertTrue(self.filter.definitely_missing(server.recruiter_filter_key("jobs@elsewhere.com")))
+
+    async def test_misses_do_not_read_storage(self):
+        await self.filter.rebuild()
+        with mock.patch.object(self.store, "iter_offer_keys", side_effect=AssertionError("storage scanned")):
+            missing = self.filter.missing([uuid.uuid4().hex for _ in range(50)])
+        self.assertEqual(len(missing), 50)
+
+    async def test_sync_adds_offers_stored_by_other_workers(self):
+        await self.filter.rebuild()
+        # Stored directly, as another worker would, after this worker's last sync
+        offer = make_offer("Bob")
+        await self.store.insert_offer(offer)
+        await self.filter.sync()
+        self.assertFalse(self.filter.definitely_missing(offer["hash"]))
+
+    async def test_stale_filter_falls_through_to_the_database(self):
+        await self.filter.rebuild()
+        self.filter.synced_through -= timedelta(seconds=server.BLOOM_MAX_STALENESS + 1)
+        self.assertFalse(self.filter.definitely_missing("unknown"))
+        self.assertEqual((self.filter.short_circuits, self.filter.stale_misses), (0, 1))
+
+        with mock.patch.object(server, "BLOOM_MAX_STALENESS", 0):
+            await self.filter.sync()
+            self.assertFalse(self.filter.definitely_missing("unknown"))
+
+if __name__ == "__main__":
+    unittest.main()
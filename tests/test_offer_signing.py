@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Tests for offer signing and offline QR signature verification in backend/server.py"""
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+
+OFFER = {
+    "candidateName": "Alice Smith",
+    "companyName": "TechCorp Inc",
+    "recruiterEmail": "hr@techcorp.com",
+    "position": "Software Engineer",
+    "timestamp": "2025-01-01 12:00:00.123000"
+}
+
+class SignedPayloadTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.keys = server.OfferSigningKeys()
+        self.keys.load(Path(self.temp_dir.name), "test-1")
+        patcher = mock.patch.object(server, "offer_signing_keys", self.keys)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def signed(self, payload: dict) -> dict:
+        return {**payload, "signature": server.generate_digital_signature(payload)}
+
+    def offer_payload(self) -> dict:
+        return server.generate_qr_payload(OFFER, server.generate_offer_hash(OFFER))
+
+    def test_signed_offer_verifies_in_both_forms(self):
+        payload = self.offer_payload()
+        signature = server.generate_digital_signature(payload)
+        self.assertTrue(server.verify_qr_signature({**payload, "signature": signature}))
+        compact = server.generate_qr_compact(payload, signature)
+        self.assertTrue(server.verify_qr_signature(server.parse_qr_data(compact)))
+
+    def test_tampered_offer_fails(self):
+        qr_payload = self.signed(self.offer_payload())
+        self.assertFalse(server.verify_qr_signature({**qr_payload, "candidate": "Mallory"}))
+        self.assertFalse(server.verify_qr_signature({**qr_payload, "kid": "unknown"}))
+
+    def test_other_signed_objects_are_not_offers(self):
+        root = self.signed({"type": "merkle_root", "batchId": 1, "root": "ab" * 32, "leafCount": 2, "kid": "test-1"})
+        self.assertFalse(server.verify_qr_signature(root))
+
+        for field in ("type", "hash", "candidate", "company", "recruiter", "timestamp"):
+            payload = self.offer_payload()
+            del payload[field]
+            with self.subTest(missing=field):
+                self.assertFalse(server.verify_qr_signature(self.signed(payload)))
+
+        payload = {**self.offer_payload(), "hash": ["not", "text"]}
+        self.assertFalse(server.verify_qr_signature(self.signed(payload)))
+
+    def test_verify_qr_payload_rejects_signed_non_offers(self):
+        root = self.signed({"batchId": 1, "root": "ab" * 32, "leafCount": 2, "kid": "test-1"})
+        response = asyncio.run(server.verify_qr_payload(root))
+        self.assertFalse(response.success)
+        self.assertEqual(response.message, server.UNVERIFIED_OFFER_MESSAGE)
+
+class KeyCreationTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.keys_dir = Path(self.temp_dir.name)
+
+    def test_generated_key_is_private(self):
+        server.OfferSigningKeys().load(self.keys_dir, "test-1")
+        key_path = self.keys_dir / "test-1.pem"
+        self.assertEqual(stat.S_IMODE(os.stat(key_path).st_mode), 0o600)
+        self.assertEqual([path.name for path in self.keys_dir.iterdir()], ["test-1.pem"])
+
+    def test_existing_key_is_kept(self):
+        self.assertTrue(server.OfferSigningKeys.create_key(self.keys_dir / "test-1.pem"))
+        original = (self.keys_dir / "test-1.pem").read_bytes()
+        self.assertFalse(server.OfferSigningKeys.create_key(self.keys_dir / "test-1.pem"))
+        self.assertEqual((self.keys_dir / "test-1.pem").read_bytes(), original)
+
+    def test_workers_starting_together_share_one_key(self):
+        rings = [server.OfferSigningKeys() for _ in range(8)]
+        start = threading.Barrier(len(rings))
+        errors = []
+
+        def load(ring):
+            start.wait()
+            try:
+                ring.load(self.keys_dir, "test-1")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=load, args=(ring,)) for ring in rings]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        published = {ring.published()[0]["publicKey"] for ring in rings}
+        self.assertEqual(len(published), 1)
+        signature = rings[0].sign(b"payload")
+        self.assertTrue(all(ring.verify("test-1", b"payload", signature) for ring in rings))
+
+if __name__ == "__main__":
+    unittest.main()
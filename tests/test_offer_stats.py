@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests for buffered offer stats counters in backend/server.py"""
+import asyncio
+import sys
+import unittest
+import uuid
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+from storage import SQLiteOfferStore  # noqa: E402
+
+def make_offer(candidate_name: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "hash": uuid.uuid4().hex + uuid.uuid4().hex,
+        "candidateName": candidate_name,
+        "companyName": "TechCorp Inc",
+        "recruiterEmail": "hr@techcorp.com",
+        "position": "Software Engineer",
+        "dateSigned": datetime(2025, 1, 1, 12, 0),
+        "status": "verified"
+    }
+
+class OfferStatsRecorderTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = SQLiteOfferStore(":memory:")
+        await self.store.connect()
+        await self.store.create_indexes()
+        self.recorder = server.OfferStatsRecorder()
+        for patcher in (
+            mock.patch.object(server, "storage", self.store),
+            mock.patch.object(server, "offer_stats", self.recorder),
+            mock.patch.object(server, "OFFER_STATS_FLUSH_INTERVAL", 3600)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.store.close()
+
+    async def test_counters_pending_at_shutdown_are_flushed(self):
+        flusher = asyncio.create_task(self.recorder.run())
+        offer = make_offer("Alice")
+        self.recorder.record_issued(offer)
+        self.recorder.record_verification(offer)
+        await asyncio.sleep(0)
+        self.assertIsNone(await self.store.find_offer_stats("recruiter", "hr@techcorp.com"))
+
+        # As in the lifespan shutdown: background tasks are cancelled, then the last flush runs
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+        await server.flush_offer_stats()
+        self.assertEqual(self.recorder.pending, {})
+        self.assertEqual(await self.store.find_offer_stats("recruiter", "hr@techcorp.com"), {
+            "total": 1, "byStatus": {"verified": 1}, "byMonth": {"2025-01": 1}, "verificationHits": 1
+        })
+        self.assertEqual((await self.store.find_offer_stats("company", "techcorp inc"))["total"], 1)
+
+    async def test_failed_flush_keeps_the_counters(self):
+        self.recorder.record_issued(make_offer("Alice"))
+        with mock.patch.object(self.store, "increment_offer_stats", side_effect=RuntimeError("storage unavailable")):
+            await server.flush_offer_stats()
+        self.assertEqual(self.recorder.flush_failures, 1)
+        self.assertEqual((await self.recorder.find("recruiter", "hr@techcorp.com"))["total"], 1)
+
+        await server.flush_offer_stats()
+        self.assertEqual(self.recorder.pending, {})
+        self.assertEqual((await self.store.find_offer_stats("recruiter", "hr@techcorp.com"))["total"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Tests for the compact QR payload encoding in backend/qr_codec.py"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from qr_codec import QR_PREFIX, b45decode, b45encode, cbor_decode, cbor_encode, decode_qr, encode_qr  # noqa: E402
+
+def make_payload(**fields) -> dict:
+    hash_value = fields.pop("hash", "ab" * 32)
+    payload = {
+        "type": "offer_verification",
+        "kid": "offertrust-1",
+        "hash": hash_value,
+        "candidate": "Alice Smith",
+        "company": "TechCorp Inc",
+        "recruiter": "hr@techcorp.com",
+        "position": "Software Engineer",
+        "timestamp": "2025-01-01 12:30:00.123000",
+        "verifyUrl": f"/verify?hash={hash_value}"
+    }
+    payload.update(fields)
+    return payload
+
+SIGNATURE = "MEUCIQDt" + "A" * 78
+
+class Base45Test(unittest.TestCase):
+    def test_rfc_vectors(self):
+        for data, text in ((b"AB", "BB8"), (b"Hello!!", "%69 VD92EX0"), (b"base-45", "UJCLQE7W581"), (b"ietf!", "QED8WEX0")):
+            self.assertEqual(b45encode(data), text)
+            self.assertEqual(b45decode(text), data)
+
+    def test_rejects_invalid_text(self):
+        for text in ("GGW", "abc", "A"):
+            with self.assertRaises(ValueError):
+                b45decode(text)
+
+class CborTest(unittest.TestCase):
+    def test_round_trip(self):
+        value = [0, 23, 24, 255, 65536, 2 ** 40, b"", b"\x00" * 300, "", "Zoë", None, [1, ["nested"]]]
+        self.assertEqual(cbor_decode(cbor_encode(value)), value)
+
+    def test_rfc_encodings(self):
+        self.assertEqual(cbor_encode(100), bytes.fromhex("1864"))
+        self.assertEqual(cbor_encode("IETF"), bytes.fromhex("6449455446"))
+        self.assertEqual(cbor_encode([1, [2, 3]]), bytes.fromhex("8201820203"))
+
+    def test_rejects_truncated_and_trailing_bytes(self):
+        for data in (bytes.fromhex("6449"), bytes.fromhex("9a7fffffff"), bytes.fromhex("0101"), bytes.fromhex("a0")):
+            with self.assertRaises(ValueError):
+                cbor_decode(data)
+
+class CompactQRTest(unittest.TestCase):
+    def test_round_trip(self):
+        payload = make_payload()
+        code = encode_qr(payload, SIGNATURE)
+        self.assertTrue(code.startswith(QR_PREFIX))
+        self.assertEqual(decode_qr(code), dict(payload, signature=SIGNATURE))
+
+    def test_round_trips_unusual_timestamps_and_fields(self):
+        for fields in (
+            {"timestamp": "2025-01-01 12:30:00"},
+            {"timestamp": "2025-01-01T12:30:00Z"},
+            {"timestamp": "2025-01-01 12:30:00.123"},
+            {"position": None, "candidate": "José Müller"}
+        ):
+            payload = make_payload(**fields)
+            self.assertEqual(decode_qr(encode_qr(payload, SIGNATURE)), dict(payload, signature=SIGNATURE))
+
+    def test_uses_only_qr_alphanumeric_characters(self):
+        code = encode_qr(make_payload(candidate="zoë"), SIGNATURE)
+        self.assertTrue(set(code) <= set("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"))
+
+    def test_rejects_payloads_the_version_cannot_represent(self):
+        for fields in ({"hash": "AB" * 32}, {"type": "other"}, {"verifyUrl": "https://example.com"}):
+            with self.assertRaises(ValueError):
+                encode_qr(make_payload(**fields), SIGNATURE)
+
+    def test_rejects_malformed_codes(self):
+        for code in ("OT2:" + encode_qr(make_payload(), SIGNATURE)[4:], QR_PREFIX + b45encode(cbor_encode([1, 2])), QR_PREFIX + "%%%", ""):
+            with self.assertRaises(ValueError):
+                decode_qr(code)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Tests for admin-gated recruiter sign-in in backend/server.py"""
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+
+AUTH_DATA = {"email": "hr@techcorp.com", "companyName": "TechCorp Inc", "fullName": "John Recruiter"}
+
+class RecruiterAuthTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        keys = server.OfferSigningKeys()
+        keys.load(Path(temp_dir.name), "recruiter-test")
+        self.tokens = server.RecruiterTokens(keys, 60, 100, 60)
+        patcher = mock.patch.object(server, "recruiter_tokens", self.tokens)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def sign_in(self, headers: dict = None):
+        return await self.client.post("/api/auth/recruiter", json=AUTH_DATA, headers=headers)
+
+    async def test_sign_in_is_disabled_without_an_admin_token(self):
+        with mock.patch.object(server, "RECRUITER_AUTH_ADMIN_TOKEN", ""):
+            self.assertEqual((await self.sign_in({"X-Admin-Token": ""})).status_code, 503)
+
+    async def test_tokens_are_only_issued_to_the_admin(self):
+        with mock.patch.object(server, "RECRUITER_AUTH_ADMIN_TOKEN", "admin-secret"):
+            self.assertEqual((await self.sign_in()).status_code, 403)
+            self.assertEqual((await self.sign_in({"X-Admin-Token": "wrong"})).status_code, 403)
+            response = await self.sign_in({"X-Admin-Token": "admin-secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.tokens.verify(response.json()["token"])["sub"], AUTH_DATA["email"])
+
+if __name__ == "__main__":
+    unittest.main()
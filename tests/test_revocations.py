@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests for the revocation list and its delta sync in backend/server.py"""
+import hashlib
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+from storage import SQLiteOfferStore  # noqa: E402
+
+def offer_hash(index: int) -> str:
+    return hashlib.sha256(f"offer-{index}".encode()).hexdigest()
+
+class RevokedHashSetTests(unittest.TestCase):
+    def test_membership_across_merges(self):
+        revoked = server.RevokedHashSet()
+        with mock.patch.object(server.RevokedHashSet, "DELTA_SIZE", 16):
+            for index in range(500):
+                self.assertTrue(revoked.add(offer_hash(index)))
+        self.assertEqual(len(revoked), 500)
+        self.assertLessEqual(len(revoked.delta), 64)
+        self.assertEqual(list(revoked.prefixes), sorted(revoked.prefixes))
+        for index in range(500):
+            self.assertIn(offer_hash(index), revoked)
+        for index in range(500, 1000):
+            self.assertNotIn(offer_hash(index), revoked)
+
+    def test_duplicates_are_not_added_twice(self):
+        revoked = server.RevokedHashSet()
+        self.assertTrue(revoked.add(offer_hash(1)))
+        self.assertFalse(revoked.add(offer_hash(1)))
+        revoked.merge()
+        self.assertFalse(revoked.add(offer_hash(1)))
+        self.assertEqual(len(revoked), 1)
+
+    def test_only_sha256_digests_are_accepted(self):
+        revoked = server.RevokedHashSet()
+        for hash_value in ("not-hex", "abcd", offer_hash(1) + "00", ""):
+            with self.subTest(hash_value=hash_value):
+                self.assertFalse(revoked.add(hash_value))
+                self.assertNotIn(hash_value, revoked)
+        self.assertEqual(len(revoked), 0)
+
+    def test_digests_sharing_a_prefix(self):
+        revoked = server.RevokedHashSet()
+        first = "00" * 8 + "11" * 24
+        second = "00" * 8 + "22" * 24
+        revoked.add(first)
+        revoked.merge()
+        self.assertNotIn(second, revoked)
+        revoked.add(second)
+        revoked.merge()
+        self.assertIn(first, revoked)
+        self.assertIn(second, revoked)
+
+class RevocationListTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = SQLiteOfferStore(":memory:")
+        await self.store.connect()
+        await self.store.create_indexes()
+        for patcher in (
+            mock.patch.object(server, "storage", self.store),
+            mock.patch.object(server, "REVOCATION_SYNC_BATCH_SIZE", 3)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.revocations = server.RevocationList()
+
+    async def asyncTearDown(self):
+        await self.store.close()
+
+    async def revoke(self, seq: int):
+        await self.store.insert_revocation({"seq": seq, "hash": offer_hash(seq), "revokedAt": datetime.utcnow()})
+
+    async def test_sync_pulls_every_revocation_in_pages(self):
+        for seq in range(1, 11):
+            await self.revoke(seq)
+        await self.revocations.sync()
+        self.assertEqual(self.revocations.synced_seq, 10)
+        self.assertTrue(all(self.revocations.is_revoked(offer_hash(seq)) for seq in range(1, 11)))
+
+        await self.revoke(11)
+        await self.revocations.sync()
+        self.assertEqual(self.revocations.synced_seq, 11)
+        self.assertTrue(self.revocations.is_revoked(offer_hash(11)))
+
+    async def test_sync_waits_at_a_gap_until_it_fills(self):
+        for seq in (1, 2, 4, 5):
+            await self.revoke(seq)
+        await self.revocations.sync()
+        # Revocations past the gap are enforced at once, but the position waits for seq 3
+        self.assertEqual(self.revocations.synced_seq, 2)
+        self.assertTrue(self.revocations.is_revoked(offer_hash(5)))
+
+        await self.revoke(3)
+        await self.revocations.sync()
+        self.assertEqual(self.revocations.synced_seq, 5)
+        self.assertTrue(self.revocations.is_revoked(offer_hash(3)))
+        self.assertEqual(self.revocations.gaps_skipped, 0)
+
+    async def test_gap_is_skipped_after_the_timeout(self):
+        for seq in (1, 3):
+            await self.revoke(seq)
+        await self.revocations.sync()
+        self.assertEqual(self.revocations.synced_seq, 1)
+
+        with mock.patch.object(server, "REVOCATION_GAP_TIMEOUT", 0):
+            await self.revocations.sync()
+        self.assertEqual(self.revocations.synced_seq, 3)
+        self.assertEqual(self.revocations.gaps_skipped, 1)
+        self.assertIsNone(self.revocations.gap)
+
+    def test_advance_over_contiguous_sequence_numbers(self):
+        self.assertTrue(self.revocations.advance([1, 2, 3]))
+        self.assertFalse(self.revocations.advance([]))
+        self.assertFalse(self.revocations.advance([5, 6]))
+        self.assertEqual(self.revocations.synced_seq, 3)
+        self.assertEqual(self.revocations.gap[0], 3)
+
+if __name__ == "__main__":
+    unittest.main()
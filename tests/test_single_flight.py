@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Tests for single-flight coalescing of lookups in backend/server.py"""
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+
+class SingleFlightTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.flight = server.SingleFlight()
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def query(self, result="offer"):
+        self.calls += 1
+        await self.release.wait()
+        return result
+
+    async def test_concurrent_callers_share_one_call(self):
+        callers = [asyncio.ensure_future(self.flight.do("hash:abc", self.query)) for _ in range(50)]
+        await asyncio.sleep(0)
+        self.assertEqual(self.flight.stats()["inFlight"], 1)
+        self.release.set()
+
+        self.assertEqual(await asyncio.gather(*callers), ["offer"] * 50)
+        self.assertEqual(self.calls, 1)
+        stats = self.flight.stats()
+        self.assertEqual((stats["queries"], stats["coalesced"], stats["inFlight"]), (1, 49, 0))
+
+    async def test_different_keys_do_not_share(self):
+        self.release.set()
+        results = await asyncio.gather(
+            self.flight.do("hash:a", lambda: self.query("a")), self.flight.do("hash:b", lambda: self.query("b"))
+        )
+        self.assertEqual(results, ["a", "b"])
+        self.assertEqual(self.calls, 2)
+
+    async def test_result_is_not_reused_after_the_call_finishes(self):
+        self.release.set()
+        await self.flight.do("hash:abc", self.query)
+        await self.flight.do("hash:abc", self.query)
+        self.assertEqual(self.calls, 2)
+
+    async def test_errors_reach_every_caller(self):
+        async def failing_query():
+            self.calls += 1
+            await self.release.wait()
+            raise RuntimeError("storage unavailable")
+
+        callers = [asyncio.ensure_future(self.flight.do("hash:abc", failing_query)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.stats()["inFlight"], 0)
+
+    async def test_cancelled_caller_does_not_cancel_the_others(self):
+        first = asyncio.ensure_future(self.flight.do("hash:abc", self.query))
+        second = asyncio.ensure_future(self.flight.do("hash:abc", self.query))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await second, "offer")
+        self.assertTrue(first.cancelled())
+        self.assertEqual(self.calls, 1)
+
+    async def test_forget_starts_a_fresh_call(self):
+        stale = asyncio.ensure_future(self.flight.do("hash:abc", lambda: self.query("stale")))
+        await asyncio.sleep(0)
+        # e.g. the offer was revoked while a lookup was in flight
+        self.flight.forget("hash:abc")
+        fresh = asyncio.ensure_future(self.flight.do("hash:abc", lambda: self.query("fresh")))
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(stale, fresh), ["stale", "fresh"])
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.flight.stats()["inFlight"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
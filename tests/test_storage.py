@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""Contract tests run against every storage engine in backend/storage.py"""
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+load_dotenv(BACKEND_DIR / '.env')
+
+import storage  # noqa: E402
+from storage import DuplicateContentError, DuplicateOfferError, MongoOfferStore, SQLiteOfferStore  # noqa: E402
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+
+def mongo_available() -> bool:
+    try:
+        MongoClient(MONGO_URL, serverSelectionTimeoutMS=500).admin.command('ping')
+        return True
+    except Exception:
+        return False
+
+def make_offer(candidate_name: str, recruiter_email: str = "hr@techcorp.com", minutes_ago: int = 0, **fields) -> dict:
+    offer = {
+        "id": str(uuid.uuid4()),
+        "hash": uuid.uuid4().hex + uuid.uuid4().hex,
+        "candidateName": candidate_name,
+        "companyName": "TechCorp Inc",
+        "recruiterEmail": recruiter_email,
+        "recruiterName": "John Recruiter",
+        "position": "Software Engineer",
+        "salary": "$120,000",
+        "startDate": "2025-07-15",
+        "verificationKey": f"key-{candidate_name}",
+        "dateSigned": datetime(2025, 1, 1, 12, 0) - timedelta(minutes=minutes_ago),
+        "status": "verified"
+    }
+    offer.update(fields)
+    return offer
+
+class StorageContract:
+    """Behaviour every OfferStore engine must provide"""
+
+    async def make_store(self):
+        raise NotImplementedError
+
+    async def asyncSetUp(self):
+        self.store = await self.make_store()
+        await self.store.create_indexes()
+
+    async def asyncTearDown(self):
+        await self.store.close()
+
+    async def test_insert_and_lookup(self):
+        offer = make_offer("Alice")
+        await self.store.insert_offer(offer)
+
+        by_hash = await self.store.find_offer_by_hash(offer["hash"])
+        self.assertEqual(by_hash["candidateName"], "Alice")
+        self.assertEqual(by_hash["dateSigned"], offer["dateSigned"])
+        self.assertNotIn("_id", by_hash)
+
+        by_key = await self.store.find_offer_by_key(offer["verificationKey"])
+        self.assertEqual(by_key["hash"], offer["hash"])
+        self.assertIsNone(await self.store.find_offer_by_hash("missing"))
+        self.assertIsNone(await self.store.find_offer_by_key("missing"))
+
+    async def test_lookup_by_key_returns_latest(self):
+        older = make_offer("Alice", minutes_ago=10)
+        newer = make_offer("Alice", minutes_ago=1)
+        await self.store.insert_offers([older, newer])
+        self.assertEqual((await self.store.find_offer_by_key("key-Alice"))["hash"], newer["hash"])
+
+    async def test_duplicate_hash_rejected(self):
+        offer = make_offer("Alice")
+        await self.store.insert_offer(offer)
+        with self.assertRaises(DuplicateOfferError):
+            await self.store.insert_offer(dict(offer, id=str(uuid.uuid4())))
+
+    async def test_bulk_insert_reports_duplicates_per_row(self):
+        first = make_offer("Alice")
+        await self.store.insert_offer(first)
+        second = make_offer("Bob")
+        failures = await self.store.insert_offers([dict(first, id=str(uuid.uuid4())), second])
+        self.assertEqual(failures, {0: "duplicate"})
+        self.assertIsNotNone(await self.store.find_offer_by_hash(second["hash"]))
+
+    async def test_content_index_rejects_duplicate_verified_offers(self):
+        await self.store.create_offer_content_index()
+        first = make_offer("Alice", contentHash="content-alice")
+        await self.store.insert_offer(first)
+        with self.assertRaises(DuplicateContentError):
+            await self.store.insert_offer(make_offer("Alice", contentHash="content-alice"))
+
+        # Offers without a content hash never conflict, nor do revoked ones
+        await self.store.insert_offers([make_offer("Bob"), make_offer("Bob")])
+        self.assertTrue(await self.store.set_offer_status(first["hash"], "revoked"))
+        reissued = make_offer("Alice", contentHash="content-alice")
+        failures = await self.store.insert_offers([reissued, make_offer("Alice", contentHash="content-alice")])
+        self.assertEqual(failures, {1: "duplicateContent"})
+        self.assertIsNotNone(await self.store.find_offer_by_hash(reissued["hash"]))
+
+    async def test_idempotency_keys(self):
+        now = datetime.utcnow()
+
+        def record(claim_id, request_hash="request-1", lease_seconds=30, ttl_seconds=3600):
+            return {
+                "key": "hr@techcorp.com:key-1", "claimId": claim_id, "requestHash": request_hash,
+                "leaseUntil": now + timedelta(seconds=lease_seconds), "expiresAt": now + timedelta(seconds=ttl_seconds)
+            }
+
+        self.assertIsNone(await self.store.claim_idempotency_key(record("claim-1")))
+        pending = await self.store.claim_idempotency_key(record("claim-2"))
+        self.assertEqual(pending["claimId"], "claim-1")
+        self.assertNotIn("response", pending)
+
+        self.assertFalse(await self.store.complete_idempotency_key("hr@techcorp.com:key-1", "claim-2", {"hash": "x"}))
+        self.assertTrue(await self.store.complete_idempotency_key("hr@techcorp.com:key-1", "claim-1", {"hash": "abc"}))
+        completed = await self.store.claim_idempotency_key(record("claim-3", request_hash="request-2"))
+        self.assertEqual((completed["requestHash"], completed["response"]), ("request-1", {"hash": "abc"}))
+
+        # A completed key is kept until it expires; a released claim frees the key at once
+        await self.store.release_idempotency_key("hr@techcorp.com:key-1", "claim-1")
+        self.assertIsNotNone(await self.store.claim_idempotency_key(record("claim-4")))
+
+        other = dict(record("claim-5"), key="hr@techcorp.com:key-2")
+        self.assertIsNone(await self.store.claim_idempotency_key(other))
+        await self.store.release_idempotency_key("hr@techcorp.com:key-2", "claim-5")
+        self.assertIsNone(await self.store.claim_idempotency_key(dict(other, claimId="claim-6")))
+
+    async def test_idempotency_key_takeover(self):
+        now = datetime.utcnow()
+        lapsed = {
+            "key": "hr@techcorp.com:key-1", "claimId": "claim-1", "requestHash": "request-1",
+            "leaseUntil": now - timedelta(seconds=1), "expiresAt": now + timedelta(hours=1)
+        }
+        self.assertIsNone(await self.store.claim_idempotency_key(lapsed))
+        # A lapsed claim without a response is taken over, and the old claim can no longer complete
+        self.assertIsNone(await self.store.claim_idempotency_key(
+            dict(lapsed, claimId="claim-2", leaseUntil=now + timedelta(seconds=30))
+        ))
+        self.assertFalse(await self.store.complete_idempotency_key("hr@techcorp.com:key-1", "claim-1", {"hash": "x"}))
+
+        # So is an expired record, even one that is still being processed
+        expired = dict(lapsed, key="hr@techcorp.com:key-2", leaseUntil=now + timedelta(seconds=30),
+                       expiresAt=now - timedelta(seconds=1))
+        self.assertIsNone(await self.store.claim_idempotency_key(expired))
+        self.assertIsNone(await self.store.claim_idempotency_key(dict(expired, claimId="claim-3")))
+
+    async def test_bulk_lookups(self):
+        offers = [make_offer(name) for name in ("Alice", "Bob", "Carol")]
+        await self.store.insert_offers(offers)
+
+        by_keys = await self.store.find_offers_by_keys(["key-Alice", "key-Carol", "key-Nobody"])
+        self.assertEqual(sorted(offer["candidateName"] for offer in by_keys), ["Alice", "Carol"])
+
+        by_hashes = await self.store.find_offers_by_hashes([offers[1]["hash"], "missing"])
+        self.assertEqual([offer["candidateName"] for offer in by_hashes], ["Bob"])
+
+    async def test_recruiter_listing_pages_newest_first(self):
+        offers = [make_offer(f"Candidate {i}", minutes_ago=i) for i in range(5)]
+        offers.append(make_offer("Other", recruiter_email="other@techcorp.com"))
+        await self.store.insert_offers(offers)
+
+        first_page = [offer async for offer in self.store.iter_recruiter_offers("hr@techcorp.com", limit=2)]
+        self.assertEqual([offer["candidateName"] for offer in first_page], ["Candidate 0", "Candidate 1"])
+        self.assertNotIn("verificationKey", first_page[0])
+
+        after = (first_page[-1]["dateSigned"], first_page[-1]["id"])
+        rest = [offer async for offer in self.store.iter_recruiter_offers("hr@techcorp.com", after=after)]
+        self.assertEqual([offer["candidateName"] for offer in rest], ["Candidate 2", "Candidate 3", "Candidate 4"])
+
+    async def test_set_offer_status(self):
+        offer = make_offer("Alice")
+        await self.store.insert_offer(offer)
+        self.assertTrue(await self.store.set_offer_status(offer["hash"], "revoked"))
+        self.assertEqual((await self.store.find_offer_by_hash(offer["hash"]))["status"], "revoked")
+        self.assertFalse(await self.store.set_offer_status("missing", "revoked"))
+
+        self.assertFalse(await self.store.set_offer_status(offer["hash"], "verified", expected_status="verified"))
+        self.assertTrue(await self.store.set_offer_status(offer["hash"], "verified", expected_status="revoked"))
+        self.assertEqual((await self.store.find_offer_by_hash(offer["hash"]))["status"], "verified")
+
+    async def test_count_and_iterate_keys(self):
+        offers = [make_offer("Alice", minutes_ago=60), make_offer("Bob")]
+        await self.store.insert_offers(offers)
+        self.assertEqual(await self.store.count_offers(), 2)
+
+        keys = [offer async for offer in self.store.iter_offer_keys()]
+        self.assertEqual(sorted(key["hash"] for key in keys), sorted(offer["hash"] for offer in offers))
+
+        recent = [offer async for offer in self.store.iter_offer_keys(signed_since=datetime(2025, 1, 1, 11, 30))]
+        self.assertEqual([key["verificationKey"] for key in recent], ["key-Bob"])
+        self.assertEqual(recent[0]["recruiterEmail"], offers[1]["recruiterEmail"])
+
+    async def test_delta_iteration_pages_past_equal_timestamps(self):
+        old = [make_offer(f"Old {index}", minutes_ago=60) for index in range(3)]
+        # Pages break inside runs of offers signed at the same instant
+        recent = [make_offer(f"Recent {index}", minutes_ago=index // 3) for index in range(7)]
+        await self.store.insert_offers(old + recent)
+        since = datetime(2025, 1, 1, 11, 30)
+        with mock.patch.object(storage, "ITER_BATCH_SIZE", 2):
+            keys = [offer["hash"] async for offer in self.store.iter_offer_keys(signed_since=since)]
+            fields = [offer["hash"] async for offer in self.store.iter_offer_match_fields(signed_since=since)]
+            every_key = [offer["hash"] async for offer in self.store.iter_offer_keys()]
+        self.assertEqual(sorted(keys), sorted(offer["hash"] for offer in recent))
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(sorted(fields), sorted(keys))
+        self.assertEqual(sorted(every_key), sorted(offer["hash"] for offer in old + recent))
+
+    async def test_iterate_match_fields(self):
+        offers = [make_offer("Alice", minutes_ago=60), make_offer("Bob")]
+        await self.store.insert_offers(offers)
+
+        fields = sorted([offer async for offer in self.store.iter_offer_match_fields()], key=lambda offer: offer["candidateName"])
+        self.assertEqual(fields[0], {
+            "hash": offers[0]["hash"],
+            "candidateName": "Alice",
+            "companyName": "TechCorp Inc",
+            "recruiterEmail": "hr@techcorp.com",
+            "dateSigned": offers[0]["dateSigned"]
+        })
+
+        recent = [offer async for offer in self.store.iter_offer_match_fields(signed_since=datetime(2025, 1, 1, 11, 30))]
+        self.assertEqual([offer["candidateName"] for offer in recent], ["Bob"])
+
+    async def test_next_sequence(self):
+        self.assertEqual([await self.store.next_sequence("test") for _ in range(3)], [1, 2, 3])
+        self.assertEqual(await self.store.next_sequence("other"), 1)
+
+    async def test_revocations(self):
+        now = datetime(2025, 1, 2, 9, 30)
+        hashes = [make_offer(name)["hash"] for name in ("Alice", "Bob", "Carol")]
+        for seq, hash_value in enumerate(hashes, start=1):
+            self.assertTrue(await self.store.insert_revocation(
+                {"seq": seq, "hash": hash_value, "reason": "Position filled", "revokedAt": now}
+            ))
+        self.assertFalse(await self.store.insert_revocation({"seq": 4, "hash": hashes[0], "revokedAt": now}))
+
+        revocation = await self.store.find_revocation(hashes[1])
+        self.assertEqual(revocation, {"seq": 2, "hash": hashes[1], "reason": "Position filled", "revokedAt": now})
+        self.assertIsNone(await self.store.find_revocation("missing"))
+
+        self.assertEqual([r["seq"] for r in await self.store.find_revocations_since(0, 2)], [1, 2])
+        self.assertEqual([r["hash"] for r in await self.store.find_revocations_since(2, 10)], [hashes[2]])
+        self.assertEqual(await self.store.find_revocations_since(3, 10), [])
+
+    async def test_audit_events(self):
+        await self.store.create_audit_log(30 * 24 * 3600)
+        now = datetime.utcnow().replace(microsecond=0)
+
+        def event(company_key, outcome, client, minutes_ago=0):
+            fields = {
+                "timestamp": now - timedelta(minutes=minutes_ago), "companyKey": company_key, "outcome": outcome,
+                "clientFingerprint": client, "method": "details", "source": "manual"
+            }
+            # Events recorded without a fingerprint salt carry no clientFingerprint
+            return {field: value for field, value in fields.items() if value is not None}
+
+        await self.store.insert_audit_events([
+            event("techcorp inc", "verified", "a"),
+            event("techcorp inc", "notFound", "a", minutes_ago=5),
+            event("techcorp inc", "notFound", "b", minutes_ago=10),
+            event("techcorp inc", "notFound", None, minutes_ago=15),
+            event("other co", "verified", "c"),
+            event("techcorp inc", "verified", "c", minutes_ago=120)
+        ])
+        await self.store.insert_audit_events([])
+
+        summaries = await self.store.aggregate_audit_events(now - timedelta(hours=1))
+        self.assertEqual(summaries[0], {
+            "companyKey": "techcorp inc",
+            "attempts": 4,
+            "byOutcome": {"verified": 1, "notFound": 3},
+            "uniqueClients": 2,
+            "lastAttempt": now
+        })
+        self.assertEqual([summary["companyKey"] for summary in summaries], ["techcorp inc", "other co"])
+        self.assertEqual(len(await self.store.aggregate_audit_events(now - timedelta(hours=1), limit=1)), 1)
+
+        other = await self.store.aggregate_audit_events(now - timedelta(hours=3), company_key="other co")
+        self.assertEqual([(summary["companyKey"], summary["attempts"]) for summary in other], [("other co", 1)])
+
+    async def test_offer_stats_increments(self):
+        self.assertIsNone(await self.store.find_offer_stats("recruiter", "hr@techcorp.com"))
+        issued = {"total": 1, "byStatus.verified": 1, "byMonth.2025-01": 1}
+        await self.store.increment_offer_stats({("recruiter", "hr@techcorp.com"): issued, ("company", "techcorp inc"): issued})
+        await self.store.increment_offer_stats({
+            ("recruiter", "hr@techcorp.com"): {"byStatus.verified": -1, "byStatus.revoked": 1, "verificationHits": 2}
+        })
+
+        self.assertEqual(await self.store.find_offer_stats("recruiter", "hr@techcorp.com"), {
+            "total": 1,
+            "byStatus": {"verified": 0, "revoked": 1},
+            "byMonth": {"2025-01": 1},
+            "verificationHits": 2
+        })
+        self.assertEqual((await self.store.find_offer_stats("company", "techcorp inc"))["verificationHits"], 0)
+
+    async def test_offer_stats_rebuild(self):
+        await self.store.insert_offers([
+            make_offer("Alice"),
+            make_offer("Bob", status="revoked"),
+            make_offer("Carol", dateSigned=datetime(2024, 12, 31, 23, 0)),
+            make_offer("Dave", recruiter_email="other@techcorp.com")
+        ])
+        counts = await self.store.aggregate_offer_counts()
+        self.assertEqual(sum(group["count"] for group in counts), 4)
+        self.assertIn(
+            {"recruiterEmail": "hr@techcorp.com", "companyName": "TechCorp Inc", "status": "revoked", "month": "2025-01", "count": 1},
+            counts
+        )
+
+        await self.store.increment_offer_stats({
+            ("recruiter", "hr@techcorp.com"): {"total": 7, "verificationHits": 3},
+            ("recruiter", "gone@techcorp.com"): {"total": 2}
+        })
+        await self.store.replace_offer_counts({
+            ("recruiter", "hr@techcorp.com"): {
+                "total": 3, "byStatus": {"verified": 2, "revoked": 1}, "byMonth": {"2024-12": 1, "2025-01": 2}
+            }
+        })
+        self.assertEqual(await self.store.find_offer_stats("recruiter", "hr@techcorp.com"), {
+            "total": 3,
+            "byStatus": {"verified": 2, "revoked": 1},
+            "byMonth": {"2024-12": 1, "2025-01": 2},
+            "verificationHits": 3
+        })
+        gone = await self.store.find_offer_stats("recruiter", "gone@techcorp.com")
+        self.assertIn(gone, [None, {"total": 0, "byStatus": {}, "byMonth": {}, "verificationHits": 0}])
+
+    async def test_merkle_batch_lifecycle(self):
+        offers = [make_offer(name, minutes_ago=minutes) for name, minutes in (("Alice", 3), ("Bob", 2), ("Carol", 1))]
+        await self.store.insert_offers(offers)
+
+        pending = await self.store.find_unanchored_offers(2)
+        self.assertEqual([offer["hash"] for offer in pending], [offers[0]["hash"], offers[1]["hash"]])
+
+        now = datetime(2025, 1, 2, 9, 30)
+        await self.store.insert_batch({"batchId": 1, "status": "claiming", "createdAt": now, "updatedAt": now})
+        await self.store.claim_offers_for_batch([offer["hash"] for offer in pending], 1)
+        self.assertEqual(await self.store.find_batch_offer_hashes(1), sorted(offer["hash"] for offer in pending))
+        self.assertEqual([offer["hash"] for offer in await self.store.find_unanchored_offers(10)], [offers[2]["hash"]])
+
+        self.assertTrue(await self.store.transition_batch(1, ["claiming"], "claimed"))
+        self.assertFalse(await self.store.transition_batch(1, ["claiming"], "claimed"))
+        self.assertEqual(await self.store.find_stale_batches(datetime.utcnow() + timedelta(minutes=1)), [1])
+        self.assertEqual(await self.store.find_stale_batches(datetime.utcnow() - timedelta(minutes=1)), [])
+        self.assertIsNone(await self.store.find_sealed_batch(1))
+
+        await self.store.upsert_proofs([{"hash": offers[0]["hash"], "batchId": 1, "leafIndex": 0, "proof": []}])
+        await self.store.seal_batch(1, {"type": "merkle_root", "root": "ab" * 32, "leafCount": 2, "kid": "k1", "signature": "sig", "sealedAt": now})
+        sealed = await self.store.find_sealed_batch(1)
+        self.assertEqual(sealed["root"], "ab" * 32)
+        self.assertEqual(sealed["type"], "merkle_root")
+        self.assertEqual(sealed["sealedAt"], now)
+        self.assertEqual([batch["batchId"] for batch in await self.store.list_sealed_batches(0, 10)], [1])
+        self.assertEqual(await self.store.list_sealed_batches(1, 10), [])
+        self.assertEqual((await self.store.find_proof(offers[0]["hash"]))["batchId"], 1)
+
+        await self.store.delete_unsealed_batch(1)
+        self.assertIsNotNone(await self.store.find_sealed_batch(1))
+
+class InMemorySQLiteStorageTests(StorageContract, unittest.IsolatedAsyncioTestCase):
+    async def make_store(self):
+        store = SQLiteOfferStore(":memory:")
+        await store.connect()
+        return store
+
+class SQLiteFileStorageTests(StorageContract, unittest.IsolatedAsyncioTestCase):
+    async def make_store(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        store = SQLiteOfferStore(str(Path(self.temp_dir.name) / "offertrust.db"))
+        await store.connect()
+        return store
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        self.temp_dir.cleanup()
+
+@unittest.skipUnless(mongo_available(), "MongoDB is not reachable at MONGO_URL")
+class MongoStorageTests(StorageContract, unittest.IsolatedAsyncioTestCase):
+    async def make_store(self):
+        store = MongoOfferStore(MONGO_URL, f"offertrust_contract_{uuid.uuid4().hex[:8]}")
+        await store.connect()
+        return store
+
+    async def asyncTearDown(self):
+        await self.store.client.drop_database(self.store.db_name)
+        await super().asyncTearDown()
+
+if __name__ == "__main__":
+    unittest.main()
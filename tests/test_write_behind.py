@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Tests for the group-commit (write-behind) offer writer in backend/server.py"""
+import asyncio
+import sys
+import unittest
+import uuid
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+from storage import DuplicateOfferError, SQLiteOfferStore  # noqa: E402
+
+def make_offer(candidate_name: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "hash": uuid.uuid4().hex + uuid.uuid4().hex,
+        "candidateName": candidate_name,
+        "companyName": "TechCorp Inc",
+        "recruiterEmail": "hr@techcorp.com",
+        "recruiterName": "John Recruiter",
+        "position": "Software Engineer",
+        "verificationKey": f"key-{candidate_name}",
+        "dateSigned": datetime.utcnow(),
+        "status": "verified"
+    }
+
+class OfferWriteBehindTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = SQLiteOfferStore(":memory:")
+        await self.store.connect()
+        await self.store.create_indexes()
+        patcher = mock.patch.object(server, "storage", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.store.close()
+
+    def start_writer(self, batch_size: int = 16, max_delay: float = 0.01, max_pending: int = 1000):
+        writer = server.OfferWriteBehind(batch_size, max_delay, max_pending)
+        writer.start()
+        return writer
+
+    async def test_every_waiter_resolves_once_its_offer_is_stored(self):
+        writer = self.start_writer()
+        offers = [make_offer(f"Candidate {index}") for index in range(100)]
+        results = await asyncio.gather(*(writer.write(offer) for offer in offers), return_exceptions=True)
+        await writer.stop()
+
+        self.assertEqual(results, [None] * 100)
+        for offer in offers:
+            self.assertIsNotNone(await self.store.find_offer_by_hash(offer["hash"]))
+        stats = writer.stats()
+        self.assertEqual(stats["offersWritten"], 100)
+        # Concurrent writers are grouped: 100 offers in batches of at most 16
+        self.assertGreaterEqual(stats["batches"], 7)
+        self.assertLess(stats["batches"], 100)
+
+    async def test_a_lone_offer_is_written_after_the_delay(self):
+        writer = self.start_writer(batch_size=256, max_delay=0.02)
+        offer = make_offer("Alice")
+        await asyncio.wait_for(writer.write(offer), timeout=1)
+        self.assertIsNotNone(await self.store.find_offer_by_hash(offer["hash"]))
+        await writer.stop()
+
+    async def test_duplicates_fail_only_their_own_waiter(self):
+        existing = make_offer("Alice")
+        await self.store.insert_offer(existing)
+        writer = self.start_writer()
+        fresh = make_offer("Bob")
+        results = await asyncio.gather(
+            writer.write(dict(existing, id=str(uuid.uuid4()))), writer.write(fresh), return_exceptions=True
+        )
+        await writer.stop()
+
+        self.assertIsInstance(results[0], DuplicateOfferError)
+        self.assertIsNone(results[1])
+        self.assertEqual(writer.stats()["offersFailed"], 1)
+
+    async def test_failed_batch_fails_every_waiter(self):
+        writer = self.start_writer()
+        with mock.patch.object(self.store, "insert_offers", side_effect=RuntimeError("storage unavailable")):
+            results = await asyncio.gather(
+                *(writer.write(make_offer(f"Candidate {index}")) for index in range(5)), return_exceptions=True
+            )
+        await writer.stop()
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(writer.stats()["offersFailed"], 5)
+
+    async def test_full_queue_rejects_instead_of_waiting(self):
+        writer = self.start_writer(max_pending=2)
+        # The writer task has not run yet, so nothing is dequeued
+        first = asyncio.ensure_future(writer.write(make_offer("Alice")))
+        second = asyncio.ensure_future(writer.write(make_offer("Bob")))
+        await asyncio.sleep(0)
+        with self.assertRaises(server.OfferWriteQueueFull):
+            await writer.write(make_offer("Carol"))
+        await asyncio.gather(first, second)
+        await writer.stop()
+        self.assertEqual(writer.stats()["rejected"], 1)
+
+    async def test_stop_drains_queued_offers(self):
+        writer = self.start_writer(batch_size=1000, max_delay=10)
+        offers = [make_offer(f"Candidate {index}") for index in range(10)]
+        waiters = [asyncio.ensure_future(writer.write(offer)) for offer in offers]
+        await asyncio.sleep(0)
+        await writer.stop()
+        self.assertEqual(await asyncio.gather(*waiters), [None] * 10)
+        with self.assertRaises(RuntimeError):
+            await writer.write(make_offer("Late"))
+
+if __name__ == "__main__":
+    unittest.main()